@@ -0,0 +1,78 @@
+import logging
+import queue
+import threading
+
+logging.basicConfig(level=logging.ERROR)
+
+# events sent by a task to the GUI
+EVENT_PROGRESS = 'progress'
+EVENT_DONE = 'done'
+
+
+class BackgroundTask():
+    '''
+    Class to run a function in a thread, the function gets the task as argument and reports its progress and other
+    events through it, the GUI reads them with poll from its own thread
+    Cancelling only sets a flag, the function checks it (cancelled, or the event passed to the computations) and
+    returns at its next stop point
+    '''
+
+    def __init__(self, target):
+        self.target = target
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.result = None
+        self.error = None
+        self.done = False
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        try:
+            self.result = self.target(self)
+        except Exception as e:
+            logging.exception('Background task fails')
+            self.error = e
+        finally:
+            self.events.put((EVENT_DONE,))
+
+    def post(self, *event):
+        '''
+        Function to send an event (name, arguments...) to the GUI
+        '''
+        self.events.put(event)
+
+    def progress(self, c_porcent, elapsed_time):
+        '''
+        Function with the signature of the progress callbacks of the computations
+        '''
+        self.events.put((EVENT_PROGRESS, c_porcent, elapsed_time))
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def poll(self):
+        '''
+        Function to get the events sent since the last call without blocking, consecutive progress events are
+        merged into the last one, so the GUI draws each progress once per poll
+        '''
+        events = []
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == EVENT_PROGRESS and events and events[-1][0] == EVENT_PROGRESS:
+                events[-1] = event
+            else:
+                events.append(event)
+            if event[0] == EVENT_DONE:
+                self.done = True
+        return events
@@ -0,0 +1,109 @@
+import math
+
+import numpy as np
+from matplotlib.collections import PolyCollection
+from matplotlib.patches import Rectangle
+
+# width of the bars, as the default of matplotlib bar charts
+BAR_WIDTH = 0.8
+# maximum number of labels of the x axis, the others are skipped
+MAX_TICKS = 30
+
+
+class BarChart():
+    '''
+    Class to draw the bars of an error chart as one collection on the axes of a canvas
+    The selected bar is drawn over the others by blitting on the background cached after each full draw, so a
+    change of selection doesn't redraw the chart
+    '''
+
+    def __init__(self, ax, canvas, color='b', selected_color='r'):
+        self.ax = ax
+        self.canvas = canvas
+        self.color = color
+        self.selected_color = selected_color
+        self.data = None
+        self.index = None
+        self.highlight = None
+        self.background = None
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def reset(self):
+        '''
+        Function to forget the bars after the axes are cleared
+        '''
+        self.data = None
+        self.index = None
+        self.highlight = None
+        self.background = None
+
+    def set_data(self, data, index):
+        '''
+        Function to add the bars of data (one per element) to the axes with the bar of index selected
+        The axes have to be cleared before, the chart is drawn by the next draw of the canvas
+        '''
+        self.reset()
+        self.data = np.asarray(data, dtype=float)
+        n = len(self.data)
+        x = np.arange(n)
+        left = x - BAR_WIDTH / 2
+        right = x + BAR_WIDTH / 2
+        zeros = np.zeros(n)
+        # vertices of the rectangles (n, 4, 2)
+        verts = np.stack([np.column_stack([left, zeros]), np.column_stack([left, self.data]),
+                          np.column_stack([right, self.data]), np.column_stack([right, zeros])], axis=1)
+        self.ax.add_collection(PolyCollection(verts, facecolors=self.color, edgecolors='none'), autolim=True)
+        self.highlight = Rectangle((0, 0), BAR_WIDTH, 0, color=self.selected_color, animated=True)
+        self.ax.add_patch(self.highlight)
+        self.move_highlight(index)
+        # labels of the elements (from 1), downsampled for many elements
+        step = max(1, int(math.ceil(n / float(MAX_TICKS))))
+        self.ax.set_xticks(x[::step])
+        self.ax.set_xticklabels(tuple(x[::step] + 1), rotation=65, size=7)
+
+    def move_highlight(self, index):
+        '''
+        Function to place the selected bar over the bar of index, hidden if there is no such bar
+        '''
+        self.index = index
+        visible = self.data is not None and index is not None and 0 <= index < len(self.data)
+        self.highlight.set_visible(visible)
+        if visible:
+            self.highlight.set_xy((index - BAR_WIDTH / 2, 0))
+            self.highlight.set_height(self.data[index])
+
+    def on_draw(self, event):
+        '''
+        Function to cache the background after a full draw of the canvas and draw the selected bar over it
+        '''
+        if self.highlight is None:
+            return
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.highlight)
+
+    def select(self, index):
+        '''
+        Function to change the selected bar, only the axes are blitted
+        '''
+        if self.highlight is None:
+            return
+        self.move_highlight(index)
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.highlight)
+        self.canvas.blit(self.ax.bbox)
+
+    def index_at(self, event):
+        '''
+        Function to get the index of the bar under a mouse event, None if there is no bar
+        '''
+        if self.data is None or event.inaxes is not self.ax or event.xdata is None or event.ydata is None:
+            return None
+        index = int(round(event.xdata))
+        if not 0 <= index < len(self.data) or abs(event.xdata - index) > BAR_WIDTH / 2:
+            return None
+        if not min(0, self.data[index]) <= event.ydata <= max(0, self.data[index]):
+            return None
+        return index
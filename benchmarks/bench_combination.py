@@ -0,0 +1,66 @@
+'''
+Benchmark of the random sampler of subsets (misc_tools.combination) against the previous implementation
+
+The previous implementation creates a new generator of combinations for each set and checks the repeated ones
+against a list, so it is only run up to --legacy-k sets
+
+    python3 benchmarks/bench_combination.py -n 500 -r 20 -k 10000
+'''
+import argparse
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from numpy.random import permutation
+
+from misc_tools import combination, ncr
+
+
+def legacy_combination(n, r, k):
+    index = 0
+    k = min(ncr(n, r), k)
+    samples = []
+    b_c = True
+    while b_c:
+        for item in itertools.combinations(permutation(n), r):
+            if index == k - 1:
+                b_c = False
+            s_item = list(item)
+            s_item.sort()
+            if s_item not in samples:
+                samples.append(s_item)
+                index += 1
+                break
+    return samples, k
+
+
+def measure(function, *args):
+    t = time.time()
+    samples, k = function(*args)
+    return time.time() - t, samples, k
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', type=int, default=500, help='number of poses')
+    parser.add_argument('-r', type=int, default=20, help='poses per set')
+    parser.add_argument('-k', type=int, default=10000, help='number of sets')
+    parser.add_argument('--legacy-k', type=int, default=10000, help='maximum number of sets for the legacy sampler')
+    args = parser.parse_args()
+
+    row = '{:<10} {:>6} {:>4} {:>7} {:>12} {:>10}'
+    print(row.format('sampler', 'n', 'r', 'k', 'time (s)', 'unique'))
+    # sparse case and a case close to all the possible combinations
+    for n, r, k in ((args.n, args.r, args.k), (20, 3, ncr(20, 3) - 10)):
+        t, samples, k_out = measure(combination, n, r, k, 0)
+        print(row.format('new', n, r, k_out, '%.4f' % t, len(set(map(tuple, samples)))))
+        k_legacy = min(k, args.legacy_k)
+        t, samples, k_out = measure(legacy_combination, n, r, k_legacy)
+        print(row.format('legacy', n, r, int(k_out), '%.4f' % t, len(set(map(tuple, samples)))))
+
+
+if __name__ == '__main__':
+    main()
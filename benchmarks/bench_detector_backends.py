@@ -0,0 +1,68 @@
+'''
+Report of the time and accuracy of each chessboard detector backend
+
+With a folder, the images of the folder are used (e.g. the images of one camera)
+Without a folder, synthetic chessboards are rendered and also the distance to the ground truth is reported
+
+    python3 benchmarks/bench_detector_backends.py --folder path/to/camera --height 6 --width 9
+'''
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+import datastring
+from detection_tools import DETECTOR_BACKENDS, DetectionSettings, compare_backends, find_features, normalize
+from synthetic_patterns import chessboard, feature_error
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--folder', help='folder with the images of one camera')
+    parser.add_argument('--height', type=int, default=6, help='pattern height (inner corners per row)')
+    parser.add_argument('--width', type=int, default=9, help='pattern width')
+    parser.add_argument('--pyramid', action='store_true', help='use the coarse-to-fine detection')
+    parser.add_argument('--size', default='1920x1080', help='size of the synthetic images')
+    parser.add_argument('--images', type=int, default=10, help='number of synthetic images')
+    args = parser.parse_args()
+
+    settings = DetectionSettings('Chessboard', args.height, args.width, args.pyramid, None)
+    if args.folder:
+        paths = sorted(os.path.join(args.folder, f) for f in os.listdir(args.folder)
+                       if os.path.splitext(f)[1].lower() in ('.jpg', '.png'))
+        print(datastring.backends2string(compare_backends(paths, settings)))
+        return
+
+    size = tuple(int(x) for x in args.size.split('x'))
+    with tempfile.TemporaryDirectory() as folder:
+        paths = []
+        ground_truth = []
+        for seed in range(args.images):
+            im, gt = chessboard(size, args.height, args.width, seed=seed)
+            paths.append(os.path.join(folder, '%d.png' % seed))
+            cv2.imwrite(paths[-1], im)
+            ground_truth.append(gt)
+        print(datastring.backends2string(compare_backends(paths, settings)))
+        # distance to the ground truth of the synthetic images
+        print('\n%-25s%12s%12s' % ('Backend', 'Mean (px)', 'Max (px)'))
+        for backend in DETECTOR_BACKENDS:
+            errors = []
+            for path, gt in zip(paths, ground_truth):
+                ret, features = find_features(normalize(cv2.imread(path, 0)), 'Chessboard', args.height, args.width,
+                                              backend)
+                if ret:
+                    errors.append(feature_error(features, gt))
+            if errors:
+                print('%-25s%12.4f%12.4f' % (backend, np.mean([e[0] for e in errors]),
+                                             np.max([e[1] for e in errors])))
+            else:
+                print('%-25s%12s%12s' % (backend, '-', '-'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+'''
+Benchmark of the drawing of the mesh of detected and projected features (image_tools.draw_mesh) against the
+previous implementation, with one cv2.line call per segment and the RGB image filled channel by channel
+
+The previous implementation passed the float coordinates to OpenCV, which truncated them, here they are
+truncated before the calls so that it runs with the versions of OpenCV which reject them
+
+    python3 benchmarks/bench_mesh_drawing.py --size 2448 2048 --pattern 20 30 -n 20
+'''
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from image_tools import draw_mesh, gray_to_rgb
+from synthetic_patterns import pattern_homography
+
+
+def legacy_draw(im, detected, projected, p_height, p_width, index_corner):
+    im3 = np.uint8(np.zeros(im.shape + (3,)))
+    im3[:, :, 0] = im
+    im3[:, :, 1] = im
+    im3[:, :, 2] = im
+    for points, color in ((projected, (255, 0, 0)), (detected, (0, 255, 0))):
+        for i in range(p_height):
+            for j in range(p_width):
+                a = points[j * p_height + i]
+                if j * p_height + i == index_corner:
+                    cv2.circle(im3, (int(a[0][0]), int(a[0][1])), 5, color)
+                if i < p_height - 1:
+                    b = points[j * p_height + i + 1]
+                    cv2.line(im3, (int(a[0][0]), int(a[0][1])), (int(b[0][0]), int(b[0][1])), color)
+                if j < p_width - 1:
+                    c = points[(j + 1) * p_height + i]
+                    cv2.line(im3, (int(a[0][0]), int(a[0][1])), (int(c[0][0]), int(c[0][1])), color)
+    return im3
+
+
+def new_draw(im, detected, projected, p_height, p_width, index_corner):
+    im3 = gray_to_rgb(im)
+    draw_mesh(im3, projected, p_height, p_width, (255, 0, 0), index_corner)
+    draw_mesh(im3, detected, p_height, p_width, (0, 255, 0), index_corner)
+    return im3
+
+
+def pattern_points(size, p_height, p_width, seed):
+    # features in the detection order, feature i of row j is j * p_height + i
+    grid = np.float32([[i, j] for j in range(p_width) for i in range(p_height)])
+    H = pattern_homography(size, (p_height - 1, p_width - 1), seed=seed)
+    return cv2.perspectiveTransform(grid.reshape(-1, 1, 2), H)
+
+
+def measure(function, images, detected, projected, p_height, p_width):
+    t = time.time()
+    results = [function(im, d, p, p_height, p_width, 3) for im, d, p in zip(images, detected, projected)]
+    return (time.time() - t) / len(images), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, nargs=2, default=(2448, 2048), help='image width and height')
+    parser.add_argument('--pattern', type=int, nargs=2, default=(20, 30), help='pattern height and width')
+    parser.add_argument('-n', type=int, default=20, help='number of images')
+    args = parser.parse_args()
+
+    w, h = args.size
+    rng = np.random.RandomState(0)
+    row = '{:<10} {:>12} {:>10} {:>14}'
+    print(row.format('drawing', 'pattern', 'size', 'per image (s)'))
+    for p_height, p_width in ((6, 9), tuple(args.pattern)):
+        images = [np.uint8(rng.randint(0, 256, (h, w))) for _ in range(args.n)]
+        detected = [pattern_points((w, h), p_height, p_width, seed) for seed in range(args.n)]
+        projected = [d + np.float32(rng.normal(0, 2, d.shape)) for d in detected]
+        t_legacy, legacy = measure(legacy_draw, images, detected, projected, p_height, p_width)
+        t_new, new = measure(new_draw, images, detected, projected, p_height, p_width)
+        same = all(np.array_equal(a, b) for a, b in zip(legacy, new))
+        pattern = '%dx%d' % (p_height, p_width)
+        print(row.format('legacy', pattern, '%dx%d' % (w, h), '%.5f' % t_legacy))
+        print(row.format('new', pattern, '%dx%d' % (w, h), '%.5f' % t_new))
+        print('identical images: %s, speedup %.1fx' % (same, t_legacy / t_new))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+'''
+Benchmark of the coarse-to-fine detection against the full resolution detection
+
+Renders synthetic patterns at several resolutions and reports for both paths the time per image
+and the distance of the detected features to the ground truth
+
+    python3 benchmarks/bench_pyramid_detection.py --repeat 3
+'''
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detection_tools import find_features, find_features_pyramid, pyramid_scale, normalize
+from synthetic_patterns import asymmetric_grid, chessboard, feature_error
+
+SIZES = [(640, 480), (1920, 1080), (4000, 3000), (5472, 3648)]
+PATTERNS = [('Chessboard', chessboard, 6, 9), ('Asymmetric Grid', asymmetric_grid, 4, 9)]
+
+
+def measure(function, im, pattern_type, p_height, p_width, repeat):
+    best = float('inf')
+    ret, features = False, None
+    for _ in range(repeat):
+        t = time.time()
+        ret, features = function(im, pattern_type, p_height, p_width)
+        best = min(best, time.time() - t)
+    return ret, features, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='repetitions per image, the best time is reported')
+    parser.add_argument('--seeds', type=int, default=3, help='number of synthetic images per size')
+    args = parser.parse_args()
+
+    row = '{:<16} {:>11} {:>6} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10}'
+    print(row.format('pattern', 'size', 'scale', 'full (s)', 'pyr (s)', 'speedup', 'full err', 'pyr err',
+                     'pyr max'))
+    for pattern_type, render, p_height, p_width in PATTERNS:
+        for size in SIZES:
+            times = [0.0, 0.0]
+            errors = [[], []]
+            max_error = 0.0
+            for seed in range(args.seeds):
+                im, gt = render(size, p_height, p_width, seed=seed)
+                im = normalize(im)
+                for k, function in enumerate((find_features, find_features_pyramid)):
+                    ret, features, t = measure(function, im, pattern_type, p_height, p_width, args.repeat)
+                    times[k] += t / args.seeds
+                    if ret:
+                        mean_error, e_max = feature_error(features, gt)
+                        errors[k].append(mean_error)
+                        if k == 1:
+                            max_error = max(max_error, e_max)
+            mean_errors = [sum(e) / len(e) if e else float('nan') for e in errors]
+            print(row.format(pattern_type, '%dx%d' % size, '%g' % pyramid_scale(size[::-1]),
+                             '%.4f' % times[0], '%.4f' % times[1], '%.2f' % (times[0] / times[1]),
+                             '%.4f' % mean_errors[0], '%.4f' % mean_errors[1], '%.4f' % max_error))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+
+'''
+Functions to render synthetic calibration patterns with a known position of their features
+Used by the benchmarks to measure the time and the accuracy of the detection of features
+'''
+
+# pixels of the rendered board per feature distance, the board is downsampled by the perspective warping
+BOARD_RESOLUTION = 200
+
+
+def pattern_homography(size, board_size, tilt=0.15, seed=0):
+    '''
+    Function to get a random homography which maps the board into the central part of the image
+    '''
+    rng = np.random.RandomState(seed)
+    w, h = size
+    bw, bh = board_size
+    src = np.float32([[0, 0], [bw, 0], [bw, bh], [0, bh]])
+    # the board fills about the 60 % of the image with some perspective distortion
+    scale = 0.6 * min(w / float(bw), h / float(bh))
+    dst = (src - np.float32([bw / 2.0, bh / 2.0])) * scale + np.float32([w / 2.0, h / 2.0])
+    dst += np.float32(rng.uniform(-tilt, tilt, (4, 2)) * np.float32([bw, bh]) * scale / 2)
+    return cv2.getPerspectiveTransform(src, dst)
+
+
+def render(board, points, size, noise=2.0, seed=0):
+    '''
+    Function to warp a rendered board into an image of the given size
+    points are given in board pixels, returns the image and the position of the points in the image
+    '''
+    rng = np.random.RandomState(seed)
+    H = pattern_homography(size, (board.shape[1], board.shape[0]), seed=seed)
+    # low pass filter against aliasing, the board is downsampled by the warping
+    factor = board.shape[1] / (0.6 * size[0])
+    if factor > 1:
+        board = cv2.GaussianBlur(board, (0, 0), factor / 2.0)
+    im = cv2.warpPerspective(board, H, size, flags=cv2.INTER_LINEAR, borderValue=255)
+    im = cv2.GaussianBlur(im, (0, 0), 0.8)
+    im = np.clip(im + rng.normal(0, noise, im.shape), 0, 255).astype(np.uint8)
+    gt = cv2.perspectiveTransform(np.float64(points).reshape(-1, 1, 2), H)
+    return im, np.float32(gt)
+
+
+def chessboard(size, p_height, p_width, seed=0):
+    '''
+    Function to render a chessboard with p_height x p_width inner corners
+    '''
+    o = BOARD_RESOLUTION
+    board = np.full(((p_width + 3) * o, (p_height + 3) * o), 255, np.uint8)
+    for r in range(p_width + 1):
+        for c in range(p_height + 1):
+            if (r + c) % 2 == 0:
+                board[(r + 1) * o:(r + 2) * o, (c + 1) * o:(c + 2) * o] = 0
+    # corners lie on the border between two pixels
+    points = [[(c + 2) * o - 0.5, (r + 2) * o - 0.5] for r in range(p_width) for c in range(p_height)]
+    return render(board, points, size, seed=seed)
+
+
+def asymmetric_grid(size, p_height, p_width, seed=0):
+    '''
+    Function to render an asymmetric circles grid with p_height circles per row and p_width rows
+    '''
+    o = BOARD_RESOLUTION
+    board = np.full((int((p_width / 2.0 + 2) * o), (p_height + 2) * o), 255, np.uint8)
+    points = []
+    for i in range(p_width):
+        for j in range(p_height):
+            x = ((2 * j + i % 2) / 2.0 + 1) * o
+            y = (i / 2.0 + 1) * o
+            points.append([x, y])
+            cv2.circle(board, (int(x * 16), int(y * 16)), int(0.15 * o * 16), 0, -1, cv2.LINE_AA, 4)
+    return render(board, points, size, seed=seed)
+
+
+def feature_error(features, gt):
+    '''
+    Function to get the mean and maximum distance between the detected features and the nearest ground truth feature
+    '''
+    features = np.float32(features).reshape(-1, 1, 2)
+    gt = np.float32(gt).reshape(1, -1, 2)
+    e = np.linalg.norm(features - gt, axis=2).min(axis=1)
+    return e.mean(), e.max()
@@ -0,0 +1,214 @@
+'''
+Command line calibration with the MRT Camera Calibration Toolbox, without GUI
+
+Detects the features of the images of one folder (single mode) or two folders (stereo mode, images are paired
+by their sorted order), calibrates the cameras with K random groups of R poses and writes the same text files
+as the export of the toolbox
+
+    python3 calibrate_cli.py cam1 cam2 --pattern Chessboard --height 6 --width 9 --distance 25 -r 10 -k 50 -o out
+'''
+import argparse
+import logging
+import os
+import sys
+
+import datastring
+from calibration_session import DEFAULT_MAX_ITER, PARAMETER_FILENAMES, WARM_START_PROBES, CalibrationSession, \
+    ConvergenceMonitor, calibration_flags, default_calibration_workers, termination_criteria
+from detection_cache import cache_of, caches_for
+from detection_tools import DEFAULT_BACKEND, DETECTOR_BACKENDS, DetectionSettings, default_workers, \
+    detect_features_parallel
+from subset_cache import SubsetCache
+from time_tools import chronometer
+
+PATTERN_TYPES = ['Chessboard', 'Asymmetric Grid', 'Symmetric Grid']
+VALID_FILES = ['.jpg', '.png']
+
+
+def image_files(folder):
+    '''
+    Function to get the images of a folder sorted by the number in their names
+    '''
+    file_no_path = [f for f in os.listdir(folder) if os.path.splitext(f)[1].lower() in VALID_FILES]
+    try:
+        file_no_path.sort(key=lambda f: int(''.join(filter(str.isdigit, f))))
+    except ValueError:
+        logging.warning('non-indexable filenames')
+        file_no_path.sort()
+    return [os.path.join(folder, f) for f in file_no_path]
+
+
+def print_progress(stage, c_porcent, elapsed_time):
+    '''
+    Function to write the progress of a stage in one line of stdout
+    '''
+    time_left = max(elapsed_time * (1 / c_porcent - 1), 0) if c_porcent > 0 else 0
+    sys.stdout.write('\r%-12s %6.1f %%  elapsed %8.2f s  left %8.2f s' % (stage, c_porcent * 100.0, elapsed_time,
+                                                                           time_left))
+    if c_porcent >= 1:
+        sys.stdout.write('\n')
+    sys.stdout.flush()
+
+
+def detect(session, folders, settings, workers, use_cache):
+    '''
+    Function to detect the features of all the images and add the poses detected in every camera to the session
+    '''
+    files = [image_files(folder) for folder in folders]
+    n_poses = min(len(f) for f in files)
+    if any(len(f) != n_poses for f in files):
+        logging.warning('different number of images per camera, using the first %d', n_poses)
+    paths = [p for f in files for p in f[:n_poses]]
+    caches = caches_for(paths) if use_cache else {}
+    known_features = {}
+    for cache in caches.values():
+        known_features.update(cache.entries)
+
+    time_detection = chronometer()
+    results = []
+    sizes = [None] * len(folders)
+    for result in detect_features_parallel(paths, settings, workers=workers, known_features=known_features):
+        if caches:
+            cache_of(caches, result.path).put(result.key, result.features)
+        # only the size of the images of each camera is needed, the pixels are not kept
+        j = len(results) // n_poses
+        if sizes[j] is None and result.ok and result.image is not None:
+            sizes[j] = result.image.shape
+        results.append(result._replace(image=None))
+        print_progress('Detection', len(results) / float(len(paths)), time_detection.gettime())
+    for cache in caches.values():
+        cache.save()
+
+    rejected = 0
+    for i in range(n_poses):
+        pose = [results[j * n_poses + i] for j in range(len(folders))]
+        if not all(result.ok for result in pose):
+            rejected += 1
+            continue
+        for j, result in enumerate(pose):
+            if session.size[j] is None:
+                session.size[j] = sizes[j]
+            session.add_features(j, result.path, result.features)
+    return rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('folders', nargs='+', help='folder with the images of each camera (one or two)')
+    parser.add_argument('--pattern', choices=PATTERN_TYPES, default='Chessboard', help='pattern type')
+    parser.add_argument('--height', type=int, required=True, help='pattern height (features per row)')
+    parser.add_argument('--width', type=int, required=True, help='pattern width (features per column)')
+    parser.add_argument('--distance', type=float, required=True, help='distance between features')
+    parser.add_argument('-r', type=int, help='number of poses per calibration (R)')
+    parser.add_argument('-k', type=int, help='number of calibrations (K)')
+    parser.add_argument('--single-shot', action='store_true',
+                        help='calibrate once with all the poses, deviations estimated by OpenCV (no R and K)')
+    parser.add_argument('--seed', type=int, help='seed of the random groups of poses')
+    parser.add_argument('-o', '--output', default='.', help='folder for the calibration parameters')
+    parser.add_argument('--iterations', action='store_true', help='also write the results per calibration')
+    parser.add_argument('--intrinsics-guess', action='store_true', help='use intrinsics guess')
+    parser.add_argument('--fix-point', action='store_true', help='fix principal point')
+    parser.add_argument('--fix-ratio', action='store_true', help='fix aspect ratio')
+    parser.add_argument('--zero-tangent', action='store_true', help='zero tangential distortion')
+    parser.add_argument('--warm-start', action='store_true',
+                        help='calibrate all the images first and start every group from that solution')
+    parser.add_argument('--warm-start-probes', type=int, default=0,
+                        help='groups calibrated again without warm start to compare their time and iterations, '
+                             'e.g. %d (default 0: none)' % WARM_START_PROBES)
+    parser.add_argument('--tolerance', type=float, default=0,
+                        help='stop when the confidence interval of every parameter is below this relative tolerance, '
+                             'K is then the maximum number of groups')
+    parser.add_argument('--time-budget', type=float, default=0, help='stop the calibration of groups after seconds')
+    parser.add_argument('--checkpoint',
+                        help='file to save the finished groups during the calibration, deleted when it finishes')
+    parser.add_argument('--resume', action='store_true',
+                        help='skip the groups of the checkpoint, which must be of the same calibration')
+    parser.add_argument('--subset-cache', help='file with the results of calibrated groups, reused by later runs')
+    parser.add_argument('--prune', type=float, default=0,
+                        help='delete the poses with an error above this multiple of the median error and refine '
+                             'the calibration without them (0: none)')
+    parser.add_argument('--max-iter', type=int, default=DEFAULT_MAX_ITER, help='maximum iterations per calibration')
+    parser.add_argument('--eps', type=float, default=0, help='epsilon of the calibration (0: OpenCV default)')
+    parser.add_argument('--backend', choices=list(DETECTOR_BACKENDS), default=DEFAULT_BACKEND,
+                        help='chessboard detector')
+    parser.add_argument('--pyramid', action='store_true', help='coarse-to-fine detection')
+    parser.add_argument('--workers', type=int, default=default_workers(), help='processes for the detection')
+    parser.add_argument('--calibration-workers', type=int, default=default_calibration_workers(),
+                        help='processes for the calibration of subsets')
+    parser.add_argument('--no-cache', action='store_true', help='do not use the detection cache')
+    args = parser.parse_args()
+
+    if len(args.folders) > 2:
+        parser.error('one folder per camera, at most two cameras')
+    if not args.single_shot and (args.r is None or args.k is None):
+        parser.error('-r and -k are required without --single-shot')
+    if args.resume and args.checkpoint is None:
+        parser.error('--resume needs --checkpoint')
+
+    session = CalibrationSession()
+    session.set_mode(len(args.folders) == 2)
+    session.set_pattern(args.pattern, args.height, args.width, args.distance)
+    if args.subset_cache is not None:
+        session.subset_cache = SubsetCache(path=args.subset_cache)
+
+    settings = DetectionSettings(args.pattern, args.height, args.width, args.pyramid, args.backend)
+    rejected = detect(session, args.folders, settings, args.workers, not args.no_cache)
+    print('Poses: %d, rejected: %d' % (session.n_poses(), rejected))
+    flags = calibration_flags(args.intrinsics_guess, args.fix_point, args.fix_ratio, args.zero_tangent)
+    criteria = termination_criteria(args.max_iter, args.eps, session.m_stereo)
+    session.prepare_points()
+    if args.single_shot:
+        if not session.calibrate_single_shot(flags, criteria):
+            print('Calibration fails')
+            return 1
+    else:
+        if args.r > session.n_poses():
+            print('R parameter must be smaller or equal than the number of poses (%d)' % session.n_poses())
+            return 1
+        k = session.draw_samples(args.r, args.k, args.seed)
+        if k != args.k:
+            print('Number of groups changed from %d to %d (maximum possible)' % (args.k, k))
+        monitor = None
+        if args.tolerance > 0 or args.time_budget > 0:
+            monitor = ConvergenceMonitor(args.tolerance, args.time_budget)
+        session.calibrate_samples(flags, lambda c, t: print_progress('Calibration', c, t), args.calibration_workers,
+                                  args.warm_start, criteria, monitor, checkpoint=args.checkpoint, resume=args.resume,
+                                  probes=args.warm_start_probes)
+        if session.n_cached:
+            print('\nGroups from cache: %d' % session.n_cached)
+        if monitor is not None:
+            print('\nGroups used: %d of %d (%s)' % (len(session.samples), session.n_drawn, session.stop_reason))
+        if session.warm_start_report is not None:
+            print(datastring.warmstart2string(session.warm_start_report))
+        session.average_calibrations()
+    if not session.has_intrinsics():
+        print('Calibration fails')
+        return 1
+    session.calculate_projection()
+    session.calculate_error(lambda c, t: print_progress('Error', c, t))
+    if not session.error_is_finite():
+        print('Error is too high')
+        return 1
+    print('RMS error: ' + ', '.join('%0.5f' % e for e in session.rms[:2 * session.n_cameras - 1]))
+    if args.single_shot:
+        print(session.uncertainty_report())
+    if args.prune > 0:
+        report = session.prune_outliers(flags, factor=args.prune)
+        if report is None or not session.error_is_finite():
+            print('Pruning of outliers fails')
+            return 1
+        print(datastring.pruning2string(report))
+
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+    for j in range(2 * int(session.m_stereo) + 1):
+        session.export_parameters(j, os.path.join(args.output, PARAMETER_FILENAMES[j] + '.txt'))
+    if args.iterations:
+        session.export_iterations(args.output)
+    print('Results written to %s' % os.path.abspath(args.output))
+    return 0
+
+
+# guard needed by the process pool of the feature detection on platforms without fork
+if __name__ == '__main__':
+    sys.exit(main())
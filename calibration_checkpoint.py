@@ -0,0 +1,101 @@
+import hashlib
+import logging
+import os
+
+import numpy as np
+
+logging.basicConfig(level=logging.ERROR)
+
+# name of the checkpoint file inside the directory of the images of the first camera
+CHECKPOINT_FILENAME = '.mrt_calibration_checkpoint.npz'
+# minimum time in seconds between two writes of the checkpoint during a calibration
+CHECKPOINT_INTERVAL = 30.0
+
+'''
+Function to get the key of a clustering calibration, a checkpoint is only resumed by a calibration with the same
+points, settings, number of groups (k) and poses per group (r)
+'''
+
+
+def checkpoint_key(data, warm_start, c_r, c_k):
+    h = hashlib.sha1()
+    for points in [data.objpoints] + list(data.imgpoints):
+        for p in points:
+            h.update(np.ascontiguousarray(p, dtype=np.float32).tobytes())
+    h.update(repr((data.stereo, tuple(data.image_size), int(data.flags), data.criteria, bool(warm_start), c_r,
+                   c_k)).encode())
+    return h.hexdigest()
+
+
+class CalibrationCheckpoint():
+    '''
+    Class to keep the finished groups of a clustering calibration in a compressed file, with the groups of poses
+    (samples) and the seed used to draw them
+    Results are tuples (index, rms, c, d, R, T, time) as SubsetResult, R and T are None in single mode
+    '''
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+
+    def load(self):
+        '''
+        Function to read the checkpoint, returns (samples, seed, results) or None if the file is missing, broken
+        or of another calibration
+        '''
+        if not os.path.isfile(self.path):
+            return None
+        try:
+            with np.load(self.path) as data:
+                if str(data['key']) != self.key:
+                    logging.info('Checkpoint %s is of another calibration', self.path)
+                    return None
+                samples = [list(s) for s in data['samples']]
+                seed = int(data['seed']) if data['seed'] >= 0 else None
+                stereo = bool(data['stereo'])
+                results = []
+                for i, index in enumerate(data['index']):
+                    R = data['R'][i] if stereo else None
+                    T = data['T'][i] if stereo else None
+                    results.append((int(index), float(data['rms'][i]), list(data['c'][i]), list(data['d'][i]), R, T,
+                                    float(data['time'][i])))
+        except (IOError, OSError, KeyError, ValueError):
+            logging.warning('Checkpoint %s could not be read', self.path)
+            return None
+        return samples, seed, results
+
+    def save(self, samples, seed, results):
+        '''
+        Function to write the checkpoint, the file is replaced only when the new one is complete
+        '''
+        stereo = len(results) > 0 and results[0][4] is not None
+        arrays = {
+            'key': np.array(self.key),
+            'samples': np.array(samples, dtype=np.int32),
+            'seed': np.array(-1 if seed is None else seed),
+            'stereo': np.array(stereo),
+            'index': np.array([r[0] for r in results], dtype=np.int32),
+            'rms': np.array([r[1] for r in results], dtype=np.float64),
+            'c': np.array([np.array(r[2], dtype=np.float64) for r in results]),
+            'd': np.array([np.array(r[3], dtype=np.float64) for r in results]),
+            'R': np.array([r[4] if stereo else np.zeros((3, 3)) for r in results], dtype=np.float64),
+            'T': np.array([r[5] if stereo else np.zeros((3, 1)) for r in results], dtype=np.float64),
+            'time': np.array([r[6] for r in results], dtype=np.float64),
+        }
+        temporary = self.path + '.tmp.npz'
+        try:
+            np.savez_compressed(temporary, **arrays)
+            os.replace(temporary, self.path)
+        except (IOError, OSError):
+            logging.warning('Checkpoint %s could not be written', self.path)
+
+    def remove(self):
+        '''
+        Function to delete the checkpoint, a missing file is not an error
+        '''
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logging.warning('Checkpoint %s could not be deleted', self.path)
@@ -0,0 +1,1279 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+import datastring
+from calibration_checkpoint import CHECKPOINT_INTERVAL, CalibrationCheckpoint, checkpoint_key
+from subset_cache import SubsetCache, pose_identities, settings_key, subset_key
+from misc_tools import combination
+from quaternions import averageMatrix
+from time_tools import chronometer
+
+logging.basicConfig(level=logging.ERROR)
+
+# names of the files of the calibration parameters, see CalibrationSession.export_parameters
+PARAMETER_FILENAMES = ['intrinsics_first_camera', 'intrinsics_second_camera', 'extrinsics']
+# chunks of subsets per worker, more chunks give a smoother progress and a better balance
+CHUNKS_PER_WORKER = 4
+
+# number of subsets calibrated again without initial guess to compare them with the warm start, when the
+# comparison is asked for (it is off by default, it costs more than the calibrations it checks)
+WARM_START_PROBES = 3
+# default maximum number of iterations of the OpenCV calibrations
+DEFAULT_MAX_ITER = 30
+# default epsilon of the OpenCV calibrations for a single camera and for stereo
+DEFAULT_EPS = {False: np.finfo(np.float64).eps, True: 1e-6}
+
+# minimum number of calibrated groups before the adaptive mode can stop
+MIN_SUBSETS = 5
+# normal quantile of the confidence interval of the adaptive mode (95 %)
+CONFIDENCE_Z = 1.96
+# reasons to stop the calibration of groups, see ConvergenceMonitor
+STOP_ALL = 'all groups calibrated'
+STOP_CONVERGED = 'parameters converged'
+STOP_TIME = 'time budget reached'
+STOP_CANCELLED = 'cancelled'
+# change of the parameters in an incremental update below which the projections of the other poses are kept
+UPDATE_TOLERANCE = 1e-6
+# epsilon of the refinement of an incremental update, it starts close to the solution
+UPDATE_EPS = 1e-9
+# poses with an error above this multiple of the median error are outliers, see prune_outliers
+PRUNE_FACTOR = 3.0
+# maximum number of rounds of pruning and minimum number of poses kept
+PRUNE_MAX_ROUNDS = 10
+PRUNE_MIN_POSES = 4
+
+# points and settings shared by all the calibrations of subsets, see calibrate_subset
+# guess is None or the (camera matrices, distortion coefficients, R, T) used as initial values
+# criteria is None (OpenCV default) or the termination criteria of the calibration
+SubsetData = namedtuple('SubsetData', ['objpoints', 'imgpoints', 'stereo', 'image_size', 'flags', 'guess',
+                                       'criteria'])
+# result of the calibration of one subset, index is the position of the subset in samples
+# time is the wall time of the calibration in its worker
+SubsetResult = namedtuple('SubsetResult', ['index', 'rms', 'c', 'd', 'R', 'T', 'time'])
+# time of a calibration with warm start: full set solution, mean time per subset with and without warm start,
+# time of the comparison itself (calibrations without warm start and counts of iterations) and the total time saved
+# by the warm start minus the comparison (negative if it is slower)
+# iterations has the (index, iterations with warm start, iterations without) of each probe subset and max_iter the
+# limit of the iterations, a subset with max_iter iterations stopped by the limit instead of converging
+# without probes the values without warm start are None
+WarmStartReport = namedtuple('WarmStartReport', ['full_time', 'full_rms', 'subset_time', 'cold_time', 'probe_time',
+                                                 'saved_time', 'iterations', 'max_iter'])
+# result of the pruning of outliers: indices of the pruned poses before the pruning, their paths in each camera and
+# errors, rms of each camera before and after and number of rounds
+PruneReport = namedtuple('PruneReport', ['pruned', 'paths', 'errors', 'rms_before', 'rms_after', 'rounds'])
+
+# data of the calibrations of the worker processes, see init_calibration_worker
+_subset_data = None
+# some versions of OpenCV define CALIB_USE_EXTRINSIC_GUESS but don't support it for stereo
+_extrinsic_guess = hasattr(cv2, 'CALIB_USE_EXTRINSIC_GUESS')
+
+'''
+Function to create the 3D points of a pattern given its type, number of features and distance between features
+'''
+
+
+def object_points(pattern_type, p_height, p_width, f_distance):
+    object_pattern = None
+    # creates object from Chessboard pattern
+    if "Chessboard" in pattern_type:
+        object_pattern = np.zeros((p_width * p_height, 3), np.float32)
+        grid = np.mgrid[0:p_height, 0:p_width].T.reshape(-1, 2) * f_distance
+        object_pattern[:, 0] = -grid[:, 1]
+        object_pattern[:, 1] = grid[:, 0]
+    # creates object from Grid pattern
+    elif "Asymmetric Grid" in pattern_type:
+        pattern_size = (p_height, p_width)
+        object_pattern = np.zeros((np.prod(pattern_size), 3), np.float32)
+        object_pattern[:, :2] = np.fliplr(np.indices(pattern_size).T.reshape(-1, 2))
+        for i in range(np.prod(pattern_size)):
+            if object_pattern[i, 0] % 2 == 0:
+                object_pattern[i, 1] = object_pattern[i, 1] * f_distance
+                object_pattern[i, 0] = object_pattern[i, 0] * f_distance / 2
+            else:
+                object_pattern[i, 1] = object_pattern[i, 1] * f_distance + f_distance / 2
+                object_pattern[i, 0] = object_pattern[i, 0] * f_distance / 2
+    elif "Symmetric Grid" in pattern_type:
+        object_pattern = np.zeros((p_width * p_height, 3), np.float32)
+        grid = np.mgrid[0:p_height, 0:p_width].T.reshape(-1, 2) * f_distance
+        object_pattern[:, 0] = -grid[:, 1]
+        object_pattern[:, 1] = grid[:, 0]
+    return object_pattern
+
+
+'''
+Function to read the 3D points of a pattern from a text file of comma separated values
+Returns None if the file doesn't contain a set of 3D points
+'''
+
+
+def read_object_points(filename):
+    set_3D_points = np.fromfile(filename, dtype=np.float32, sep=',')
+    if len(set_3D_points) == 0 or len(set_3D_points) % 3 != 0:
+        return None
+    return set_3D_points.reshape((len(set_3D_points) // 3, 1, 3))
+
+
+'''
+Function to read the 2D points of a pose from a text file of comma separated values
+'''
+
+
+def read_image_points(filename):
+    a = np.fromfile(filename, dtype=np.float32, sep=',')
+    return a.reshape((len(a) // 2, 1, 2))
+
+
+'''
+Function to get the flags of the OpenCV calibration given the settings of the session
+'''
+
+
+def calibration_flags(intrinsics_guess=False, fix_point=False, fix_ratio=False, zero_tangent_distance=False):
+    return int(intrinsics_guess) * cv2.CALIB_USE_INTRINSIC_GUESS + \
+           int(fix_point) * cv2.CALIB_FIX_PRINCIPAL_POINT + \
+           int(fix_ratio) * cv2.CALIB_FIX_ASPECT_RATIO + \
+           int(zero_tangent_distance) * cv2.CALIB_ZERO_TANGENT_DIST
+
+
+'''
+Function to get the termination criteria of the calibration, eps 0 uses the OpenCV default of the mode
+'''
+
+
+def termination_criteria(max_iter=DEFAULT_MAX_ITER, eps=0, stereo=False):
+    if eps <= 0:
+        eps = DEFAULT_EPS[bool(stereo)]
+    return cv2.TERM_CRITERIA_COUNT + cv2.TERM_CRITERIA_EPS, int(max_iter), float(eps)
+
+
+'''
+Function to get the default number of worker processes for the calibration of subsets
+'''
+
+
+def default_calibration_workers():
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+'''
+Function to calibrate the cameras with the subset s of the poses
+With a list poses, the (rvec, tvec) of each pose of the subset are added to it per camera, in stereo mode only if
+the version of OpenCV returns them
+'''
+
+
+def calibrate_subset(data, s, poses=None):
+    global _extrinsic_guess
+    t_start = time.time()
+    op = list(data.objpoints[i] for i in s)
+    ip, c, d = [], [], []
+    for j in range(len(data.imgpoints)):
+        ip.append(list(data.imgpoints[j][i] for i in s))
+        c.append(np.eye(3, dtype=np.float32))
+        d.append(np.zeros((5, 1), dtype=np.float32))
+
+    R = None
+    T = None
+    flags = data.flags
+    # start from the given solution instead of the identity
+    if data.guess is not None:
+        c = [np.array(m, dtype=np.float64) for m in data.guess[0][:len(c)]]
+        d = [np.array(m, dtype=np.float64) for m in data.guess[1][:len(d)]]
+        flags |= cv2.CALIB_USE_INTRINSIC_GUESS
+        if data.stereo:
+            R = np.array(data.guess[2], dtype=np.float64)
+            T = np.array(data.guess[3], dtype=np.float64)
+            if _extrinsic_guess:
+                flags |= cv2.CALIB_USE_EXTRINSIC_GUESS
+    kwargs = {} if data.criteria is None else {'criteria': data.criteria}
+
+    if data.stereo:
+        # only the extended version returns the poses
+        stereo_calibrate = cv2.stereoCalibrateExtended if poses is not None else cv2.stereoCalibrate
+        if R is None:
+            R = np.eye(3)
+            T = np.zeros((3, 1))
+        try:
+            out = stereo_calibrate(op, ip[0], ip[1], c[0], d[0], c[1], d[1], data.image_size, R, T, flags=flags,
+                                   **kwargs)
+        except cv2.error:
+            if not (_extrinsic_guess and flags & cv2.CALIB_USE_EXTRINSIC_GUESS):
+                raise
+            _extrinsic_guess = False
+            flags &= ~cv2.CALIB_USE_EXTRINSIC_GUESS
+            out = stereo_calibrate(op, ip[0], ip[1], c[0], d[0], c[1], d[1], data.image_size, R, T, flags=flags,
+                                   **kwargs)
+        rms, c[0], d[0], c[1], d[1], R, T = out[:7]
+        # the number of outputs changes with the version of OpenCV, the poses come before the errors
+        if poses is not None and len(out) >= 12:
+            r, t = out[9], out[10]
+            # poses of the second camera from the ones of the first camera
+            r2 = [cv2.Rodrigues(np.dot(R, cv2.Rodrigues(r_i)[0]))[0] for r_i in r]
+            t2 = [np.dot(R, np.reshape(t_i, (3, 1))) + np.reshape(T, (3, 1)) for t_i in t]
+            poses.extend([list(zip(r, t)), list(zip(r2, t2))])
+    else:
+        rms, c[0], d[0], r, t = cv2.calibrateCamera(op, ip[0], data.image_size, c[0], d[0], flags=flags, **kwargs)
+        if poses is not None:
+            poses.append(list(zip(r, t)))
+    return rms, c, d, R, T, time.time() - t_start
+
+
+'''
+Function to count the iterations of the calibration of the subset s, OpenCV doesn't report them
+The calibration is deterministic, so the subset is calibrated again with fewer iterations (binary search) until the
+result differs from result, the (c, d, R, T) of the calibration with the criteria of data
+Returns the iterations and their limit
+'''
+
+
+def count_iterations(data, s, result):
+    criteria = data.criteria if data.criteria is not None else termination_criteria(stereo=data.stereo)
+    c, d, R, T = result
+    expected = [m for m in list(c) + list(d) + [R, T] if m is not None]
+
+    def converged(max_iter):
+        _, c, d, R, T, _ = calibrate_subset(data._replace(criteria=(criteria[0], max_iter, criteria[2])), s)
+        values = [m for m in list(c) + list(d) + [R, T] if m is not None]
+        return all(np.allclose(a, b, rtol=1e-12, atol=0) for a, b in zip(values, expected))
+
+    low, high = 1, criteria[1]
+    while low < high:
+        middle = (low + high) // 2
+        if converged(middle):
+            high = middle
+        else:
+            low = middle + 1
+    return low, criteria[1]
+
+
+'''
+Function to initialize a worker process of the calibration of subsets
+'''
+
+
+def init_calibration_worker(cv_threads, data):
+    global _subset_data
+    cv2.setNumThreads(cv_threads)
+    _subset_data = data
+
+
+'''
+Function to calibrate a chunk of (index, subset) pairs in a worker process
+'''
+
+
+def calibrate_chunk(chunk):
+    return [SubsetResult(index, *calibrate_subset(_subset_data, s)) for index, s in chunk]
+
+
+'''
+Function to calibrate all the subsets, serially or in a pool of processes
+Yields the results in order of completion, each chunk of subsets at once
+'''
+
+
+def calibrate_subsets(data, samples, workers=1):
+    chunks = []
+    if workers > 1 and len(samples) > 1:
+        workers = min(workers, len(samples))
+        size = max(1, len(samples) // (workers * CHUNKS_PER_WORKER))
+        indexed = list(enumerate(samples))
+        chunks = [indexed[i:i + size] for i in range(0, len(indexed), size)]
+    if len(chunks) <= 1:
+        for index, s in enumerate(samples):
+            yield [SubsetResult(index, *calibrate_subset(data, s))]
+        return
+    # split the cores between the workers, so the OpenCV threads don't oversubscribe them
+    cv_threads = max(1, (os.cpu_count() or 1) // workers)
+    logging.debug('Calibrating %d subsets with %d workers and %d OpenCV threads', len(samples), workers, cv_threads)
+    # the workers are spawned, see detection_tools.detect_features_parallel
+    pool = multiprocessing.get_context('spawn').Pool(workers, initializer=init_calibration_worker,
+                                                     initargs=(cv_threads, data))
+    try:
+        for results in pool.imap_unordered(calibrate_chunk, chunks):
+            yield results
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+class ConvergenceMonitor():
+    '''
+    Class to keep running statistics (Welford) of the parameters of the calibrated groups
+    The calibration can stop when the confidence interval of every mean is below the tolerance, relative to the
+    mean (absolute for means smaller than one), or when the time budget (seconds, None for no budget) is reached
+    '''
+
+    def __init__(self, tolerance, time_budget=None, min_subsets=MIN_SUBSETS, z=CONFIDENCE_Z):
+        self.tolerance = tolerance
+        self.time_budget = time_budget
+        self.min_subsets = min_subsets
+        self.z = z
+        self.n = 0
+        self.mean = None
+        self.m2 = None
+        self.stop_reason = STOP_ALL
+        self.time = chronometer()
+
+    def add(self, values):
+        '''
+        Function to add the parameters of a calibrated group
+        '''
+        values = np.asarray(values, dtype=np.float64)
+        if self.mean is None:
+            self.mean = np.zeros_like(values)
+            self.m2 = np.zeros_like(values)
+        self.n += 1
+        delta = values - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (values - self.mean)
+
+    def half_widths(self):
+        '''
+        Function to get the half width of the confidence interval of each mean
+        '''
+        if self.n < 2:
+            return None
+        return self.z * np.sqrt(self.m2 / (self.n - 1) / self.n)
+
+    def should_stop(self):
+        '''
+        Function to check if the calibration of groups can stop, updates the reason to stop
+        '''
+        if self.time_budget and self.time.gettime() >= self.time_budget:
+            self.stop_reason = STOP_TIME
+            return True
+        if self.n >= max(self.min_subsets, 2) and self.tolerance > 0:
+            if np.all(self.half_widths() <= self.tolerance * np.maximum(np.abs(self.mean), 1)):
+                self.stop_reason = STOP_CONVERGED
+                return True
+        return False
+
+
+'''
+Function to get the parameters followed by the adaptive mode: fx, fy, cx, cy, k1..k5 of each camera and stereo T
+'''
+
+
+def convergence_values(c, d, T):
+    values = []
+    for j in range(len(c)):
+        values += [c[j][0][0], c[j][1][1], c[j][0][2], c[j][1][2]] + list(np.ravel(d[j])[:5])
+    if T is not None:
+        values += list(np.ravel(T))
+    return values
+
+
+class CalibrationSession():
+    '''
+    Class with the data and the computations of a calibration session, independent of any GUI
+    The stages report their progress through an optional callback progress(fraction, elapsed_time)
+    '''
+
+    def __init__(self, stereo=False):
+        # total number of cameras
+        self.n_cameras = 0
+        self.m_stereo = stereo
+        # size for each camera (rows, columns), used for internal functions
+        self.size = [None, None]
+        # 3d points in real world space
+        self.objpoints = [[], []]
+        # 2d points in image plane
+        self.imgpoints = [[], []]
+        # 3d points for pattern type
+        self.object_pattern = None
+        self.p_width = None
+        self.p_height = None
+        self.f_distance = None
+        # files and detected features of each pose per camera
+        self.paths = [[], []]
+        self.detected_features = [[], []]
+        # array for all calibrations
+        self.fx_array = []
+        self.fy_array = []
+        self.cx_array = []
+        self.cy_array = []
+        self.k1_array = []
+        self.k2_array = []
+        self.k3_array = []
+        self.k4_array = []
+        self.k5_array = []
+        self.R_array = []
+        self.T_array = []
+        self.RMS_array = []
+        self.C_array = []
+        self.D_array = []
+        self.samples = None
+        # seed of the groups of poses, None for random groups
+        self.seed = None
+        # files of the first camera of the groups drawn last, kept by the next random draw with the same r
+        self.drawn_paths = []
+        # results of the calibrated groups by their poses and settings, see SubsetCache
+        self.subset_cache = SubsetCache()
+        # groups of the last calibration taken from the cache
+        self.n_cached = 0
+        # time of the last calibration with warm start, see WarmStartReport
+        self.warm_start_report = None
+        # groups drawn and reason to stop of the last calibration
+        self.n_drawn = 0
+        self.stop_reason = None
+        # standard deviation of the parameters over the groups (camera matrices, distortion, poses per group)
+        self.subset_deviation = None
+        # reprojection error of each view and camera of the last single-shot calibration
+        self.per_view_errors = None
+        # pose (rvec, tvec) of each pose per camera, None until it is solved, see calculate_projection
+        self.poses = [[], []]
+        self.reset_camera_parameters()
+        self.reset_error()
+        if stereo:
+            self.set_mode(stereo)
+
+    def set_mode(self, stereo):
+        '''
+        Function to set the session for one or two cameras
+        '''
+        self.m_stereo = stereo
+        self.n_cameras = 2 if stereo else 1
+
+    def set_pattern(self, pattern_type, p_height, p_width, f_distance):
+        '''
+        Function to set the pattern of the session and create its 3D points
+        '''
+        self.p_height = p_height
+        self.p_width = p_width
+        self.f_distance = f_distance
+        self.object_pattern = object_points(pattern_type, p_height, p_width, f_distance)
+
+    def load_object_pattern(self, filename):
+        '''
+        Function to load the 3D points of the pattern from a text file
+        '''
+        self.object_pattern = read_object_points(filename)
+        return self.object_pattern is not None
+
+    def n_poses(self):
+        return len(self.paths[0])
+
+    def add_features(self, camera, path, features):
+        '''
+        Function to add the features of a pose for one camera, None features are kept for rejected files
+        '''
+        self.paths[camera].append(path)
+        self.detected_features[camera].append(features)
+        self.poses[camera].append(None)
+
+    def add_points_file(self, camera, filename):
+        '''
+        Function to add a pose given by a text file of 2D points
+        '''
+        a = read_image_points(filename)
+        self.p_height = 1
+        self.p_width = len(a)
+        self.add_features(camera, filename, a)
+
+    def delete_pose(self, index):
+        '''
+        Function to delete a pose in all the cameras with its projections and errors
+        '''
+        for j in range(self.n_cameras):
+            del self.paths[j][index]
+            del self.detected_features[j][index]
+            del self.poses[j][index]
+            if self.projected[j]:  # check if projection data exists
+                del self.projected[j][index]
+            if j == 1:
+                if self.projected_stereo[0]:  # check if stereo projection data exists
+                    del self.projected_stereo[0][index]
+                    del self.projected_stereo[1][index]
+            if self.r_error[j]:  # check if reprojection error data exists
+                del self.r_error[j][index]
+                del self.r_error_p[j][index]
+
+    def delete_poses(self, indices):
+        '''
+        Function to delete several poses at once in all the cameras with their projections and errors
+        '''
+        indices = set(indices)
+        keep = [i for i in range(len(self.paths[0])) if i not in indices]
+        for j in range(self.n_cameras):
+            self.paths[j][:] = [self.paths[j][i] for i in keep]
+            self.detected_features[j][:] = [self.detected_features[j][i] for i in keep]
+            self.poses[j][:] = [self.poses[j][i] for i in keep]
+            if self.projected[j]:
+                self.projected[j][:] = [self.projected[j][i] for i in keep]
+            if j == 1 and self.projected_stereo[0]:
+                for k in range(2):
+                    self.projected_stereo[k][:] = [self.projected_stereo[k][i] for i in keep]
+            if self.r_error[j]:
+                self.r_error[j][:] = [self.r_error[j][i] for i in keep]
+                self.r_error_p[j][:] = [self.r_error_p[j][i] for i in keep]
+
+    def reset_error(self):
+        '''
+        Function to reset error related variables
+        '''
+        # array of rms error for each pose
+        self.r_error = [None, None]
+        # array of pixel distance error for each feature
+        self.r_error_p = [[], []]
+        # projections
+        self.projected = [[], []]
+        self.projected_stereo = [[], []]
+
+    def reset_camera_parameters(self):
+        '''
+        Function to reset all intrinsics and extrinsics parameters
+        '''
+        # camera matrix
+        # array of 2 of 3*3 for camera parameters (mean and standard deviation)
+        self.camera_matrix = [np.zeros((3, 3), dtype=np.float32), np.zeros((3, 3), dtype=np.float32)]
+        self.dev_camera_matrix = [np.zeros((3, 3), dtype=np.float32), np.zeros((3, 3), dtype=np.float32)]
+        # array of 2 of 5*1 for distortion parameters (mean and standard deviation)
+        self.dist_coefs = [np.zeros((5, 1), dtype=np.float32), np.zeros((5, 1), dtype=np.float32)]
+        self.dev_dist_coefs = [np.zeros((5, 1), dtype=np.float32), np.zeros((5, 1), dtype=np.float32)]
+        # rotational and translation matrix
+        self.R_stereo = np.zeros((3, 3), dtype=np.float32)
+        self.T_stereo = np.zeros((3, 1), dtype=np.float32)
+        # rms error
+        self.rms = [0, 0, 0]
+
+    def prepare_points(self):
+        '''
+        Function to collect the image and object points of all the poses for the calibration
+        '''
+        self.imgpoints = [[], []]
+        self.objpoints = []
+        for j in range(self.n_cameras):
+            for feature in self.detected_features[j]:
+                self.imgpoints[j].append(feature)
+                if j == 0:
+                    self.objpoints.append(self.object_pattern)
+
+    def size_offset(self):
+        '''
+        Function to get the camera with the smallest resolution and the offset (x, y) that centers its coordinates
+        in the image of the biggest resolution
+        '''
+        index_min = self.size.index(min(self.size))
+        index_max = self.size.index(max(self.size))
+        w_adj, h_adj = self.size[index_max]
+        w, h = self.size[index_min]
+        return index_min, np.float32([[(h_adj - h) / 2, (w_adj - w) / 2]])
+
+    def image_size(self):
+        '''
+        Function to get the image size (width, height) for the OpenCV calibration
+        '''
+        if self.m_stereo:
+            return max(self.size[0][1], self.size[1][1]), max(self.size[0][0], self.size[1][0])
+        return self.size[0][1], self.size[0][0]
+
+    def draw_samples(self, c_r, c_k, seed=None, keep_drawn=False):
+        '''
+        Function to choose c_k random groups of c_r poses for the calibrations, reproducible with a seed
+        With keep_drawn and without seed, the groups drawn last with c_r poses which still exist are kept first, so
+        with the subset cache a rerun with a larger c_k or after deleting a pose only calibrates the new groups,
+        otherwise every draw is independent of the previous one
+        Returns the number of groups, which is smaller than c_k when there are not enough combinations
+        '''
+        keep = None
+        if keep_drawn and seed is None:
+            index = dict((path, i) for i, path in enumerate(self.paths[0]))
+            keep = [sorted(index[p] for p in s) for s in self.drawn_paths
+                    if len(s) == c_r and all(p in index for p in s)]
+        self.samples, k = combination(len(self.objpoints), c_r, c_k, seed, keep)
+        self.seed = seed
+        self.drawn_paths = [[self.paths[0][i] for i in s] for s in self.samples]
+        return k
+
+    def calibration_data(self, flags, criteria=None):
+        '''
+        Function to get the points and settings for the calibrations, see SubsetData
+        '''
+        imgpoints = list(self.imgpoints[:self.n_cameras])
+        # move coordinates when images size are different
+        if self.m_stereo and self.size[0] != self.size[1]:
+            logging.debug('Different camera resolution')
+            index_min, offset = self.size_offset()
+            logging.debug('Transforming coordinates for camera %s', index_min + 1)
+            imgpoints[index_min] = [np.float32(p + offset) for p in imgpoints[index_min]]
+        return SubsetData(self.objpoints, imgpoints, self.m_stereo, self.image_size(), flags, None, criteria)
+
+    def calibrate_samples(self, flags, progress=None, workers=1, warm_start=False, criteria=None, monitor=None,
+                          cancel=None, checkpoint=None, resume=False, probes=0):
+        '''
+        Function to calibrate each group of poses in samples and store the result of every calibration
+        With more than one worker the groups are calibrated in a pool of processes, the results are stored in the
+        order of samples, so they are the same as for a serial run
+        With warm start, all the poses are calibrated first and every group starts from that solution, the poses of
+        that solution are stored for the projection, probes groups are compared with a calibration without it (see
+        compare_warm_start)
+        With a ConvergenceMonitor, the groups are added to it in the order of samples and the calibration stops
+        when the monitor says so, samples keeps only the groups used
+        When the event cancel (threading.Event) is set, the calibration stops after the current group (chunk of
+        groups for a pool) and keeps the groups calibrated in the order of samples, as for the monitor
+        With a checkpoint file, the finished groups are written to it every CHECKPOINT_INTERVAL seconds and when
+        the calibration stops, with resume the groups and the samples of a checkpoint of the same calibration are
+        used and only the missing groups are calibrated, the result is the same as for an uninterrupted run
+        The checkpoint is deleted when all the groups are calibrated or the parameters converge, it is kept when the
+        calibration is cancelled, fails or reaches its time budget
+        '''
+        time_play = chronometer()
+
+        self.reset_iterations()
+        self.warm_start_report = None
+
+        data = self.calibration_data(flags, criteria)
+        results = [None] * len(self.samples)
+        saver = None
+        if checkpoint is not None and self.samples:
+            saver = CalibrationCheckpoint(checkpoint, checkpoint_key(data, warm_start, len(self.samples[0]),
+                                                                     len(self.samples)))
+            saved = saver.load() if resume else None
+            if saved is not None:
+                self.samples, self.seed, saved_results = saved
+                # the groups drawn are the ones of the checkpoint, see draw_samples, n_drawn follows them below
+                self.drawn_paths = [[self.paths[0][i] for i in s] for s in self.samples]
+                for result in saved_results:
+                    results[result[0]] = SubsetResult(*result)
+                logging.info('Resuming %d of %d groups from %s', len(saved_results), len(results), checkpoint)
+
+        full = None
+        if warm_start:
+            poses = []
+            full = SubsetResult(None, *calibrate_subset(data, range(len(self.objpoints)), poses))
+            if full.rms != 0:
+                data = data._replace(guess=(full.c, full.d, full.R, full.T))
+                # the poses of the full set start the projection, see solve_pose
+                for j, camera_poses in enumerate(poses):
+                    self.poses[j] = camera_poses
+            else:
+                logging.warning('Calibration with all the images fails, subsets start without guess')
+
+        self.n_drawn = len(self.samples)
+        self.stop_reason = STOP_ALL
+        # groups calibrated before with the same poses and settings are taken from the cache
+        keys = None
+        self.n_cached = 0
+        if self.subset_cache is not None:
+            identities = pose_identities(data)
+            settings = settings_key(data)
+            keys = [subset_key(identities, s, settings) for s in self.samples]
+            for i, result in enumerate(results):
+                if result is None:
+                    cached = self.subset_cache.get(keys[i])
+                    if cached is not None:
+                        results[i] = SubsetResult(i, *cached)
+                        self.n_cached += 1
+        # groups of a checkpoint or of the cache are skipped, the results of the others are moved to their index
+        missing = [i for i, result in enumerate(results) if result is None]
+        counter = len(results) - len(missing)
+        time_checkpoint = chronometer()
+        # groups are added to the monitor in order, so the stop doesn't depend on the order of completion
+        n_used = 0
+        completed = False
+        try:
+            # the empty chunk first adds the groups of the checkpoint to the monitor
+            for chunk in itertools.chain([[]], calibrate_subsets(data, [self.samples[i] for i in missing], workers)):
+                for result in chunk:
+                    results[missing[result.index]] = result._replace(index=missing[result.index])
+                    if keys is not None:
+                        self.subset_cache.put(keys[missing[result.index]], tuple(result[1:]))
+                counter += len(chunk)
+                if progress is not None and chunk:
+                    progress(counter / float(len(self.samples)), time_play.gettime())
+                stop = False
+                while n_used < len(results) and results[n_used] is not None and not stop:
+                    result = results[n_used]
+                    n_used += 1
+                    if monitor is not None:
+                        if result.rms != 0:
+                            monitor.add(convergence_values(result.c, result.d, result.T))
+                        stop = monitor.should_stop()
+                if stop:
+                    self.stop_reason = monitor.stop_reason
+                    break
+                if cancel is not None and cancel.is_set() and counter < len(self.samples):
+                    self.stop_reason = STOP_CANCELLED
+                    break
+                if saver is not None and time_checkpoint.gettime() > CHECKPOINT_INTERVAL:
+                    saver.save(self.samples, self.seed, [r for r in results if r is not None])
+                    time_checkpoint = chronometer()
+            completed = self.stop_reason in (STOP_ALL, STOP_CONVERGED)
+        finally:
+            # the checkpoint of a finished calibration isn't needed anymore
+            if saver is not None and completed:
+                saver.remove()
+            elif saver is not None:
+                saver.save(self.samples, self.seed, [r for r in results if r is not None])
+            if self.subset_cache is not None:
+                self.subset_cache.save()
+        if self.stop_reason != STOP_ALL:
+            results = results[:n_used]
+            self.samples = self.samples[:n_used]
+
+        for result in results:
+            if result.rms != 0:
+                self.add_calibration(result.c, result.d, result.R, result.T, result.rms)
+
+        if data.guess is not None and results and self.stop_reason != STOP_CANCELLED:
+            self.warm_start_report = self.compare_warm_start(data, full, results, probes)
+
+    def compare_warm_start(self, data, full, results, probes=WARM_START_PROBES):
+        '''
+        Function to compare the warm start with the calibration without guess in the first probes groups, they are
+        calibrated again without guess for the time saved and their iterations are counted with and without guess
+        (see count_iterations), which takes a few more calibrations of each group
+        The time saved is the one of all the groups minus the calibration of all the poses and the comparison itself
+        Without probes only the times of the calibration with warm start are reported
+        '''
+        subset_time = np.mean([r.time for r in results])
+        probes = [r for r in results[:probes] if r.rms != 0]
+        if not probes:
+            return WarmStartReport(full.time, full.rms, subset_time, None, None, None, [], None)
+        t_start = time.time()
+        cold_data = data._replace(guess=None)
+        cold = [calibrate_subset(cold_data, self.samples[r.index]) for r in probes]
+        cold_time = np.mean([r[-1] for r in cold])
+        iterations = []
+        max_iter = None
+        for r, r_cold in zip(probes, cold):
+            s = self.samples[r.index]
+            warm_iter, max_iter = count_iterations(data, s, (r.c, r.d, r.R, r.T))
+            cold_iter, _ = count_iterations(cold_data, s, r_cold[1:5])
+            iterations.append((r.index, warm_iter, cold_iter))
+        probe_time = time.time() - t_start
+        saved_time = (cold_time - subset_time) * len(results) - full.time - probe_time
+        return WarmStartReport(full.time, full.rms, subset_time, cold_time, probe_time, saved_time, iterations,
+                               max_iter)
+
+    def reset_iterations(self):
+        '''
+        Function to forget the results of the calibrated groups
+        '''
+        self.C_array = []
+        self.D_array = []
+        self.R_array = []
+        self.T_array = []
+        self.fx_array = [[], []]
+        self.fy_array = [[], []]
+        self.cx_array = [[], []]
+        self.cy_array = [[], []]
+        self.k1_array = [[], []]
+        self.k2_array = [[], []]
+        self.k3_array = [[], []]
+        self.k4_array = [[], []]
+        self.k5_array = [[], []]
+        self.RMS_array = []
+
+    def add_calibration(self, c, d, R, T, rms):
+        '''
+        Function to store the result of the calibration of one group of poses
+        '''
+        # add to matrices
+        self.C_array.append(c)
+        self.D_array.append(d)
+        self.RMS_array.append(rms)
+        if self.m_stereo:
+            self.R_array.append(R)
+            self.T_array.append(T)
+        # add to iteration array
+        for j in range(self.n_cameras):
+            self.fx_array[j].append(c[j][0][0])
+            self.fy_array[j].append(c[j][1][1])
+            self.cx_array[j].append(c[j][0][2])
+            self.cy_array[j].append(c[j][1][2])
+            self.k1_array[j].append(d[j][0][0])
+            self.k2_array[j].append(d[j][1][0])
+            self.k3_array[j].append(d[j][2][0])
+            self.k4_array[j].append(d[j][3][0])
+            self.k5_array[j].append(d[j][4][0])
+
+    def average_calibrations(self):
+        '''
+        Function to get the camera parameters as the mean of all the calibrations and their standard deviation
+        '''
+        if len(self.C_array) > 1:
+            # spread of the groups, kept for the comparison with the single-shot uncertainty
+            self.subset_deviation = (np.std(np.array(self.C_array), axis=0), np.std(np.array(self.D_array), axis=0),
+                                     len(self.samples[0]))
+        if len(self.C_array) > 0:
+            self.camera_matrix = np.mean(np.array(self.C_array), axis=0)
+            self.dist_coefs = np.mean(np.array(self.D_array), axis=0)
+            self.dev_camera_matrix = np.std(np.array(self.C_array), axis=0)
+            self.dev_dist_coefs = np.std(np.array(self.D_array), axis=0)
+            if self.m_stereo:
+                self.R_stereo = averageMatrix(self.R_array)
+                self.T_stereo = np.mean(np.array(self.T_array), axis=0)
+                # Correction for cx and cy parameters
+                if self.size[0] != self.size[1]:
+                    index_min, offset = self.size_offset()
+                    logging.debug('Correcting cx an cy for camera {0}'.format(index_min + 1))
+                    self.camera_matrix[index_min][0][2] -= offset[0][0]
+                    self.camera_matrix[index_min][1][2] -= offset[0][1]
+        else:
+            self.reset_camera_parameters()
+
+    def calibrate_single_shot(self, flags, criteria=None, cancel=None):
+        '''
+        Function to calibrate with all the poses at once, the standard deviations of the intrinsics are the ones
+        estimated by OpenCV from the Jacobian of the solution
+        In stereo mode each camera is calibrated first (its deviations) and the stereo calibration only estimates R
+        and T with those intrinsics fixed, so the deviations belong to the solution, OpenCV doesn't estimate
+        deviations for the stereo calibration, so R and T have none
+        When the event cancel (threading.Event) is set, the calibration stops before the next camera (or the stereo
+        calibration) and the session keeps its previous calibration
+        Returns False if the calibration fails or is cancelled
+        '''
+        data = self.calibration_data(flags, criteria)
+        kwargs = {} if criteria is None else {'criteria': criteria}
+        n = len(self.objpoints)
+        c, d, std, errors, poses = [], [], [], [], []
+        for j in range(self.n_cameras):
+            if cancel is not None and cancel.is_set():
+                return False
+            rms, c_j, d_j, r, t, std_intrinsics, std_extrinsics, per_view = cv2.calibrateCameraExtended(
+                self.objpoints, data.imgpoints[j], data.image_size, np.eye(3), np.zeros((5, 1)), flags=flags,
+                **kwargs)
+            if rms == 0:
+                logging.error('Calibration fails')
+                return False
+            c.append(c_j)
+            d.append(d_j)
+            poses.append(list(zip(r, t)))
+            std.append(np.ravel(std_intrinsics))
+            errors.append(np.ravel(per_view))
+        R = None
+        T = None
+        rms_all = rms
+        if self.m_stereo:
+            if cancel is not None and cancel.is_set():
+                return False
+            out = cv2.stereoCalibrateExtended(self.objpoints, data.imgpoints[0], data.imgpoints[1], c[0], d[0], c[1],
+                                              d[1], data.image_size, np.eye(3), np.zeros((3, 1)),
+                                              flags=flags | cv2.CALIB_FIX_INTRINSIC, **kwargs)
+            # the number of outputs changes with the version of OpenCV, the errors are always the last one
+            rms_all, c[0], d[0], c[1], d[1], R, T = out[:7]
+            errors = [np.ravel(e) for e in np.asarray(out[-1]).reshape(-1, 2).T]
+            if rms_all == 0:
+                logging.error('Calibration fails')
+                return False
+        self.samples = [list(range(n))]
+        self.n_drawn = 1
+        self.stop_reason = STOP_ALL
+        for j in range(self.n_cameras):
+            self.poses[j] = poses[j]
+        self.per_view_errors = errors
+
+        # store the solution as the only group, so the export per iteration keeps working
+        self.reset_iterations()
+        self.add_calibration(c, d, R, T, rms_all)
+        self.average_calibrations()
+
+        # standard deviations: fx, fy, cx, cy and then the distortion coefficients
+        for j in range(self.n_cameras):
+            self.dev_camera_matrix[j] = np.zeros((3, 3))
+            self.dev_camera_matrix[j][0][0] = std[j][0]
+            self.dev_camera_matrix[j][1][1] = std[j][1]
+            self.dev_camera_matrix[j][0][2] = std[j][2]
+            self.dev_camera_matrix[j][1][2] = std[j][3]
+            self.dev_dist_coefs[j] = std[j][4:9].reshape((5, 1))
+        return True
+
+    def uncertainty_report(self):
+        '''
+        Function to get a text with the single-shot standard deviations against the spread of the groups
+        The spread of groups of r poses is also scaled by sqrt(r / n), the expected deviation for n poses
+        '''
+        names = ['fx', 'fy', 'cx', 'cy', 'k1', 'k2', 'k3', 'k4', 'k5']
+        rows = []
+        for j in range(self.n_cameras):
+            analytic = [self.dev_camera_matrix[j][0][0], self.dev_camera_matrix[j][1][1],
+                        self.dev_camera_matrix[j][0][2], self.dev_camera_matrix[j][1][2]] + \
+                       list(np.ravel(self.dev_dist_coefs[j]))
+            subset = None
+            scale = None
+            if self.subset_deviation is not None:
+                c_std, d_std, r = self.subset_deviation
+                subset = [c_std[j][0][0], c_std[j][1][1], c_std[j][0][2], c_std[j][1][2]] + list(np.ravel(d_std[j]))
+                scale = np.sqrt(r / float(len(self.objpoints)))
+            for i, name in enumerate(names):
+                rows.append(('%s cam %d' % (name, j + 1), analytic[i], None if subset is None else subset[i],
+                             None if subset is None else subset[i] * scale))
+        views = []
+        if self.per_view_errors is not None:
+            for j, errors in enumerate(self.per_view_errors):
+                worst = np.argsort(errors)[::-1][:5]
+                views.append((j + 1, float(np.mean(errors)), [(self.paths[j][i], float(errors[i])) for i in worst]))
+        return datastring.uncertainty2string(rows, views)
+
+    def calibrate(self, c_r, c_k, flags, progress=None, workers=1, warm_start=False, criteria=None, monitor=None,
+                  cancel=None, checkpoint=None, resume=False, probes=0):
+        '''
+        Function to run all the stages of the calibration for c_k groups of c_r poses
+        Returns False if the calibration fails
+        '''
+        self.prepare_points()
+        self.draw_samples(c_r, c_k)
+        self.calibrate_samples(flags, progress, workers, warm_start, criteria, monitor, cancel, checkpoint, resume,
+                               probes)
+        self.average_calibrations()
+        if not self.has_intrinsics():
+            self.reset_camera_parameters()
+            self.reset_error()
+            return False
+        self.calculate_projection()
+        self.calculate_error(progress)
+        if not self.error_is_finite():
+            logging.warning('Error is too high')
+            self.reset_camera_parameters()
+            self.reset_error()
+            return False
+        return True
+
+    def parameters(self):
+        '''
+        Function to get the camera matrices, the distortion coefficients, R and T in a list
+        '''
+        return list(self.camera_matrix[:self.n_cameras]) + list(self.dist_coefs[:self.n_cameras]) + [
+            self.R_stereo, self.T_stereo]
+
+    def update_calibration(self, flags, criteria=None, added=(), refine=False, tolerance=UPDATE_TOLERANCE):
+        '''
+        Function to update the calibration after a few poses are added (indices in added) or deleted, without a
+        full solve
+        The camera parameters are kept, only the new poses are solved and projected and only their errors are
+        calculated, the rms of each camera uses the errors of all the poses
+        With refine, the parameters are first refined with all the poses (see refine_calibration) and all the poses
+        are projected again if the parameters changed more than tolerance
+        Returns False if the update fails
+        '''
+        self.prepare_points()
+        changed = False
+        if refine:
+            before = [np.array(m, dtype=np.float64) for m in self.parameters()]
+            if not self.refine_calibration(flags, criteria):
+                return False
+            changed = not all(np.allclose(np.reshape(b, np.shape(a)), a, rtol=tolerance, atol=tolerance)
+                              for a, b in zip(self.parameters(), before))
+        # without the errors of all the other poses, all the poses are projected
+        indices = None
+        if not changed and self.r_error[0] is not None and len(self.r_error[0]) + len(added) == len(self.objpoints):
+            indices = list(added)
+        self.calculate_projection(indices=indices)
+        self.calculate_error(indices=indices)
+        return self.error_is_finite()
+
+    def refine_calibration(self, flags, criteria=None):
+        '''
+        Function to refine the camera parameters with all the poses starting from the current ones
+        The refined solution replaces the calibrated groups as the only one, as for the single-shot calibration, the
+        refinement doesn't estimate deviations so they are zero
+        The stored poses can't seed it, calibrateCamera solves the initial pose of each view itself (it ignores
+        CALIB_USE_EXTRINSIC_GUESS) and stereoCalibrate only takes a guess of R and T
+        Returns False if the refinement fails
+        '''
+        if criteria is None:
+            criteria = termination_criteria(DEFAULT_MAX_ITER, UPDATE_EPS, self.m_stereo)
+        data = self.calibration_data(flags, criteria)
+        flags |= cv2.CALIB_USE_INTRINSIC_GUESS
+        c = [np.array(m, dtype=np.float64) for m in self.camera_matrix[:self.n_cameras]]
+        d = [np.array(m, dtype=np.float64).reshape((5, 1)) for m in self.dist_coefs[:self.n_cameras]]
+        # the stored cx and cy are corrected for the size of the image, see average_calibrations
+        if self.m_stereo and self.size[0] != self.size[1]:
+            index_min, offset = self.size_offset()
+            c[index_min][0][2] += offset[0][0]
+            c[index_min][1][2] += offset[0][1]
+        poses = []
+        for j in range(self.n_cameras):
+            rms, c[j], d[j], r, t = cv2.calibrateCamera(self.objpoints, data.imgpoints[j], data.image_size, c[j],
+                                                        d[j], flags=flags, criteria=criteria)
+            if rms == 0:
+                logging.error('Calibration fails')
+                return False
+            poses.append(list(zip(r, t)))
+        R = None
+        T = None
+        if self.m_stereo:
+            # the extrinsics start from the current ones where OpenCV supports it, see calibrate_subset
+            guess = (c, d, self.R_stereo, self.T_stereo)
+            rms, c, d, R, T, _ = calibrate_subset(data._replace(flags=flags, guess=guess), range(len(self.objpoints)))
+            if rms == 0:
+                logging.error('Calibration fails')
+                return False
+        for j in range(self.n_cameras):
+            self.poses[j] = poses[j]
+        n = len(self.objpoints)
+        self.samples = [list(range(n))]
+        self.n_drawn = 1
+        self.stop_reason = STOP_ALL
+        self.subset_deviation = None
+        self.per_view_errors = None
+        self.warm_start_report = None
+        self.reset_iterations()
+        self.add_calibration(c, [m.reshape((5, 1)) for m in d], R, T, rms)
+        self.average_calibrations()
+        return True
+
+    def prune_outliers(self, flags, criteria=None, factor=PRUNE_FACTOR, max_rounds=PRUNE_MAX_ROUNDS,
+                       min_poses=PRUNE_MIN_POSES, progress=None, cancel=None):
+        '''
+        Function to delete the poses whose error (the largest of the cameras) is above factor times the median
+        error, the calibration is refined without them from the current one (see update_calibration) and the
+        errors are checked again until there are no outliers, after max_rounds or when only min_poses are left
+        The refined solution replaces the current one, see refine_calibration
+        progress gets the fraction of max_rounds done, when the event cancel is set the pruning stops before the
+        next round
+        Returns a PruneReport, or None if there is no calibration to prune
+        '''
+        if not self.has_intrinsics():
+            return None
+        self.prepare_points()
+        if not self.objpoints:
+            return None
+        if self.r_error[0] is None or len(self.r_error[0]) != len(self.objpoints):
+            self.calculate_projection()
+            self.calculate_error()
+        rms_before = list(self.rms)
+        # index of each remaining pose before the pruning
+        original = list(range(len(self.objpoints)))
+        pruned = []
+        paths = []
+        errors = []
+        rounds = 0
+        time_prune = chronometer()
+        while rounds < max_rounds:
+            if cancel is not None and cancel.is_set():
+                break
+            pose_error = np.max([self.r_error[j] for j in range(self.n_cameras)], axis=0)
+            threshold = factor * np.median(pose_error)
+            # the worst poses first, without going below min_poses
+            outliers = [i for i in np.argsort(pose_error)[::-1] if pose_error[i] > threshold]
+            outliers = outliers[:max(0, len(pose_error) - min_poses)]
+            if not outliers:
+                break
+            rounds += 1
+            for i in outliers:
+                pruned.append(original[i])
+                paths.append([self.paths[j][i] for j in range(self.n_cameras)])
+                errors.append(float(pose_error[i]))
+            self.delete_poses(outliers)
+            outliers = set(outliers)
+            original = [o for i, o in enumerate(original) if i not in outliers]
+            if not self.update_calibration(flags, criteria, refine=True):
+                logging.error('Calibration fails while pruning outliers')
+                break
+            if progress is not None:
+                progress(rounds / float(max_rounds), time_prune.gettime())
+        return PruneReport(pruned, paths, errors, rms_before, list(self.rms), rounds)
+
+    def calibrate_extrinsics(self, flags):
+        '''
+        Function to calculate the extrinsics between the cameras with fixed intrinsics
+        Returns False if the calibration fails
+        '''
+        # TODO: Adjust for different sizes in Load mode
+        rms, self.camera_matrix[0], self.dist_coefs[0], self.camera_matrix[1], self.dist_coefs[
+            1], R, T, E, F = cv2.stereoCalibrate(self.objpoints, self.imgpoints[0],
+                                                 self.imgpoints[1], self.camera_matrix[0],
+                                                 self.dist_coefs[0], self.camera_matrix[1],
+                                                 self.dist_coefs[1], self.image_size(),
+                                                 flags=cv2.CALIB_FIX_INTRINSIC + flags)
+        if rms != 0:
+            self.R_stereo = R
+            self.T_stereo = T
+            return True
+        logging.error('Calibration fails')
+        return False
+
+    def has_intrinsics(self):
+        '''
+        Function to check that the intrinsics of all the cameras were calculated or loaded
+        '''
+        for i in range(self.n_cameras):
+            if self.camera_matrix[i][0][0] == 0 or self.camera_matrix[i][0][0] == 1:
+                logging.debug('Data for camera %s not available', i + 1)
+                return False
+        return True
+
+    def error_is_finite(self):
+        for e in self.rms:
+            if e == float("inf") or e == float("-inf"):
+                return False
+        return True
+
+    def solve_pose(self, j, i):
+        '''
+        Function to get the pose of pose i in camera j for the current camera parameters
+        A stored pose is refined from its value, only poses without one are solved with RANSAC
+        '''
+        c = self.camera_matrix[j]
+        d = self.dist_coefs[j]
+        pose = self.poses[j][i] if i < len(self.poses[j]) else None
+        if pose is not None:
+            ok, r1, t1 = cv2.solvePnP(self.objpoints[i], self.imgpoints[j][i], c, d, np.array(pose[0], np.float64),
+                                      np.array(pose[1], np.float64), useExtrinsicGuess=True)
+        else:
+            ok, r1, t1, _ = cv2.solvePnPRansac(self.objpoints[i], self.imgpoints[j][i], c, d)
+        if ok and i < len(self.poses[j]):
+            self.poses[j][i] = (r1, t1)
+        return r1, t1
+
+    def calculate_projection(self, r=None, t=None, indices=None):
+        '''
+        Function to project the 3D points of each pose with the camera parameters
+        Without r and t, the pose is estimated from the detected features
+        The points of all the poses are moved to the frame of the camera and projected in one call, in stereo mode
+        they are also moved to the frame of the other camera with the same R and T for all the poses
+        With indices, only those poses are projected and the projections of the others are kept
+        '''
+        op = self.objpoints
+        if indices is None:
+            indices = range(len(op))
+        c = self.camera_matrix
+        d = self.dist_coefs
+        if self.m_stereo:
+            # transformation from each camera to the other one
+            R_inv = np.linalg.inv(self.R_stereo)
+            to_other = [(np.asarray(self.R_stereo, np.float64), np.asarray(self.T_stereo, np.float64).reshape(1, 3)),
+                        (R_inv, -np.dot(R_inv, self.T_stereo).reshape(1, 3))]
+
+        for j in range(self.n_cameras):
+            if len(indices) == len(op):
+                self.projected[j] = []
+                self.projected_stereo[(j + 1) % 2] = []
+            # projections of new poses are added at their index
+            self.projected[j] = list(self.projected[j]) + [None] * (len(op) - len(self.projected[j]))
+            if self.m_stereo:
+                other = self.projected_stereo[(j + 1) % 2]
+                self.projected_stereo[(j + 1) % 2] = list(other) + [None] * (len(op) - len(other))
+            if len(indices) == 0:
+                continue
+            points = []
+            for i in indices:
+                if not r:
+                    r1, t1 = self.solve_pose(j, i)
+                else:
+                    r1 = r[j][i]
+                    t1 = t[j][i]
+                # 3D points in the frame of camera j
+                p = np.asarray(op[i], np.float64).reshape(-1, 3)
+                points.append(np.dot(p, cv2.Rodrigues(r1)[0].T) + np.reshape(t1, (1, 3)))
+            splits = np.cumsum([len(p) for p in points])[:-1]
+            points = np.concatenate(points)
+            zero = np.zeros((3, 1))
+
+            imgpoints2, _ = cv2.projectPoints(points, zero, zero, c[j], d[j])
+            for i, projection in zip(indices, np.split(imgpoints2, splits)):
+                self.projected[j][i] = projection
+
+            if self.m_stereo:
+                R, T = to_other[j]
+                imgpoints2, _ = cv2.projectPoints(np.dot(points, R.T) + T, zero, zero, c[(j + 1) % 2], d[(j + 1) % 2])
+                for i, projection in zip(indices, np.split(imgpoints2, splits)):
+                    self.projected_stereo[(j + 1) % 2][i] = projection
+
+    def calculate_error(self, progress=None, indices=None):
+        '''
+        Function to calculate the reprojection error of each pose and the rms error of each camera
+        The poses of a camera are stacked in arrays (n_poses, n_points, 1, 2) and their errors computed at once,
+        progress is called once per camera
+        With indices, only the errors of those poses are calculated, the rms uses the errors of all the poses
+        '''
+        time_error = chronometer()
+        for j in range(self.n_cameras):
+            n = len(self.imgpoints[j])
+            if indices is None or self.r_error[j] is None:
+                index = list(range(n))
+                r_error = [None] * n
+                r_error_p = [None] * n
+            else:
+                index = list(indices)
+                r_error = list(self.r_error[j]) + [None] * (n - len(self.r_error[j]))
+                r_error_p = list(self.r_error_p[j]) + [None] * (n - len(self.r_error_p[j]))
+            if index:
+                projections = self.projected_stereo[j] if self.m_stereo else self.projected[j]
+                imgpoints2 = np.stack([projections[i] for i in index])
+                # detected features can be (n_points, 2) or (n_points, 1, 2) as the projections
+                ip = np.stack([self.imgpoints[j][i] for i in index]).reshape(imgpoints2.shape)
+                # distance of each feature (n_poses, n_points, 1) and rms of each pose
+                distance = np.linalg.norm(ip - imgpoints2, axis=-1)
+                pose_error = np.sqrt(np.square(distance).reshape(len(ip), -1).mean(axis=1))
+                for i, distance_i, error_i in zip(index, distance, pose_error):
+                    r_error_p[i] = distance_i
+                    r_error[i] = error_i
+            self.r_error[j] = r_error
+            self.r_error_p[j] = r_error_p
+            if n > 0:
+                logging.info("Updating RMS for camera %d", j + 1)
+                self.rms[j] = np.sqrt(np.sum(np.square(self.r_error[j])) / len(self.r_error[j]))
+                if j == 1:
+                    self.rms[2] = np.sqrt(np.sum(np.square(self.r_error[0] + self.r_error[1])) / len(
+                        self.r_error[0] + self.r_error[1]))
+            if progress is not None:
+                progress((j + 1) / float(self.n_cameras), time_error.gettime())
+
+    def load_parameters(self, j, filename):
+        '''
+        Function to load the intrinsics of camera j (0, 1) or the extrinsics (2) from a text file
+        '''
+        with open(filename, 'r') as f:
+            a = f.read()
+        if j <= 1:
+            self.camera_matrix[j], self.dist_coefs[j] = datastring.string2intrinsic(a)
+        else:
+            self.R_stereo, self.T_stereo = datastring.string2extrinsic(a)
+        self.rms = [0, 0, 0]
+        self.reset_error()
+
+    def export_parameters(self, j, filename):
+        '''
+        Function to export the intrinsics of camera j (0, 1) or the extrinsics (2) to a text file
+        '''
+        with open(filename, 'w') as f:
+            if j < 2:
+                f.write(datastring.instrinsic2string(self.camera_matrix[j], self.dist_coefs[j]))
+            else:
+                f.write(datastring.extrinsic2string(self.R_stereo, self.T_stereo))
+
+    def export_iterations(self, path_folder):
+        '''
+        Function to export the calibration results per iteration to a folder
+        '''
+        for j in range(self.n_cameras):
+            for name, values in (('fx', self.fx_array), ('fy', self.fy_array), ('cx', self.cx_array),
+                                 ('cy', self.cy_array), ('k1', self.k1_array), ('k2', self.k2_array),
+                                 ('k3', self.k3_array), ('k4', self.k4_array), ('k5', self.k5_array)):
+                filename = name + '_cam_' + str(j + 1) + '.txt'
+                np.array(values[j]).tofile(os.path.join(path_folder, filename), "\n")
+            if j == 1:
+                with open(os.path.join(path_folder, 'rotation.txt'), 'w') as f:
+                    for r in self.R_array:
+                        f.write(','.join(str(e) for e in r) + '\n')
+                with open(os.path.join(path_folder, 'translation.txt'), 'w') as f:
+                    for t in self.T_array:
+                        f.write(','.join(str(e[0]) for e in t) + '\n')
+
+        np.array(self.RMS_array).tofile(os.path.join(path_folder, 'rms.txt'), "\n")
+        with open(os.path.join(path_folder, 'summary.txt'), 'w') as f:
+            f.write('Groups used: %d of %d\n' % (len(self.samples), self.n_drawn))
+            f.write('Stop reason: %s\n' % self.stop_reason)
+        with open(os.path.join(path_folder, 'samples.txt'), 'w') as f:
+            for s in self.samples:
+                f.write("[")
+                for j in range(self.n_cameras):
+                    if j == 1:
+                        f.write(",")
+                    f.write("[")
+                    l_paths_s = list(self.paths[j][i] for i in s)
+                    f.write(','.join(str(e) for e in l_paths_s))
+                    f.write("]")
+                f.write("]")
+                f.write("\n")
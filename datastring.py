@@ -45,3 +45,44 @@ def string2extrinsic(text):
     for i in range(3):
         T[i] = text[i + 5 + 1]
     return R, T
+
+
+def backends2string(reports):
+    s_row = '%-25s%10s%12s%12s%12s'
+    A = s_row % ('Backend', 'Detected', 'Total (s)', 'Image (s)', 'RMS (px)')
+    B = '\n'.join(s_row % (r.backend, '%d/%d' % (r.detected, r.n_images), '%0.4f' % r.total_time,
+                            '%0.4f' % (r.total_time / max(r.n_images, 1)), '%0.5f' % r.rms) for r in reports)
+    return A + '\n' + B
+
+
+def uncertainty2string(rows, views):
+    s_row = '%-12s%14s%14s%18s'
+    A = s_row % ('Parameter', 'Single-shot', 'Groups', 'Groups sqrt(r/n)')
+    B = '\n'.join(s_row % (name, '%0.6f' % analytic, '-' if subset is None else '%0.6f' % subset,
+                            '-' if scaled is None else '%0.6f' % scaled) for name, analytic, subset, scaled in rows)
+    C = '\n'.join('Camera %d, mean error per view %0.5f, worst views:\n' % (j, mean) +
+                  '\n'.join('  %0.5f  %s' % (e, path) for path, e in worst) for j, mean, worst in views)
+    return A + '\n' + B + ('\n\n' + C if C else '')
+
+
+def pruning2string(report):
+    s_row = '%-10s%14s%14s'
+    names = ['Camera 1', 'Camera 2', 'Total']
+    A = s_row % ('RMS', 'Before', 'After')
+    B = '\n'.join(s_row % (name, '%0.5f' % before, '%0.5f' % after)
+                  for name, before, after in zip(names, report.rms_before, report.rms_after) if before)
+    C = 'Pruned poses: %d in %d rounds' % (len(report.pruned), report.rounds)
+    D = '\n'.join('  %0.5f  %s' % (e, '  '.join(str(p) for p in paths)) for paths, e in zip(report.paths,
+                                                                                             report.errors))
+    return A + '\n' + B + '\n\n' + C + ('\n' + D if D else '')
+
+
+def warmstart2string(report):
+    A = 'Warm start: all images %0.5f s, time per group %0.5f s' % (report.full_time, report.subset_time)
+    if report.cold_time is None:
+        return A
+    A += ' (%0.5f s without warm start), comparison %0.5f s, saved %0.5f s' % (report.cold_time, report.probe_time,
+                                                                                 report.saved_time)
+    B = 'Iterations with / without warm start (limit %d): ' % report.max_iter + \
+        ', '.join('group %d %d / %d' % (index + 1, warm, cold) for index, warm, cold in report.iterations)
+    return A + '\n' + B
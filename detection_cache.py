@@ -0,0 +1,123 @@
+import logging
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+logging.basicConfig(level=logging.ERROR)
+
+# name of the cache file inside each session directory
+CACHE_FILENAME = '.mrt_detection_cache.npz'
+# name of the array with the keys ordered from the least to the most recently used
+ORDER_NAME = 'lru_order'
+
+
+class DetectionCache():
+    '''
+    Class to keep the detected features of the images of a directory on disk
+    The features are stored by key (content of the file and detection parameters, see detection_tools.content_key)
+    in one compressed file per directory, rejected images are stored with an empty array of features
+    '''
+
+    def __init__(self, directory, max_entries=10000):
+        self.path = os.path.join(directory, CACHE_FILENAME)
+        self.max_entries = max_entries
+        # features for each key, from the least to the most recently used
+        self.entries = OrderedDict()
+        self.modified = False
+        self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def load(self):
+        '''
+        Function to read the cache file of the directory, a missing or broken file gives an empty cache
+        '''
+        self.entries.clear()
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                for key in data[ORDER_NAME]:
+                    self.entries[str(key)] = data[str(key)]
+        except (IOError, OSError, KeyError, ValueError):
+            logging.warning('Detection cache %s could not be read', self.path)
+            self.entries.clear()
+
+    def get(self, key):
+        '''
+        Function to get the features for a key, None if the key isn't cached
+        '''
+        features = self.entries.get(key)
+        if features is not None:
+            self.entries.move_to_end(key)
+            self.modified = True
+        return features
+
+    def put(self, key, features):
+        '''
+        Function to add the features of a key, None stores a rejected image
+        Evicts the least recently used entries above max_entries
+        '''
+        if features is None:
+            features = np.zeros((0, 1, 2), dtype=np.float32)
+        self.entries[key] = np.asarray(features, dtype=np.float32)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self.modified = True
+
+    def save(self):
+        '''
+        Function to write the cache file if anything changed, the file is replaced atomically
+        '''
+        if not self.modified:
+            return
+        tmp_path = self.path + '.tmp.npz'
+        try:
+            np.savez_compressed(tmp_path, **{ORDER_NAME: np.array(list(self.entries.keys()), dtype=str)},
+                                **self.entries)
+            os.replace(tmp_path, self.path)
+            self.modified = False
+        except (IOError, OSError):
+            logging.warning('Detection cache %s could not be written', self.path)
+
+    def invalidate(self):
+        '''
+        Function to remove all the entries and the cache file of the directory
+        '''
+        self.entries.clear()
+        self.modified = False
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logging.warning('Detection cache %s could not be removed', self.path)
+
+
+'''
+Function to get the caches of the directories of a list of files
+'''
+
+
+def caches_for(paths, max_entries=10000):
+    caches = {}
+    for path in paths:
+        directory = os.path.dirname(os.path.abspath(path))
+        if directory not in caches:
+            caches[directory] = DetectionCache(directory, max_entries)
+    return caches
+
+
+'''
+Function to get the cache of a file from the caches of its directories
+'''
+
+
+def cache_of(caches, path):
+    return caches[os.path.dirname(os.path.abspath(path))]
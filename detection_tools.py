@@ -0,0 +1,507 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import cv2
+import numpy as np
+
+logging.basicConfig(level=logging.ERROR)
+
+# criteria for the subpixel refinement of the chessboard corners
+### EPS realistisch einstellen je nach Bildaufloesung (z.B fuer (240x320) 0.1, 0.25)
+SUBPIX_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 130, 0.25)
+SUBPIX_WINDOW = (3, 3)
+# maximum size of the longest side of the downscaled copy for the coarse-to-fine detection
+PYRAMID_MAX_SIZE = 1280
+# maximum half size of the window of the refinement of the coarse corners as a fraction of the distance between
+# neighbouring corners, a larger window would include the next corners
+PYRAMID_WINDOW_SPACING = 0.4
+
+# parameters given by the session for the detection of features
+# pyramid enables the coarse-to-fine detection for high resolution images
+# backend is the name of the detector for chessboard patterns, see DETECTOR_BACKENDS
+DetectionSettings = namedtuple('DetectionSettings', ['pattern_type', 'p_height', 'p_width', 'pyramid', 'backend'])
+
+# time and accuracy of a detector backend for a set of images, see compare_backends
+BackendReport = namedtuple('BackendReport', ['backend', 'n_images', 'detected', 'total_time', 'rms'])
+
+# result of the detection for one file, returned in the same order as the input files
+# key identifies the content of the file and the detection parameters, see content_key
+# strategy, calls and default_calls describe the search of the features, see search_features
+DetectionResult = namedtuple('DetectionResult', ['path', 'image', 'features', 'ok', 'key', 'strategy', 'calls',
+                                                 'default_calls'])
+
+# features already known for a key (e.g. from a DetectionCache), shared with the workers of the pool
+# an empty array of features means that the detection failed for that key
+_known_features = {}
+# threads for the concurrent strategies of the detection, see strategy_executor
+_executor = None
+
+'''
+Function to get the default number of workers for the detection stage
+'''
+
+
+def default_workers():
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+'''
+Function to get all the parameters that change the result of the detection
+'''
+
+
+def detection_parameters(settings):
+    parameters = tuple(settings) + (SUBPIX_WINDOW, SUBPIX_CRITERIA)
+    if settings.pyramid:
+        parameters += (PYRAMID_MAX_SIZE,)
+    return parameters
+
+
+'''
+Function to get the key of a file given its content and the detection parameters
+'''
+
+
+def content_key(buffer, parameters):
+    digest = hashlib.sha1(buffer)
+    digest.update(repr(parameters).encode('utf-8'))
+    return digest.hexdigest()
+
+
+'''
+Function to normalize a gray scale image to the full 8 bit range
+'''
+
+
+def normalize(im):
+    im = np.float32(im)
+    # original: normalized read image
+    return (255.0 * (im - im.min()) / (im.max() - im.min())).astype(np.uint8)
+
+
+'''
+Function to read an image in gray scale and normalize it to the full 8 bit range
+'''
+
+
+def load_normalized(path):
+    # read image file
+    return normalize(cv2.imread(path, 0))
+
+
+'''
+Functions of the detector backends for chessboard patterns, they return (ret, features) for one image
+'''
+
+
+def chessboard_classic(im, pattern_size):
+    ret, features = cv2.findChessboardCorners(im, pattern_size)
+    if ret:
+        # improve feature detection
+        cv2.cornerSubPix(im, features, SUBPIX_WINDOW, (-1, -1), SUBPIX_CRITERIA)
+    return ret, features
+
+
+def chessboard_fast_check(im, pattern_size):
+    # the fast check rejects quickly the images without a pattern
+    flags = cv2.CALIB_CB_ADAPTIVE_THRESH + cv2.CALIB_CB_NORMALIZE_IMAGE + cv2.CALIB_CB_FAST_CHECK
+    ret, features = cv2.findChessboardCorners(im, pattern_size, flags=flags)
+    if ret:
+        cv2.cornerSubPix(im, features, SUBPIX_WINDOW, (-1, -1), SUBPIX_CRITERIA)
+    return ret, features
+
+
+def chessboard_sector_based(im, pattern_size):
+    # the sector based detector gives subpixel accuracy, no refinement needed
+    ret, features = cv2.findChessboardCornersSB(im, pattern_size)
+    if ret:
+        features = np.float32(features).reshape(-1, 1, 2)
+    return ret, features
+
+
+# detector backends for chessboard patterns, selectable per session
+DETECTOR_BACKENDS = OrderedDict([('Classic', chessboard_classic),
+                                 ('Classic with fast check', chessboard_fast_check),
+                                 ('Sector based', chessboard_sector_based)])
+DEFAULT_BACKEND = 'Classic'
+
+'''
+Function to get the strategies of the detection in the default order
+A strategy is a pair (inverted, transposed): the detection uses the inverted image (e.g. for thermal cameras),
+and for the symmetric grid, the width - height configuration
+'''
+
+
+def default_strategies(pattern_type):
+    if 'Symmetric Grid' in pattern_type:
+        return [(False, False), (False, True), (True, False), (True, True)]
+    return [(False, False), (True, False)]
+
+
+'''
+Function to find the pattern features in a normalized image with one strategy, it is one call to the detector
+'''
+
+
+def find_features_strategy(im, pattern_type, p_height, p_width, backend, strategy):
+    inverted, transposed = strategy
+    if inverted:
+        logging.debug('Inverting image')
+        im = 255 - im
+    # find features for chessboard pattern type
+    if 'Chessboard' in pattern_type:
+        return DETECTOR_BACKENDS[backend](im, (p_height, p_width))
+    # find features for asymmetric grid pattern type
+    elif 'Asymmetric Grid' in pattern_type:
+        features = np.array([], np.float32)
+        return cv2.findCirclesGrid(im, (p_height, p_width), features, cv2.CALIB_CB_ASYMMETRIC_GRID)
+    # find features for symmetric grid pattern type
+    elif 'Symmetric Grid' in pattern_type:
+        features = np.array([], np.float32)
+        '''
+        Since the findCirclesGrid algorithm for symmetric grid usually fails for a wrong height - width configuration,
+        we invert here those parameters
+        '''
+        if not transposed:
+            logging.debug('height - width')
+            return cv2.findCirclesGrid(im, (p_height, p_width), features, cv2.CALIB_CB_SYMMETRIC_GRID)
+        logging.debug('width - height')
+        ret, features = cv2.findCirclesGrid(im, (p_width, p_height), features, cv2.CALIB_CB_SYMMETRIC_GRID)
+        if ret:
+            # trasform the detected features configuration to match the original (height, width)
+            features = features.reshape(p_height, p_width, 1, 2)
+            features = np.transpose(features, (1, 0, 2, 3))
+            features = features.reshape(p_width * p_height, 1, 2)
+        return ret, features
+    return False, None
+
+
+'''
+Function to get the executor for the concurrent strategies, created once per process
+'''
+
+
+def strategy_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=4)
+    return _executor
+
+
+'''
+Function to find the pattern features trying the strategies in the given order, the first success is used
+With concurrent, all the strategies run at the same time in threads, the result is the same as without it
+Returns (ret, features, strategy, calls, default_calls), where default_calls is the number of calls
+that the default order of strategies needs
+'''
+
+
+def search_features(im, pattern_type, p_height, p_width, backend=DEFAULT_BACKEND, order=None, concurrent=False):
+    strategies = default_strategies(pattern_type)
+    if order is None:
+        order = strategies
+    ret, features, strategy, calls = False, None, None, 0
+    if concurrent and len(order) > 1:
+        futures = [strategy_executor().submit(find_features_strategy, im, pattern_type, p_height, p_width, backend, s)
+                   for s in order]
+        try:
+            # the results are taken in the order of the strategies, so the first strategy of the order which
+            # succeeds is used whatever thread finishes first, as in the serial search
+            for s, future in zip(order, futures):
+                ret, features = future.result()
+                if ret:
+                    strategy = s
+                    break
+        finally:
+            # strategies which didn't start yet aren't needed anymore
+            for future in futures:
+                future.cancel()
+        calls = sum(not future.cancelled() for future in futures)
+    else:
+        for strategy in order:
+            calls += 1
+            ret, features = find_features_strategy(im, pattern_type, p_height, p_width, backend, strategy)
+            if ret:
+                break
+    if ret:
+        default_calls = strategies.index(strategy) + 1
+    else:
+        strategy = None
+        default_calls = len(strategies)
+    return bool(ret), features, strategy, calls, default_calls
+
+
+'''
+Function to find the pattern features in a normalized image
+Tries the normal and the inverted image, and for the symmetric grid both height - width configurations
+'''
+
+
+def find_features(im, pattern_type, p_height, p_width, backend=DEFAULT_BACKEND):
+    return search_features(im, pattern_type, p_height, p_width, backend)[:2]
+
+
+'''
+Function to get the scale of the downscaled copy for the coarse-to-fine detection
+The image is halved until its longest side is not greater than max_size
+'''
+
+
+def pyramid_scale(shape, max_size=PYRAMID_MAX_SIZE):
+    scale = 1.0
+    while max(shape[:2]) * scale > max_size:
+        scale /= 2
+    return scale
+
+
+'''
+Function to get the smallest distance between neighbouring features of a pattern, feature i of row j is
+j * p_height + i as in the detection
+'''
+
+
+def feature_spacing(features, p_height, p_width):
+    grid = np.reshape(features, (p_width, p_height, 2)).astype(np.float64)
+    distances = [np.linalg.norm(np.diff(grid, axis=axis), axis=-1) for axis in (0, 1) if grid.shape[axis] > 1]
+    return min(d.min() for d in distances) if distances else 0
+
+
+'''
+Function to find the pattern features on a downscaled copy of the image and refine them on the full image
+Chessboard corners are refined with cornerSubPix, circle grids are detected again in the region of the coarse pattern,
+at the finest level of the pyramid where the detection succeeds (the blob detector fails for very large circles)
+Falls back to the full resolution detection when the coarse detection fails
+Returns the same as search_features, the calls of all the levels are added
+'''
+
+
+def search_features_pyramid(im, pattern_type, p_height, p_width, backend=DEFAULT_BACKEND, order=None,
+                            concurrent=False):
+    scale = pyramid_scale(im.shape)
+    if scale == 1.0:
+        return search_features(im, pattern_type, p_height, p_width, backend, order, concurrent)
+    small = cv2.resize(im, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    ret, features, strategy, calls, default_calls = search_features(small, pattern_type, p_height, p_width, backend,
+                                                                    order, concurrent)
+    if not ret:
+        logging.debug('Coarse detection failed, detecting in full resolution')
+        result = search_features(im, pattern_type, p_height, p_width, backend, order, concurrent)
+        return result[:3] + (result[3] + calls, result[4] + default_calls)
+    # scale the coarse features back, the coordinates refer to the center of the pixels
+    features = np.float32((features + 0.5) / scale - 0.5)
+    if 'Chessboard' in pattern_type:
+        # the window has to cover the error of the coarse corners, but not the neighbouring corners
+        window = tuple(max(w, min(int(np.ceil(w / scale)), int(PYRAMID_WINDOW_SPACING * feature_spacing(
+            features, p_height, p_width)))) for w in SUBPIX_WINDOW)
+        cv2.cornerSubPix(im, features, window, (-1, -1), SUBPIX_CRITERIA)
+        return ret, features, strategy, calls, default_calls
+    # region of the coarse pattern with a margin of about one feature distance
+    points = features.reshape(-1, 2)
+    x_min, y_min = points.min(axis=0)
+    x_max, y_max = points.max(axis=0)
+    margin = max(x_max - x_min, y_max - y_min) / (max(p_height, p_width) - 1) + 1
+    x0 = max(int(x_min - margin), 0)
+    y0 = max(int(y_min - margin), 0)
+    x1 = min(int(np.ceil(x_max + margin)) + 1, im.shape[1])
+    y1 = min(int(np.ceil(y_max + margin)) + 1, im.shape[0])
+    roi = im[y0:y1, x0:x1]
+    # the strategy of the coarse detection is the one expected to succeed
+    roi_order = [strategy]
+    level_scale = 1.0
+    while level_scale > scale:
+        if level_scale == 1.0:
+            level = roi
+        else:
+            level = cv2.resize(roi, None, fx=level_scale, fy=level_scale, interpolation=cv2.INTER_AREA)
+        roi_ret, roi_features, _, roi_calls, _ = search_features(level, pattern_type, p_height, p_width, backend,
+                                                                 roi_order)
+        calls += roi_calls
+        default_calls += roi_calls
+        if roi_ret:
+            roi_features = (roi_features + 0.5) / level_scale - 0.5
+            return ret, np.float32(roi_features + np.float32([x0, y0])), strategy, calls, default_calls
+        level_scale /= 2
+    logging.debug('Refinement in region failed, using the coarse features')
+    return ret, features, strategy, calls, default_calls
+
+
+def find_features_pyramid(im, pattern_type, p_height, p_width, backend=DEFAULT_BACKEND):
+    return search_features_pyramid(im, pattern_type, p_height, p_width, backend)[:2]
+
+
+class StrategyStatistics():
+    '''
+    Class to learn which strategies of the detection succeed in a session
+    and to count the detector calls saved against the default order of strategies
+    '''
+
+    def __init__(self):
+        self.successes = {}
+        self.calls = 0
+        self.saved = 0
+
+    def order(self, pattern_type):
+        '''
+        Function to get the strategies sorted by their number of successes, ties keep the default order
+        '''
+        return sorted(default_strategies(pattern_type), key=lambda s: -self.successes.get(s, 0))
+
+    def add(self, result):
+        '''
+        Function to add the result of the detection of one file
+        '''
+        if result.ok and result.strategy is not None:
+            self.successes[result.strategy] = self.successes.get(result.strategy, 0) + 1
+        self.calls += result.calls
+        self.saved += result.default_calls - result.calls
+
+
+'''
+Function to load and detect the features of one file, it is executed by the workers of the pool
+'''
+
+
+def detect_features(task):
+    path, settings, order, concurrent = task
+    # the file is read only once, for the key and for the image
+    buffer = np.fromfile(path, dtype=np.uint8)
+    key = content_key(buffer, detection_parameters(settings))
+    im = normalize(cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE))
+    features = _known_features.get(key)
+    if features is not None:
+        logging.debug('Features of %s already known', path)
+        ret = len(features) > 0
+        strategy, calls, default_calls = None, 0, 0
+    else:
+        if settings.pyramid:
+            search = search_features_pyramid
+        else:
+            search = search_features
+        ret, features, strategy, calls, default_calls = search(im, settings.pattern_type, settings.p_height,
+                                                               settings.p_width, settings.backend, order, concurrent)
+    if not ret:
+        features = None
+    return DetectionResult(path, im, features, bool(ret), key, strategy, calls, default_calls)
+
+
+'''
+Function to initialize each worker of the pool, caps the OpenCV internal threads
+'''
+
+
+def init_worker(cv_threads, known_features):
+    global _known_features
+    cv2.setNumThreads(cv_threads)
+    _known_features = known_features
+
+
+'''
+Function to detect the features of a list of files using a pool of processes
+Yields a DetectionResult for each file in the same order as the input files
+known_features maps keys to features which don't need to be detected again
+statistics (StrategyStatistics) orders the strategies of each file with the results of the previous files
+'''
+
+
+def detect_features_parallel(paths, settings, workers=None, known_features=None, statistics=None,
+                             concurrent=False):
+    global _known_features
+    if known_features is None:
+        known_features = {}
+    if statistics is None:
+        statistics = StrategyStatistics()
+    if workers is None:
+        workers = default_workers()
+    workers = min(workers, len(paths))
+
+    def task(path):
+        return path, settings, statistics.order(settings.pattern_type), concurrent
+
+    # no pool for a single worker, OpenCV keeps its own threads
+    if workers <= 1:
+        _known_features = known_features
+        try:
+            for path in paths:
+                result = detect_features(task(path))
+                statistics.add(result)
+                yield result
+        finally:
+            _known_features = {}
+        return
+    # split the cores between the workers, so the OpenCV threads don't oversubscribe them
+    cv_threads = max(1, (os.cpu_count() or 1) // workers)
+    logging.debug('Detecting features with %d workers and %d OpenCV threads', workers, cv_threads)
+    # the workers are spawned, the pool is created from the thread of a background task and a fork would copy the
+    # locks held by the other threads of the process
+    pool = multiprocessing.get_context('spawn').Pool(workers, initializer=init_worker,
+                                                     initargs=(cv_threads, known_features))
+    try:
+        # a short window of files in flight, so the new files use the order learned from the finished ones
+        remaining = iter(paths)
+        pending = deque(pool.apply_async(detect_features, (task(path),)) for path in islice(remaining, 2 * workers))
+        while pending:
+            # results are taken in the order of the files
+            result = pending.popleft().get()
+            statistics.add(result)
+            path = next(remaining, None)
+            if path is not None:
+                pending.append(pool.apply_async(detect_features, (task(path),)))
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+'''
+Function to compare the time and the accuracy of the detector backends for a set of images
+The accuracy is the RMS reprojection error of a calibration with the features of each backend
+The images are read one at a time and all the backends detect the features of each one, progress(fraction,
+elapsed_time) is called after each image and when the event cancel (threading.Event) is set the comparison stops
+after the current image, the reports are of the images compared until then
+Returns a BackendReport for each backend
+'''
+
+
+def compare_backends(paths, settings, backends=None, progress=None, cancel=None):
+    if backends is None:
+        backends = list(DETECTOR_BACKENDS.keys())
+    # planar grid of the pattern, the feature distance doesn't change the reprojection error
+    object_pattern = np.zeros((settings.p_width * settings.p_height, 3), np.float32)
+    object_pattern[:, :2] = np.mgrid[0:settings.p_height, 0:settings.p_width].T.reshape(-1, 2)
+    features = dict((backend, []) for backend in backends)
+    total_time = dict((backend, 0.0) for backend in backends)
+    size = None
+    n_images = 0
+    t_start = time.time()
+    for path in paths:
+        if cancel is not None and cancel.is_set():
+            break
+        im = load_normalized(path)
+        size = (im.shape[1], im.shape[0])
+        for backend in backends:
+            t = time.time()
+            if settings.pyramid:
+                ret, f = find_features_pyramid(im, settings.pattern_type, settings.p_height, settings.p_width, backend)
+            else:
+                ret, f = find_features(im, settings.pattern_type, settings.p_height, settings.p_width, backend)
+            total_time[backend] += time.time() - t
+            if ret:
+                features[backend].append(np.float32(f).reshape(-1, 1, 2))
+        n_images += 1
+        if progress is not None:
+            progress(n_images / float(len(paths)), time.time() - t_start)
+    reports = []
+    for backend in backends:
+        rms = float('nan')
+        # a calibration needs a few poses to be meaningful
+        if len(features[backend]) >= 3:
+            rms, _, _, _, _ = cv2.calibrateCamera([object_pattern] * len(features[backend]), features[backend], size,
+                                                  None, None)
+        reports.append(BackendReport(backend, n_images, len(features[backend]), total_time[backend], rms))
+    return reports
@@ -0,0 +1,114 @@
+import logging
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+logging.basicConfig(level=logging.ERROR)
+
+# above this fraction of changed poses, the map is computed again from all the poses instead of incrementally
+REBUILD_RATIO = 0.5
+
+'''
+Function to get the radius in pixels of the circle of each feature given the width of the image
+'''
+
+
+def kernel_radius(width):
+    return int(round(0.006 * width + 8))
+
+
+'''
+Function to get the circle of a feature with radius L, the center gets L and the radius 0
+Each value is the number of circles of radius k < L (around the center) which contain the pixel, the values are
+integers so that the sums of the map are exact
+'''
+
+
+@lru_cache(maxsize=8)
+def heat_kernel(L):
+    i, j = np.mgrid[-L:L + 1, -L:L + 1]
+    r = np.sqrt(i ** 2 + j ** 2)
+    return np.maximum(L - np.ceil(r), 0)
+
+
+class HeatMapEngine():
+    '''
+    Class to keep the density map of the detected features of one camera for an image size (height, width)
+    The map is the sum of the circles of all the features (see heat_kernel), kept without normalization so that
+    poses can be added or deleted by adding or subtracting only their contribution
+    Features of a pose are arrays (n_points, 2) or (n_points, 1, 2) of (x, y), None for a rejected pose
+    '''
+
+    def __init__(self, size):
+        self.size = tuple(size[:2])
+        height, width = self.size
+        self.L = kernel_radius(width)
+        self.kernel = heat_kernel(self.L)
+        # the map has a margin of 2 L, the circles of features up to L outside the image still cover it
+        self.margin = 2 * self.L
+        self.grid = np.zeros((height + 2 * self.margin, width + 2 * self.margin))
+        # features of the poses in the map by their id, the references keep the ids unique
+        self.poses = {}
+
+    def splat(self, features, sign=1):
+        '''
+        Function to add (sign 1) or subtract (sign -1) the circles of a set of features to the map
+        All the features are counted in a histogram of their bounding box, which is convolved once with the circle,
+        unless adding the circle of each feature is cheaper
+        '''
+        points = np.concatenate([np.reshape(f, (-1, 2)) for f in features]) if features else np.zeros((0, 2))
+        # pixel of each feature as in the drawing of the features, truncated towards zero
+        cols = np.trunc(points[:, 0]).astype(int) + self.margin
+        rows = np.trunc(points[:, 1]).astype(int) + self.margin
+        height, width = self.size
+        inside = (rows >= self.L) & (rows < height + 3 * self.L) & (cols >= self.L) & (cols < width + 3 * self.L)
+        rows, cols = rows[inside], cols[inside]
+        if len(rows) == 0:
+            return
+        r0, c0 = rows.min() - self.L, cols.min() - self.L
+        r1, c1 = rows.max() + self.L + 1, cols.max() + self.L + 1
+        if len(rows) * self.kernel.size < (r1 - r0) * (c1 - c0):
+            # few spread features (e.g. one pose), adding their circles is cheaper than the convolution of the box
+            for r, c in zip(rows, cols):
+                self.grid[r - self.L:r + self.L + 1, c - self.L:c + self.L + 1] += sign * self.kernel
+            return
+        histogram = np.zeros((r1 - r0, c1 - c0))
+        np.add.at(histogram, (rows - r0, cols - c0), 1)
+        # the circle is symmetric, the correlation of filter2D is the convolution, the sums are integers
+        density = cv2.filter2D(histogram, -1, self.kernel, borderType=cv2.BORDER_CONSTANT)
+        self.grid[r0:r1, c0:c1] += sign * np.rint(density)
+
+    def reset(self, list_features):
+        '''
+        Function to compute the map again from the features of all the poses
+        '''
+        self.grid[:] = 0
+        self.poses = {id(f): f for f in list_features if f is not None}
+        self.splat(list(self.poses.values()))
+
+    def update(self, list_features):
+        '''
+        Function to update the map to the features of the given poses, only the poses added or deleted since the
+        last update are added to or subtracted from the map
+        '''
+        current = {id(f): f for f in list_features if f is not None}
+        added = [f for key, f in current.items() if key not in self.poses]
+        deleted = [f for key, f in self.poses.items() if key not in current]
+        if len(added) + len(deleted) > REBUILD_RATIO * max(len(current), 1):
+            self.reset(list_features)
+            return
+        self.splat(added, 1)
+        self.splat(deleted, -1)
+        self.poses = current
+
+    def normalized(self):
+        '''
+        Function to get the map of the image normalized between 0 and 1
+        '''
+        height, width = self.size
+        grid = self.grid[self.margin:self.margin + height, self.margin:self.margin + width]
+        span = grid.max() - grid.min()
+        if span == 0:
+            return np.zeros(grid.shape)
+        return (grid - grid.min()) / span
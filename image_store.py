@@ -0,0 +1,138 @@
+import logging
+from collections import OrderedDict
+
+import cv2
+
+from detection_tools import load_normalized
+
+logging.basicConfig(level=logging.ERROR)
+
+# default memory for the full frames of one store
+DEFAULT_BUDGET = 512 * 1024 * 1024
+# the previews fit in the default size of the panels
+PREVIEW_SIZE = (320, 240)
+
+
+class ImageStore():
+    '''
+    Class to keep the normalized images of one camera with a bounded memory, it is used as a list of images
+    Small previews of all the images stay resident, the full frames are evicted in least recently used order
+    when they exceed the budget (bytes) and are read and normalized again from their file when needed
+    Images without a file (e.g. the empty images of text files) are never evicted
+    '''
+
+    def __init__(self, budget=DEFAULT_BUDGET, preview_size=PREVIEW_SIZE):
+        self.budget = budget
+        self.preview_size = preview_size
+        # id of each entry, ids don't change when other entries are deleted
+        self.ids = []
+        self.paths = {}
+        self.previews = {}
+        self.shapes = {}
+        # full frames which can be evicted, from the least to the most recently used
+        self.frames = OrderedDict()
+        # full frames without a file
+        self.pinned = {}
+        self.next_id = 0
+        self.frames_bytes = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        for i in range(len(self.ids)):
+            yield self[i]
+
+    def append(self, image, path=None):
+        '''
+        Function to add a normalized image, None is kept as an empty entry
+        '''
+        key = self.next_id
+        self.next_id += 1
+        self.ids.append(key)
+        if image is None:
+            self.paths[key] = None
+            return
+        self.shapes[key] = image.shape
+        self.previews[key] = self.make_preview(image)
+        if path is None:
+            self.pinned[key] = image
+        else:
+            self.paths[key] = path
+            self.add_frame(key, image)
+
+    def __getitem__(self, index):
+        key = self.ids[index]
+        if key in self.pinned:
+            return self.pinned[key]
+        if key in self.frames:
+            self.frames.move_to_end(key)
+            return self.frames[key]
+        path = self.paths.get(key)
+        if path is None:
+            return None
+        logging.debug('Reloading %s', path)
+        image = load_normalized(path)
+        self.add_frame(key, image)
+        return image
+
+    def __delitem__(self, index):
+        key = self.ids.pop(index)
+        self.paths.pop(key, None)
+        self.previews.pop(key, None)
+        self.shapes.pop(key, None)
+        self.pinned.pop(key, None)
+        image = self.frames.pop(key, None)
+        if image is not None:
+            self.frames_bytes -= image.nbytes
+
+    def make_preview(self, image):
+        '''
+        Function to downscale an image to fit in the preview size
+        '''
+        height, width = image.shape[:2]
+        factor = min(self.preview_size[0] / float(width), self.preview_size[1] / float(height), 1.0)
+        if factor == 1.0:
+            return image.copy()
+        size = max(int(width * factor), 1), max(int(height * factor), 1)
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+    def add_frame(self, key, image):
+        '''
+        Function to add a full frame and evict the least recently used ones over the budget
+        The frame just added is always kept
+        '''
+        self.frames[key] = image
+        self.frames_bytes += image.nbytes
+        while self.frames_bytes > self.budget and len(self.frames) > 1:
+            _, evicted = self.frames.popitem(last=False)
+            self.frames_bytes -= evicted.nbytes
+
+    def set_budget(self, budget):
+        '''
+        Function to change the budget, evicts the frames over the new budget
+        '''
+        self.budget = budget
+        while self.frames_bytes > self.budget and len(self.frames) > 1:
+            _, evicted = self.frames.popitem(last=False)
+            self.frames_bytes -= evicted.nbytes
+
+    def preview(self, index):
+        return self.previews.get(self.ids[index])
+
+    def key(self, index):
+        '''
+        Function to get the id of an entry, it doesn't change when other entries are deleted
+        '''
+        return self.ids[index]
+
+    def image_shape(self, index):
+        return self.shapes.get(self.ids[index])
+
+    def resident_bytes(self):
+        '''
+        Function to get the memory used by the previews and the full frames
+        '''
+        previews = sum(p.nbytes for p in self.previews.values())
+        pinned = sum(p.nbytes for p in self.pinned.values())
+        return previews + pinned + self.frames_bytes
@@ -0,0 +1,44 @@
+import logging
+
+import cv2
+import numpy as np
+
+logging.basicConfig(level=logging.ERROR)
+
+'''
+Function to get an RGB copy of a gray image
+'''
+
+
+def gray_to_rgb(image):
+    image = np.asarray(image, dtype=np.uint8)
+    if image.ndim == 3:
+        return image.copy()
+    return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+
+
+'''
+Function to get the lines of the mesh of a pattern as polylines, one for each row and one for each column
+The features are ordered as the detection, feature i of row j is j * p_height + i, and their coordinates are
+truncated to pixels
+'''
+
+
+def mesh_polylines(points, p_height, p_width):
+    grid = np.reshape(points, (p_width, p_height, 2)).astype(np.int32)
+    lines = [grid[j].reshape(-1, 1, 2) for j in range(p_width)]
+    lines += [np.ascontiguousarray(grid[:, i]).reshape(-1, 1, 2) for i in range(p_height)]
+    return lines
+
+
+'''
+Function to draw the mesh of a pattern over an image with the feature of index corner marked by a circle
+'''
+
+
+def draw_mesh(image, points, p_height, p_width, color, corner=None):
+    cv2.polylines(image, mesh_polylines(points, p_height, p_width), False, color)
+    if corner is not None and 0 <= corner < p_height * p_width:
+        x, y = np.reshape(points, (-1, 2))[corner].astype(np.int32)
+        cv2.circle(image, (int(x), int(y)), 5, color)
+    return image
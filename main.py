@@ -1,10 +1,12 @@
 import tkinter as tk
 from toolboxClass import MRTCalibrationToolbox
 
-root = tk.Tk()
+# guard needed by the process pools of the detection and the calibration, their workers are spawned
+if __name__ == '__main__':
+    root = tk.Tk()
 
-root.wait_visibility()
-root.grab_set()
-my_gui = MRTCalibrationToolbox(root)
+    root.wait_visibility()
+    root.grab_set()
+    my_gui = MRTCalibrationToolbox(root)
 
-root.mainloop()
+    root.mainloop()
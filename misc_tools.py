@@ -2,7 +2,10 @@ import itertools
 import operator as op
 from functools import reduce
 
-from numpy.random import permutation
+import numpy as np
+
+# above this fraction of all the possible combinations, the samples are taken from the full enumeration
+ENUMERATION_RATIO = 0.5
 
 '''
 Function to get maximum possible combinations given n and r
@@ -11,39 +14,41 @@ Function to get maximum possible combinations given n and r
 
 def ncr(n, r):
     # https://stackoverflow.com/questions/4941753/is-there-a-math-ncr-function-in-python
+    if r < 0 or r > n:
+        return 0
     r = min(r, n - r)
     numer = reduce(op.mul, range(n, n - r, -1), 1)
     denom = reduce(op.mul, range(1, r + 1), 1)
-    return numer / denom
+    return numer // denom
 
 
 '''
-Function to calculate different combinations sets 
+Function to calculate k different combinations sets of r elements from n
+Each set is sorted, the sets are drawn at random and with a seed they are reproducible
+The sets in keep (sorted) are the first ones, only the others are drawn
+Returns the sets and k, which is smaller than the given one when there are not enough combinations
 '''
 
 
-def combination(n, r, k):
-    index = 0
-    k = min(ncr(n, r), k)
-    samples = []
-    b_c = True
-    while b_c:
-        for item in itertools.combinations(permutation(n), r):
-            if index == k - 1:
-                b_c = False
-            s_item = list(item)
-            s_item.sort()
-            if s_item not in samples:
-                samples.append(s_item)
-                index += 1
-                break
-
-    '''
-    # Shows how many times each elements is used
-    for i in range(n):
-        counter = sum(x.count(i) for x in samples)
-        print("%d is %d times"%(i,counter))
-    '''
+def combination(n, r, k, seed=None, keep=None):
+    # without seed, the global numpy random state is used
+    rng = np.random if seed is None else np.random.RandomState(seed)
+    total = ncr(n, r)
+    k = int(min(total, k))
+    if k <= 0:
+        return [], k
+    samples = [list(s) for s in (keep or [])[:k]]
+    seen = set(tuple(s) for s in samples)
+    if k - len(samples) > ENUMERATION_RATIO * (total - len(samples)):
+        # almost all the combinations are needed, take them from the full enumeration
+        all_sets = [s for s in itertools.combinations(range(n), r) if s not in seen]
+        return samples + [list(all_sets[i]) for i in rng.choice(len(all_sets), k - len(samples), replace=False)], k
+    # random sets, the repeated ones are rejected with a hash set
+    while len(samples) < k:
+        item = tuple(sorted(rng.permutation(n)[:r].tolist()))
+        if item not in seen:
+            seen.add(item)
+            samples.append(list(item))
     return samples, k
 
 
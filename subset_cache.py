@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+logging.basicConfig(level=logging.ERROR)
+
+# name of the array with the keys ordered from the least to the most recently used
+ORDER_NAME = 'lru_order'
+
+'''
+Function to get the identity of each pose, the hash of its 3D points and of its image points in every camera
+The identity doesn't change when other poses are added or deleted
+'''
+
+
+def pose_identities(data):
+    identities = []
+    for i in range(len(data.objpoints)):
+        h = hashlib.sha1(np.ascontiguousarray(data.objpoints[i], dtype=np.float32).tobytes())
+        for points in data.imgpoints:
+            h.update(np.ascontiguousarray(points[i], dtype=np.float32).tobytes())
+        identities.append(h.hexdigest())
+    return identities
+
+
+'''
+Function to get the part of the key of the subsets given by the settings of the calibration (mode, image size,
+flags, criteria and initial guess), see SubsetData
+'''
+
+
+def settings_key(data):
+    h = hashlib.sha1(repr((data.stereo, tuple(data.image_size), int(data.flags), data.criteria)).encode())
+    if data.guess is not None:
+        for m in data.guess:
+            if m is not None:
+                h.update(np.ascontiguousarray(m, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+'''
+Function to get the key of a subset given by the identities of its poses and the key of the settings
+'''
+
+
+def subset_key(identities, s, settings):
+    return hashlib.sha1((settings + ''.join(sorted(identities[i] for i in s))).encode()).hexdigest()
+
+
+class SubsetCache():
+    '''
+    Class to keep the results of the calibrations of subsets by key (see subset_key), with a maximum number of
+    entries evicted in least recently used order
+    Results are tuples (rms, c, d, R, T, time) as SubsetResult without index, R and T are None in single mode
+    With a path, the cache can be saved to and loaded from a compressed file
+    '''
+
+    def __init__(self, max_entries=10000, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        # results for each key, from the least to the most recently used
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        '''
+        Function to get the result of a subset, None if the subset isn't cached
+        '''
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def load(self):
+        '''
+        Function to read the cache file, a missing or broken file gives an empty cache
+        Each result is stored as one vector (rms, time, camera matrices, distortion, R, T)
+        '''
+        self.entries.clear()
+        if self.path is None or not os.path.isfile(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                for key in data[ORDER_NAME]:
+                    v = data[str(key)]
+                    n_cameras = 1 if len(v) == 16 else 2
+                    c = list(v[2:2 + 9 * n_cameras].reshape(n_cameras, 3, 3))
+                    d = list(v[2 + 9 * n_cameras:2 + 14 * n_cameras].reshape(n_cameras, 5, 1))
+                    R = v[30:39].reshape(3, 3) if n_cameras == 2 else None
+                    T = v[39:42].reshape(3, 1) if n_cameras == 2 else None
+                    self.entries[str(key)] = (float(v[0]), c, d, R, T, float(v[1]))
+        except (IOError, OSError, KeyError, ValueError):
+            logging.warning('Subset cache %s could not be read', self.path)
+            self.entries.clear()
+
+    def save(self):
+        '''
+        Function to write the cache file, the file is replaced only when the new one is complete
+        '''
+        if self.path is None:
+            return
+        arrays = {ORDER_NAME: np.array(list(self.entries.keys()))}
+        for key, (rms, c, d, R, T, time) in self.entries.items():
+            v = [np.array([rms, time])] + [np.ravel(m) for m in c] + [np.ravel(m) for m in d]
+            if R is not None:
+                v += [np.ravel(R), np.ravel(T)]
+            arrays[key] = np.concatenate(v).astype(np.float64)
+        temporary = self.path + '.tmp.npz'
+        try:
+            np.savez_compressed(temporary, **arrays)
+            os.replace(temporary, self.path)
+        except (IOError, OSError):
+            logging.warning('Subset cache %s could not be written', self.path)
@@ -1,12 +1,18 @@
 import logging
-import cv2
-import numpy as np
-from misc_tools import combination
-from quaternions import averageMatrix
+import os
+import tkinter as tk
+import datastring
+from background_task import EVENT_PROGRESS
+from calibration_checkpoint import CHECKPOINT_FILENAME
+from calibration_session import STOP_CANCELLED, WARM_START_PROBES, ConvergenceMonitor, calibration_flags, \
+    default_calibration_workers, termination_criteria
 from time_tools import chronometer
 
 logging.basicConfig(level=logging.ERROR)
 
+# event of a step of the calibration done (row of the status table, time)
+EVENT_STATUS = 'status'
+
 class Mixin:
     def play(self, calib_button):
 
@@ -27,22 +33,15 @@ class Mixin:
         self.label_status[4][1].config(text='')
         self.label_status[4][2].config(text='')
         self.label_status[5][2].config(text='')
+        self.label_status[6][1].config(text='')
+        self.label_status[6][2].config(text='')
 
         self.popup.update()
 
-        self.imgpoints = [[], []]
-        self.objpoints = []
-
-        for j in range(self.n_cameras):
-            for feature in self.detected_features[j]:
-                self.imgpoints[j].append(feature)
-                if j == 0:
-                    self.objpoints.append(self.object_pattern)
+        self.session.prepare_points()
 
-        flags_parameters = int(self.p_intrinsics_guess.get()) * cv2.CALIB_USE_INTRINSIC_GUESS + \
-                           int(self.p_fix_point.get()) * cv2.CALIB_FIX_PRINCIPAL_POINT + \
-                           int(self.p_fix_ratio.get()) * cv2.CALIB_FIX_ASPECT_RATIO + \
-                           int(self.p_zero_tangent_distance.get()) * cv2.CALIB_ZERO_TANGENT_DIST
+        flags_parameters = calibration_flags(self.p_intrinsics_guess.get(), self.p_fix_point.get(),
+                                             self.p_fix_ratio.get(), self.p_zero_tangent_distance.get())
 
         logging.debug('%s', self.how_to_calibrate.get())
 
@@ -81,190 +80,173 @@ class Mixin:
                 return
 
             # n, number of all images
-            self.samples, k = combination(len(self.objpoints), c_r, c_k)
+            k = self.session.draw_samples(c_r, c_k, keep_drawn=self.keep_groups.get())
 
             if k != c_k:
                 self.c_k.set(int(k))
                 self.label_msg[1].config(text='Number of groups changed from %d to %d (maximum possible)' % (c_k, k))
                 self.popup.update()  # for updating while running other process
 
-            time_play = chronometer()
-            counter = 0
-
-            C_array = []
-            D_array = []
-            self.R_array = []
-            self.T_array = []
-
-            self.fx_array = [[], []]
-            self.fy_array = [[], []]
-            self.cx_array = [[], []]
-            self.cy_array = [[], []]
-            self.k1_array = [[], []]
-            self.k2_array = [[], []]
-            self.k3_array = [[], []]
-            self.k4_array = [[], []]
-            self.k5_array = [[], []]
-            self.RMS_array = []
-
-            for s in self.samples:
-                op = list(self.objpoints[i] for i in s)
-                ip, c, d = [], [], []
-                for j in range(self.n_cameras):
-                    ip.append(list(self.imgpoints[j][i] for i in s))
-                    c.append(np.eye(3, dtype=np.float32))
-                    d.append(np.zeros((5, 1), dtype=np.float32))
-
-                R = None
-                T = None
-
-                if self.m_stereo:
-                    # move coordinates when images size are different
-                    if self.size[0] != self.size[1]:
-                        logging.debug('Different camera resolution')
-                        ip = np.array(ip)
-                        index_min = self.size.index(min(self.size))
-                        index_max = self.size.index(max(self.size))
-                        w_adj, h_adj = self.size[index_max]
-                        w, h = self.size[index_min]
-                        n_poses, n_points, _, _ = ip[index_min].shape
-                        logging.debug('Transforming coordinates for camera %s', index_min + 1)
-                        for pose in range(n_poses):
-                            for point in range(n_points):
-                                ip[index_min][pose][point] = np.sum(
-                                    [ip[index_min][pose][point], [[(h_adj - h) / 2, (w_adj - w) / 2]]], axis=0)
-                    width = max(self.size[0][1], self.size[1][1])
-                    height = max(self.size[0][0], self.size[1][0])
-                    rms, c[0], d[0], c[1], d[1], R, T, E, F = cv2.stereoCalibrate(op, ip[0], ip[1], c[0], d[0], c[1],
-                                                                                  d[1], (width, height),
-                                                                                  flags=flags_parameters)
-                else:
-                    width = self.size[0][1]
-                    height = self.size[0][0]
-                    rms, c[0], d[0], r, t = cv2.calibrateCamera(op, ip[0], (width, height), c[0], d[0],
-                                                                flags=flags_parameters)
-                logging.info('this is stereo rms error: %s', rms)
-
-                if rms != 0:
-                    counter += 1
-                    # add to matrices
-                    C_array.append(c)
-                    D_array.append(d)
-                    # add to iteration array
-                    self.fx_array[0].append(c[0][0][0])
-                    self.fy_array[0].append(c[0][1][1])
-                    self.cx_array[0].append(c[0][0][2])
-                    self.cy_array[0].append(c[0][1][2])
-                    self.k1_array[0].append(d[0][0][0])
-                    self.k2_array[0].append(d[0][1][0])
-                    self.k3_array[0].append(d[0][2][0])
-                    self.k4_array[0].append(d[0][3][0])
-                    self.k5_array[0].append(d[0][4][0])
-                    self.RMS_array.append(rms)
-                    if self.m_stereo:
-                        self.R_array.append(R)
-                        self.T_array.append(T)
-                        # add to iteration array
-                        self.fx_array[1].append(c[1][0][0])
-                        self.fy_array[1].append(c[1][1][1])
-                        self.cx_array[1].append(c[1][0][2])
-                        self.cy_array[1].append(c[1][1][2])
-                        self.k1_array[1].append(d[1][0][0])
-                        self.k2_array[1].append(d[1][1][0])
-                        self.k3_array[1].append(d[1][2][0])
-                        self.k4_array[1].append(d[1][3][0])
-                        self.k5_array[1].append(d[1][4][0])
-
-                    c_porcent = counter / float(len(self.samples))  # percentage of completion of process
-                    self.progbar["value"] = c_porcent * 10.0
-                    elapsed_time_1 = time_play.gettime()
-                    self.lb_time.config(
-                        text='Estimated time left: %0.5f seconds' % max(elapsed_time_1 * (1 / c_porcent - 1), 0))
-                    self.style_pg.configure('text.Horizontal.TProgressbar',
-                                            text='{:g} %'.format(c_porcent * 100.0))  # update label
-                    self.popup.update()  # for updating while running other process
-
-            self.label_status[1][1].config(text=u'\u2714')
-            self.label_status[1][2].config(text='%0.5f' % elapsed_time_1)
-            self.lb_time.config(text='')
-
-            if len(C_array) > 0:
-                self.camera_matrix = np.mean(np.array(C_array), axis=0)
-                self.dist_coefs = np.mean(np.array(D_array), axis=0)
-                self.dev_camera_matrix = np.std(np.array(C_array), axis=0)
-                self.dev_dist_coefs = np.std(np.array(D_array), axis=0)
-                if self.m_stereo:
-                    self.R_stereo = averageMatrix(self.R_array)
-                    self.T_stereo = np.mean(np.array(self.T_array), axis=0)
-                    # Correction for cx and cy parameters
-                    if self.size[0] != self.size[1]:
-                        logging.debug('Correcting cx an cy for camera {0}'.format(index_min + 1))
-                        self.camera_matrix[index_min][0][2] -= (h_adj - h) / 2
-                        self.camera_matrix[index_min][1][2] -= (w_adj - w) / 2
-            else:
-                self.reset_camera_parameters()
-
-            elapsed_time_2 = time_play.gettime()
-            self.label_status[2][1].config(text=u'\u2714')
-            self.label_status[2][2].config(text='%0.5f' % (elapsed_time_2 - elapsed_time_1))
-
-            if np.any(self.camera_matrix[:, 0, 0] == 1):
-                self.reset_camera_parameters()
-                self.reset_error()
-            else:
+            # subsets are calibrated in a pool of processes
+            try:
+                workers = self.n_calibration_workers.get()
+            except (ValueError, tk.TclError):
+                workers = default_calibration_workers()
+            try:
+                criteria = termination_criteria(self.calib_max_iter.get(), self.calib_eps.get(), self.session.m_stereo)
+            except (ValueError, tk.TclError):
+                criteria = None
+            monitor = None
+            if self.adaptive_stop.get():
+                try:
+                    monitor = ConvergenceMonitor(self.adaptive_tolerance.get(), self.adaptive_budget.get())
+                except (ValueError, tk.TclError):
+                    monitor = ConvergenceMonitor(0, None)
+            warm_start = self.warm_start.get()
+            probes = WARM_START_PROBES if self.compare_warm_start.get() else 0
+            # the checkpoint is kept in the directory of the images of the first camera
+            checkpoint = None
+            if self.save_checkpoint.get() or self.resume_checkpoint.get():
+                checkpoint = os.path.join(os.path.dirname(self.session.paths[0][0]), CHECKPOINT_FILENAME)
+            resume = self.resume_checkpoint.get()
+
+            def calibrate_groups(task):
+                # runs in the thread of the task, the GUI is updated from the events
+                time_play = chronometer()
+                self.session.calibrate_samples(flags_parameters, task.progress, workers, warm_start, criteria,
+                                               monitor, task.cancel_event, checkpoint, resume, probes)
+                elapsed_time_1 = time_play.gettime()
+                task.post(EVENT_STATUS, 1, elapsed_time_1)
+                self.session.average_calibrations()
+                elapsed_time_2 = time_play.gettime()
+                task.post(EVENT_STATUS, 2, elapsed_time_2 - elapsed_time_1)
+                if not self.session.has_intrinsics():
+                    return False
                 logging.debug('Correct!')
                 # Camera projections
-                self.calculate_projection()
+                self.session.calculate_projection()
                 elapsed_time_3 = time_play.gettime()
-                self.label_status[3][1].config(text=u'\u2714')
-                self.label_status[3][2].config(text='%0.5f' % (elapsed_time_3 - elapsed_time_2))
+                task.post(EVENT_STATUS, 3, elapsed_time_3 - elapsed_time_2)
                 # Calculate RMS error
-                self.calculate_error()
+                self.session.calculate_error(task.progress)
                 elapsed_time_4 = time_play.gettime()
-                self.label_status[4][1].config(text=u'\u2714')
-                self.label_status[4][2].config(text='%0.5f' % (elapsed_time_4 - elapsed_time_3))
-                self.label_status[5][2].config(text='%0.5f' % elapsed_time_4)
-                self.bot[8].config(state="normal")  # enable export parameters button
-                self.bot[9].config(state="normal")  # enable export parameters button
-                for e in self.rms:
-                    if e == float("inf") or e == float("-inf"):
-                        logging.warning('Error is too high')
-                        # mark X for step 3 and 4
-                        self.label_status[4][1].config(text=u'\u2718')
-                        self.label_status[4][1].config(text=u'\u2718')
-                        self.reset_camera_parameters()
-                        self.reset_error()
-                        self.bot[8].config(state="disable")  # enable export parameters button
-                        self.bot[9].config(state="disable")  # enable export parameters button
-                        break
+                task.post(EVENT_STATUS, 4, elapsed_time_4 - elapsed_time_3)
+                task.post(EVENT_STATUS, 5, elapsed_time_4)
+                return True
+
+            def show_event(name, *args):
+                if name == EVENT_STATUS:
+                    self.show_status(self.label_status, *args)
+                elif name == EVENT_PROGRESS:
+                    self.show_progress_play(*args)
+
+            def finish(task):
+                if task.error is not None or not task.result:
+                    self.label_status[1 if task.error is not None else 2][1].config(text=u'\u2718')
+                    self.reset_camera_parameters()
+                    self.reset_error()
+                elif not self.session.error_is_finite():
+                    logging.warning('Error is too high')
+                    # mark X for step 3 and 4
+                    self.label_status[4][1].config(text=u'\u2718')
+                    self.reset_camera_parameters()
+                    self.reset_error()
+                else:
+                    self.bot[8].config(state="normal")  # enable export parameters button
+                    self.bot[9].config(state="normal")  # enable export parameters button
+                info = []
+                # a cancelled calibration is the mean of the groups calibrated before, marked as partial
+                if self.session.stop_reason == STOP_CANCELLED:
+                    self.label_status[1][1].config(text='partial')
+                    info.append('Cancelled, partial calibration')
+                # groups used and reason to stop of the adaptive mode or of a cancelled calibration
+                if monitor is not None or self.session.stop_reason == STOP_CANCELLED:
+                    info.append('Groups used: %d of %d (%s)' % (len(self.session.samples), self.session.n_drawn,
+                                                               self.session.stop_reason))
+                # groups of a previous calibration which weren't calibrated again
+                if self.session.n_cached:
+                    info.append('Groups from cache: %d' % self.session.n_cached)
+                # time of the calibration of all the images, time and iterations saved per group by the warm start
+                report = self.session.warm_start_report
+                if report is not None:
+                    self.label_status[6][1].config(text=u'\u2714')
+                    self.label_status[6][2].config(text='%0.5f' % report.full_time)
+                    info.append(datastring.warmstart2string(report))
+                self.lb_time.config(text='\n'.join(info))
+                self.finish_play(calib_button)
+
+            self.cancel_button.config(state="normal")
+            self.run_task(calibrate_groups, show_event, finish)
+            return
+
+        elif "Single-shot" in self.how_to_calibrate.get():
+            for j in range(1, 4):
+                self.label_status_s[j][1].config(text='')
+                self.label_status_s[j][2].config(text='')
+            self.lb_uncertainty.config(text='')
+            try:
+                criteria = termination_criteria(self.calib_max_iter.get(), self.calib_eps.get(), self.session.m_stereo)
+            except (ValueError, tk.TclError):
+                criteria = None
+
+            def calibrate_all(task):
+                # runs in the thread of the task, the cancel is checked between the calibrations of the cameras
+                time_play = chronometer()
+                if not self.session.calibrate_single_shot(flags_parameters, criteria, task.cancel_event) or \
+                        not self.session.has_intrinsics():
+                    return False
+                elapsed_time_1 = time_play.gettime()
+                task.post(EVENT_STATUS, 1, elapsed_time_1)
+                # Camera projections
+                self.session.calculate_projection()
+                elapsed_time_2 = time_play.gettime()
+                task.post(EVENT_STATUS, 2, elapsed_time_2 - elapsed_time_1)
+                # Calculate RMS error
+                self.session.calculate_error(task.progress)
+                task.post(EVENT_STATUS, 3, time_play.gettime() - elapsed_time_2)
+                return True
+
+            def show_event(name, *args):
+                if name == EVENT_STATUS:
+                    self.show_status(self.label_status_s, *args)
+                elif name == EVENT_PROGRESS:
+                    self.show_progress(*args)
+
+            def finish(task):
+                if task.error is None and not task.result and task.cancelled():
+                    # the session keeps its previous calibration
+                    self.label_status_s[1][1].config(text=u'\u2718')
+                    self.lb_uncertainty.config(text='Cancelled, the previous calibration is kept')
+                elif task.error is not None or not task.result:
+                    self.label_status_s[1][1].config(text=u'\u2718')
+                    self.reset_camera_parameters()
+                    self.reset_error()
+                elif not self.session.error_is_finite():
+                    logging.warning('Error is too high')
+                    self.label_status_s[3][1].config(text=u'\u2718')
+                    self.reset_camera_parameters()
+                    self.reset_error()
+                else:
+                    # deviations of the single-shot calibration against the ones of the last clustering
+                    self.lb_uncertainty.config(text=self.session.uncertainty_report())
+                    self.bot[8].config(state="normal")  # enable export parameters button
+                    self.bot[9].config(state="normal")  # enable export parameters button
+                self.finish_play(calib_button)
+
+            self.cancel_button.config(state="normal")
+            self.run_task(calibrate_all, show_event, finish)
+            return
 
         elif "Load" in self.how_to_calibrate.get():
             b_continue = True
-            for j in range(2 * (self.n_cameras - 1) + 1):
+            extrinsics = False
+            for j in range(2 * (self.session.n_cameras - 1) + 1):
                 if '.txt' not in self.l_load_files[j].cget('text'):
                     if j == 2:
                         self.l_load_files[j].config(text='Missing Extrinsics', fg='green')
                         self.label_status_l[3][1].config(text=u'\u2718')
-                        if b_continue:
-                            # TODO: Adjust for different sizes in Load mode
-                            width = max(self.size[0][1], self.size[1][1])
-                            height = max(self.size[0][0], self.size[1][0])
-                            rms, self.camera_matrix[0], self.dist_coefs[0], self.camera_matrix[1], self.dist_coefs[
-                                1], R, T, E, F = cv2.stereoCalibrate(self.objpoints, self.imgpoints[0],
-                                                                     self.imgpoints[1], self.camera_matrix[0],
-                                                                     self.dist_coefs[0], self.camera_matrix[1],
-                                                                     self.dist_coefs[1], (width, height),
-                                                                     flags=cv2.CALIB_FIX_INTRINSIC + flags_parameters)
-                            if rms != 0:
-                                self.R_stereo = R
-                                self.T_stereo = T
-                                self.label_status_l[3][0].config(text='3. Calculating Extrinsics')
-                                self.label_status_l[3][1].config(text=u'\u2714')
-                            else:
-                                logging.error('Calibration fails')
-                                b_continue = False
-                                self.label_status_l[j + 1][1].config(text=u'\u2718')
-                                self.label_status_l[4][1].config(text=u'\u2718')
+                        # the extrinsics are calculated in the task, with the projections and the error
+                        extrinsics = True
                     else:
                         self.l_load_files[j].config(text='File missing, please add', fg='red')
                         b_continue = False
@@ -272,101 +254,119 @@ class Mixin:
                         self.label_status_l[4][1].config(text=u'\u2718')
 
             if b_continue:
-                for i in range(self.n_cameras):
-                    if self.camera_matrix[i][0][0] == 0:  # Fx is zero only when reset
-                        logging.debug('Data for camera %s not available', i + 1)
+                def calculate_loaded(task):
+                    # runs in the thread of the task
+                    if extrinsics and not self.session.calibrate_extrinsics(flags_parameters):
+                        return None
+                    if not self.session.has_intrinsics():
+                        return False
+                    logging.debug('Correct!')
+                    # Camera projections
+                    self.session.calculate_projection()
+                    # Calculate RMS error
+                    self.session.calculate_error(task.progress)
+                    return True
+
+                def show_event(name, *args):
+                    if name == EVENT_PROGRESS:
+                        self.show_progress(*args)
+
+                def finish(task):
+                    if extrinsics:
+                        if task.error is not None or task.result is None:
+                            self.label_status_l[3][1].config(text=u'\u2718')
+                        else:
+                            self.label_status_l[3][0].config(text='3. Calculating Extrinsics')
+                            self.label_status_l[3][1].config(text=u'\u2714')
+                    if task.error is not None or task.result is None:
+                        self.label_status_l[4][1].config(text=u'\u2718')
+                        self.finish_play(calib_button)
+                        return
+                    if not task.result:
                         self.reset_camera_parameters()
                         self.reset_error()
-                        break
-                    if i == self.n_cameras - 1:
-                        logging.debug('Correct!')
-                        # Camera projections
-                        self.calculate_projection()
-                        # Calculate RMS error
-                        self.calculate_error()
+                    else:
                         self.bot[8].config(state="normal")  # enable export parameters button
                         self.bot[9].config(state="normal")  # enable export parameters button
 
-                for e in self.rms:
-                    if e == float("inf") or e == float("-inf"):
+                    if not self.session.error_is_finite():
                         logging.warning('Error is too high')
                         self.reset_camera_parameters()
                         self.reset_error()
                         self.label_status_l[4][1].config(text=u'\u2718')
                         self.bot[8].config(state="disable")  # enable export parameters button
                         self.bot[9].config(state="disable")  # enable export parameters button
-                        break
                     else:
                         self.label_status_l[4][1].config(text=u'\u2714')
+                    self.finish_play(calib_button)
+
+                self.run_task(calculate_loaded, show_event, finish)
+                return
+
+        self.finish_play(calib_button)
 
+    def finish_play(self, calib_button):
+        '''
+        Function to show the camera parameters and enable the buttons at the end of a calibration
+        '''
         self.update = True  # Update bool activated
 
         self.updateCameraParametersGUI()
         self.loadBarError([0, 1])
         calib_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
         self.bot[5].config(relief="raised")
         self.bot[5].config(state="normal")
 
-    def calculate_projection(self, r=None, t=None):
-        if t is None:
-            t = []
-        if r is None:
-            r = []
-        op = self.objpoints
-        ip = self.imgpoints
-        c = self.camera_matrix
-        d = self.dist_coefs
-
-        for j in range(self.n_cameras):
-            self.projected[j] = []
-            self.projected_stereo[(j + 1) % 2] = []
-            for i in range(len(op)):
-                if not r:
-                    _, r1, t1, _ = cv2.solvePnPRansac(op[i], ip[j][i], c[j], d[j])
-                else:
-                    r1 = r[j][i]
-                    t1 = t[j][i]
-
-                imgpoints2, _ = cv2.projectPoints(op[i], r1, t1, c[j], d[j])
-                self.projected[j].append(imgpoints2)
-
-                if self.m_stereo:
-                    r1 = cv2.Rodrigues(r1)[0]
-
-                    if j == 1:
-                        r2 = np.dot(np.linalg.inv(self.R_stereo), r1)
-                        t2 = np.dot(np.linalg.inv(self.R_stereo), t1) - np.dot(np.linalg.inv(self.R_stereo),
-                                                                               self.T_stereo)
-                    else:
-                        r2 = np.dot(self.R_stereo, r1)
-                        t2 = np.dot(self.R_stereo, t1) + self.T_stereo
-
-                    imgpoints2, _ = cv2.projectPoints(op[i], r2, t2, c[(j + 1) % 2], d[(j + 1) % 2])
-                    self.projected_stereo[(j + 1) % 2].append(imgpoints2)
-
-    def calculate_error(self):
-        for j in range(self.n_cameras):
-            ip = self.imgpoints[j]
-            self.r_error_p[j] = []
-            self.r_error[j] = []
-            for i in range(len(ip)):
-                if self.m_stereo:
-                    imgpoints2 = self.projected_stereo[j][i]
-                else:
-                    imgpoints2 = self.projected[j][i]
-                self.r_error[j].append(np.sqrt((np.power(np.linalg.norm(ip[i] - imgpoints2, axis=2), 2).mean())))
-                self.r_error_p[j].append(np.linalg.norm(ip[i] - imgpoints2, axis=2))
-                # Calculated value to update progressbar
-                c_porcent = (j * len(ip) + i + 1) / float(self.n_cameras * len(ip))
-                self.progbar["value"] = c_porcent * 10.0
-                self.style_pg.configure('text.Horizontal.TProgressbar',
-                                        text='{:g} %'.format(c_porcent * 100.0))  # update label
-                self.popup.update()  # for updating while running other process
-                # update rms when the error for all the images is calculated
-                if len(self.r_error[j]) == len(ip):
-                    logging.info("Updating RMS for camera %d", j + 1)
-                    self.rms[j] = np.sqrt(np.sum(np.square(self.r_error[j])) / len(self.r_error[j]))
-                    if j == 1:
-                        self.rms[2] = np.sqrt(
-                            np.sum(np.square(self.r_error[0] + self.r_error[1])) / len(
-                                self.r_error[0] + self.r_error[1]))
\ No newline at end of file
+    def update_calibration(self, added=()):
+        '''
+        Function to update the current calibration after poses are added (indices in added) or deleted
+        Only if the incremental update is selected and there are intrinsics, a full calibration is run from play
+        The camera parameters are refined only if selected, otherwise only the errors of the new poses are calculated
+        The update runs in a background task, the charts are marked as not updated until a refinement finishes
+        '''
+        if not self.incremental_update.get() or not self.session.has_intrinsics() or self.n_total.get() == 0:
+            return
+        flags_parameters = calibration_flags(self.p_intrinsics_guess.get(), self.p_fix_point.get(),
+                                             self.p_fix_ratio.get(), self.p_zero_tangent_distance.get())
+        refine = self.refine_update.get()
+        # the camera parameters don't include the added poses until they are refined
+        self.update = False
+
+        def update(task):
+            # runs in the thread of the task, the views are redrawn when it finishes
+            return self.session.update_calibration(flags_parameters, added=added, refine=refine)
+
+        def finish(task):
+            if task.error is not None or not task.result:
+                logging.warning('The calibration could not be updated')
+            elif refine:
+                self.update = True  # Update bool activated
+            self.updateCameraParametersGUI()
+            self.loadBarError([0, 1])
+
+        # the update doesn't post events
+        self.run_task(update, lambda *event: None, finish)
+
+    def show_status(self, label_status, row, elapsed_time):
+        '''
+        Function to mark a step of the calibration as done with its time
+        '''
+        label_status[row][1].config(text=u'\u2714')
+        label_status[row][2].config(text='%0.5f' % elapsed_time)
+
+    def show_progress(self, c_porcent, elapsed_time):
+        '''
+        Function to show the progress of a stage of the calibration
+        '''
+        self.progbar["value"] = c_porcent * 10.0
+        self.style_pg.configure('text.Horizontal.TProgressbar',
+                                text='{:g} %'.format(c_porcent * 100.0))  # update label
+
+    def show_progress_play(self, c_porcent, elapsed_time):
+        '''
+        Function to show the progress of the calibrations and the estimated time left
+        '''
+        self.lb_time.config(
+            text='Estimated time left: %0.5f seconds' % max(elapsed_time * (1 / c_porcent - 1), 0))
+        self.show_progress(c_porcent, elapsed_time)
@@ -1,5 +1,8 @@
 import logging
-import numpy as np
+import tkinter as tk
+import datastring
+from background_task import EVENT_PROGRESS
+from calibration_session import PRUNE_FACTOR, calibration_flags
 
 logging.basicConfig(level=logging.ERROR)
 
@@ -8,54 +11,28 @@ class Mixin:
         '''
         Function to reset error related variables
         '''
-        # array of rms error for each pose
-        self.r_error = [None, None]
-        # array of pixel distance error for each feature
-        self.r_error_p = [[], []]
-        # projections
-        self.projected = [[], []]
-        self.projected_stereo = [[], []]
+        self.session.reset_error()
 
     def reset_camera_parameters(self):
         '''
         Function to reset all intrinsics and extrinsics parameters
         '''
-        # camera matrix
-        # array of 2 of 3*3 for camera parameters (mean and standard deviation)
-        self.camera_matrix = [np.zeros((3, 3), dtype=np.float32), np.zeros((3, 3), dtype=np.float32)]
-        self.dev_camera_matrix = [np.zeros((3, 3), dtype=np.float32), np.zeros((3, 3), dtype=np.float32)]
-        # array of 2 of 5*1 for distortion parameters (mean and standard deviation)
-        self.dist_coefs = [np.zeros((5, 1), dtype=np.float32), np.zeros((5, 1), dtype=np.float32)]
-        self.dev_dist_coefs = [np.zeros((5, 1), dtype=np.float32), np.zeros((5, 1), dtype=np.float32)]
-        # rotational and translation matrix
-        self.R_stereo = np.zeros((3, 3), dtype=np.float32)
-        self.T_stereo = np.zeros((3, 1), dtype=np.float32)
-        # rms error
-        self.rms = [0, 0, 0]
-        
+        self.session.reset_camera_parameters()
+
     def del_single(self):
         '''
-        Function to delete with Del key one image
+        Function to delete with Del key one image, not while a task uses the session
         '''
+        if self.task is not None:
+            return
         # get current index
         index = self.listbox.curselection()
         if index:
             self.update = False
             # delete for each selected image the path, original image, features, projections, and erros from the corresponding list
-            for j in range(self.n_cameras):
-                del self.paths[j][index[0]]
+            self.session.delete_pose(index[0])
+            for j in range(self.session.n_cameras):
                 del self.img_original[j][index[0]]
-                del self.detected_features[j][index[0]]
-                if self.projected[j]:  # check if projection data exists
-                    del self.projected[j][index[0]]
-                if j == 1:
-                    if self.projected_stereo[0]:  # check if stereo projection data exists
-                        del self.projected_stereo[0][index[0]]
-                        del self.projected_stereo[1][index[0]]
-                # barchar
-                if self.r_error[j]:  # check if reprojection error data exists
-                    del self.r_error[j][index[0]]
-                    del self.r_error_p[j][index[0]]
             # update number of total poses
             self.n_total.set(self.n_total.get() - 1)
             # check if there is already a selected image in data browser
@@ -78,6 +55,63 @@ class Mixin:
                     self.bot[5].config(state="disable")  # disable run calibration button
                     self.index.set(-1)
             self.loadBarError([0, 1])  # uses self.index which is updated in updatepicture
+            self.update_calibration()
+
+    def prune_outliers(self, confirmed=False):
+        '''
+        Function to delete the poses with outlier errors and refine the calibration without them
+        The pruning runs in a background task, the poses are deleted from the session at once and the views are
+        redrawn only at the end
+        The refined parameters replace the loaded ones in Load mode, so it is confirmed first
+        '''
+        if "Load" in self.how_to_calibrate.get() and not confirmed:
+            self.popup.destroy()
+            self.popupmsg_pruning()
+            return
+        try:
+            factor = self.prune_factor.get()
+        except (ValueError, tk.TclError):
+            factor = PRUNE_FACTOR
+        flags_parameters = calibration_flags(self.p_intrinsics_guess.get(), self.p_fix_point.get(),
+                                             self.p_fix_ratio.get(), self.p_zero_tangent_distance.get())
+
+        def prune(task):
+            # runs in the thread of the task, img_original is updated by the GUI when it finishes
+            return self.session.prune_outliers(flags_parameters, factor=factor, progress=task.progress,
+                                               cancel=task.cancel_event)
+
+        def show_event(name, *args):
+            if name == EVENT_PROGRESS:
+                self.show_progress(*args)
+
+        def finish(task):
+            report = task.result
+            if report is not None and report.pruned:
+                for j in range(self.session.n_cameras):
+                    for i in sorted(report.pruned, reverse=True):
+                        del self.img_original[j][i]
+                self.update = True  # Update bool activated
+                # the heat map and the data browser are updated once by the trace of n_total
+                self.n_total.set(len(self.session.paths[0]))
+                self.index.set(0)
+                self.listbox.select_set(0)
+                self.updateCameraParametersGUI()
+                self.loadBarError([0, 1])
+            # the popup closed while the pruning ran is destroyed after the task
+            if self.close_after_task:
+                return
+            self.popup.destroy()
+            if report is None:
+                return
+            text = datastring.pruning2string(report)
+            if task.cancelled():
+                text += '\n\nCancelled, the poses pruned before are deleted'
+            self.popupreport('Pruning of outlier poses', text)
+
+        # the settings popup is replaced by the one of the progress
+        self.popup.destroy()
+        self.popupprogress('Pruning of outlier poses')
+        self.run_task(prune, show_event, finish)
 
     def del_all(self):
         '''
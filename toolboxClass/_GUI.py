@@ -1,34 +1,40 @@
 import logging
 import os
 import tkinter as tk
+from collections import OrderedDict
 from tkinter import ttk
 import numpy as np
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
+from background_task import EVENT_DONE, BackgroundTask
+from bar_chart import BarChart
+from calibration_session import DEFAULT_MAX_ITER, PRUNE_FACTOR, CalibrationSession, default_calibration_workers
+from detection_tools import StrategyStatistics, default_workers
+from image_store import DEFAULT_BUDGET, ImageStore
+from zoom_renderer import ZoomRenderer
 
 logging.basicConfig(level=logging.ERROR)
 
 DEFAULT_WIDTH = 320
 DEFAULT_HEIGHT = 240
+# time in milliseconds between two reads of the events of a background task
+POLL_INTERVAL = 50
 
 class Mixin:
     def initializeVariables(self):
         '''
         Function to define variables that has to be reinitialized each time a session is deleted
         '''
-        # total number of cameras
-        self.n_cameras = 0
-        # size for each camera, used for internal functions
-        self.size = [None, None]
-        # 3d points in real world space
-        self.objpoints = [[], []]
-        # 2d points in image plane
-        self.imgpoints = [[], []]
-        # 3d points for pattern type
-        self.object_pattern = None
+        # data and computations of the session, see CalibrationSession
+        self.session = CalibrationSession()
 
         # bool to indicate if any image was deleted after calibration
         self.update = False
+        # running BackgroundTask and request to close its popup when it finishes
+        self.task = None
+        self.close_after_task = False
+        # state of the toolbar buttons before the task, they are disabled while it runs
+        self.task_states = []
 
         # GUI related variables
         self.imscale = 1.0
@@ -48,19 +54,27 @@ class Mixin:
 
         # process variables
         self.heat_map = [None, None]
+        # density of the features of each camera, see HeatMapEngine
+        self.heat_engine = [None, None]
+        # rendered images of the tabs by (camera, pose, tab, zoom, version, corner), see rendered_image
+        self.rendered = OrderedDict()
+        # changes when the heat map or the calibration change, the images rendered before are not used
+        self.render_version = 0
+        # pyramids of the full resolution images of the tabs for the zoom, see image_pyramid
+        self.pyramids = OrderedDict()
+        # zoom of the panels of the images
+        self.zoom = ZoomRenderer(DEFAULT_WIDTH, DEFAULT_HEIGHT)
         self.img = [[[], [], [], [], [], []], [[], [], [], [], [], []]]
         self.index.set(-1)
         self.index_corner = 0
-        self.paths = [[], []]
-        self.img_original = [[], []]
-        self.detected_features = [[], []]
+        # normalized images, only the full frames which fit in the memory budget are kept
+        self.img_original = [ImageStore(self.image_budget_bytes()), ImageStore(self.image_budget_bytes())]
+        # strategies of the detection (inverted image, width - height) that succeed in the session
+        self.detection_statistics = StrategyStatistics()
         # total number of images (couple of images for the stereo mode)
         self.n_total.set(0)
 
-        self.p_width = None
-        self.p_height = None
         self.p_length = None
-        self.m_stereo = True
 
         # bar chart variables
         self.dr = [[], []]
@@ -68,22 +82,64 @@ class Mixin:
         # variable for importing files
         self.ftypes = None
         self.valid_files = None
-
-        # array for all calibrations
-        self.fx_array = []
-        self.fy_array = []
-        self.cx_array = []
-        self.cy_array = []
-        self.k1_array = []
-        self.k2_array = []
-        self.k3_array = []
-        self.k4_array = []
-        self.k5_array = []
-        self.R_array = []
-        self.T_array = []
-        self.RMS_array = []
-        self.samples = None
         
+    def image_budget_bytes(self):
+        '''
+        Function to get the memory budget in bytes for the full images of one camera, the budget is split between
+        the cameras of the session (the mode is set before the images are added, see add_file)
+        '''
+        try:
+            budget = self.image_budget.get()
+        except (ValueError, tk.TclError):
+            budget = 2 * DEFAULT_BUDGET // (1024 * 1024)
+        return budget * 1024 * 1024 // max(1, self.session.n_cameras)
+
+    def run_task(self, target, show_event, finish):
+        '''
+        Function to run target(task) in a BackgroundTask, the events of the task are given to show_event every
+        POLL_INTERVAL ms and finish(task) is called when target returns, both in the thread of the GUI
+        The session is used by the task, so the toolbar buttons which add, delete or edit poses are disabled until
+        it finishes
+        '''
+        self.task_states = [button.cget('state') for button in self.bot]
+        for button in self.bot:
+            button.config(state="disable")
+        self.task = BackgroundTask(target).start()
+        self.master.after(POLL_INTERVAL, self.poll_task, show_event, finish)
+
+    def poll_task(self, show_event, finish):
+        '''
+        Function to read the events of the running task
+        '''
+        task = self.task
+        for event in task.poll():
+            if event[0] != EVENT_DONE:
+                show_event(*event)
+        if not task.done:
+            self.master.after(POLL_INTERVAL, self.poll_task, show_event, finish)
+            return
+        self.task = None
+        for button, state in zip(self.bot, self.task_states):
+            button.config(state=state)
+        finish(task)
+        if self.close_after_task:
+            self.close_after_task = False
+            self.popup.destroy()
+
+    def cancel_task(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    def close_popup(self):
+        '''
+        Function to close the popup, a running task is cancelled first and the popup is closed when it stops
+        '''
+        if self.task is None:
+            self.popup.destroy()
+        else:
+            self.close_after_task = True
+            self.task.cancel()
+
     def center(self):
         '''
         Function to center popups and disable the main windows
@@ -116,6 +172,10 @@ class Mixin:
         self.pattern_height = tk.IntVar()
         self.feature_distance = tk.DoubleVar()
         self.mode_stereo = tk.BooleanVar()
+        # coarse-to-fine detection for high resolution images
+        self.pyramid_detection = tk.BooleanVar()
+        # detector backend for chessboard patterns
+        self.detector_backend = tk.StringVar()
         # image features variables
         self.image_width = tk.IntVar()
         self.image_height = tk.IntVar()
@@ -134,11 +194,57 @@ class Mixin:
         self.f = [[], []]
         self.ax = [[], []]
         self.bar = [[], []]
+        # bars of the charts as one collection with the selection blitted, see BarChart
+        self.charts = [[], []]
+        self.fast_charts = tk.BooleanVar()
+        self.fast_charts.set(True)
         # flags for camera calibrations
         self.p_intrinsics_guess = tk.BooleanVar()
         self.p_fix_point = tk.BooleanVar()
         self.p_fix_ratio = tk.BooleanVar()
         self.p_zero_tangent_distance = tk.BooleanVar()
+        # number of processes for the detection of features
+        self.n_workers = tk.IntVar()
+        self.n_workers.set(default_workers())
+        # reuse of the features stored on disk for already detected images
+        self.use_detection_cache = tk.BooleanVar()
+        self.use_detection_cache.set(True)
+        # run the strategies of the detection (inverted image, width - height) at the same time
+        self.concurrent_strategies = tk.BooleanVar()
+        # termination criteria of the calibrations, epsilon 0 uses the OpenCV default
+        self.calib_max_iter = tk.IntVar()
+        self.calib_max_iter.set(DEFAULT_MAX_ITER)
+        self.calib_eps = tk.DoubleVar()
+        self.calib_eps.set(0)
+        # calibrate all the images first and start every group from that solution
+        self.warm_start = tk.BooleanVar()
+        # calibrate a few groups again without warm start to compare their time and iterations
+        self.compare_warm_start = tk.BooleanVar()
+        self.compare_warm_start.set(False)
+        # stop the calibration of groups when the parameters converge or after a time budget (s, 0 for none)
+        self.adaptive_stop = tk.BooleanVar()
+        self.adaptive_tolerance = tk.DoubleVar()
+        self.adaptive_tolerance.set(0.001)
+        self.adaptive_budget = tk.DoubleVar()
+        self.adaptive_budget.set(0)
+        # write the finished groups to a checkpoint in the directory of the images and resume from it
+        self.save_checkpoint = tk.BooleanVar()
+        self.resume_checkpoint = tk.BooleanVar()
+        # draw the groups of the last calibration again first, their results are taken from the subset cache
+        self.keep_groups = tk.BooleanVar()
+        # update the current calibration when poses are added or deleted instead of waiting for a new one
+        self.incremental_update = tk.BooleanVar()
+        # refine the camera parameters in the update, otherwise only the new poses are solved
+        self.refine_update = tk.BooleanVar()
+        # poses with an error above this multiple of the median error are pruned
+        self.prune_factor = tk.DoubleVar()
+        self.prune_factor.set(PRUNE_FACTOR)
+        # number of processes for the calibration of subsets
+        self.n_calibration_workers = tk.IntVar()
+        self.n_calibration_workers.set(default_calibration_workers())
+        # memory for the full images of all the cameras in MB
+        self.image_budget = tk.IntVar()
+        self.image_budget.set(2 * DEFAULT_BUDGET // (1024 * 1024))
         # Variables for intrinsic and extrinsic parameters visualization
         # camera parameters
         self.fx = [tk.StringVar(), tk.StringVar()]
@@ -199,37 +305,16 @@ class Mixin:
                 if self.label_msg[j].cget('text'):
                     return
             # if 3d points aren't initialized
-            if self.object_pattern is None:
+            if self.session.object_pattern is None:
                 return
-            elif not self.object_pattern.any():
+            elif not self.session.object_pattern.any():
                 return
 
         # checks
         if 'Images' in self.pattern_load.get():
-            # creates object from Chessboard pattern
-            if "Chessboard" in self.pattern_type.get():
-                self.object_pattern = np.zeros((self.p_width * self.p_height, 3), np.float32)
-                grid = np.mgrid[0:self.p_height, 0:self.p_width].T.reshape(-1, 2) * self.f_distance
-                self.object_pattern[:, 0] = -grid[:, 1]
-                self.object_pattern[:, 1] = grid[:, 0]
-            # creates object from Grid pattern
-            elif "Asymmetric Grid" in self.pattern_type.get():
-                pattern_size = (self.p_height, self.p_width)
-                self.object_pattern = np.zeros((np.prod(pattern_size), 3), np.float32)
-                self.object_pattern[:, :2] = np.fliplr(np.indices(pattern_size).T.reshape(-1, 2))
-                for i in range(np.prod(pattern_size)):
-                    if self.object_pattern[i, 0] % 2 == 0:
-                        self.object_pattern[i, 1] = self.object_pattern[i, 1] * self.f_distance
-                        self.object_pattern[i, 0] = self.object_pattern[i, 0] * self.f_distance / 2
-                    else:
-                        self.object_pattern[i, 1] = self.object_pattern[i, 1] * self.f_distance + self.f_distance / 2
-                        self.object_pattern[i, 0] = self.object_pattern[i, 0] * self.f_distance / 2
-            # returns for led pattern (not yet implemented)
-            elif "Symmetric Grid" in self.pattern_type.get():
-                self.object_pattern = np.zeros((self.p_width * self.p_height, 3), np.float32)
-                grid = np.mgrid[0:self.p_height, 0:self.p_width].T.reshape(-1, 2) * self.f_distance
-                self.object_pattern[:, 0] = -grid[:, 1]
-                self.object_pattern[:, 1] = grid[:, 0]
+            # creates object from the pattern type
+            self.session.set_pattern(self.pattern_type.get(), self.session.p_height, self.session.p_width,
+                                     self.session.f_distance)
 
             # set default image type
             self.valid_files = [".jpg", ".png"]
@@ -239,7 +324,7 @@ class Mixin:
             self.ftypes = [('Text files', '*.txt')]
             self.tabControl[0].tab(0, state="disable")  # Disable tab for original image
 
-        self.m_stereo = self.mode_stereo.get()
+        self.session.set_mode(self.mode_stereo.get())
 
         self.popup.destroy()
 
@@ -255,8 +340,7 @@ class Mixin:
         self.bot[6].config(state="normal")  # enable delete session button
         self.bot[7].config(state="normal")  # settings button
 
-        if self.m_stereo:
-            self.n_cameras = 2
+        if self.session.m_stereo:
             self.bot[1].config(state="disable")  # disable adding images per file button
             # set GUI for two camera
             self.frm[4].grid(row=1, column=3, sticky=tk.N + tk.S)  # frame for extrinsics
@@ -266,7 +350,6 @@ class Mixin:
             self.frm[10].grid(row=1, column=1)  # frame for second grafic second camera
             self.tabControl[0].tab(4, state="normal")  # Enable tab for extrinsic Reprojection
         else:
-            self.n_cameras = 1
             # set GUI for one camera
             self.frm[4].grid_forget()
             self.frm[5].grid_forget()
@@ -445,6 +528,8 @@ class Mixin:
                 self.list_panel[j][i].bind('<Button-5>', lambda e: self.scroll_to_zoom('l', e))
                 self.list_image_on_panel[j].append(
                     self.list_panel[j][i].create_image(0, 0, anchor=tk.N + tk.W, image=None))
+            # only the visible tab is drawn, the others when they are selected
+            self.tabControl[j].bind('<<NotebookTabChanged>>', lambda e, j=j: self.show_tab(j))
             self.tabControl[j].grid(row=0, column=0, rowspan=13, sticky=tk.N + tk.S)
         # definition of text of labels
         for j in range(2):
@@ -532,6 +617,7 @@ class Mixin:
                 self.bar[i].append(FigureCanvasTkAgg(self.f[i][-1], master=self.frm[7 + j + 2 * i]))
                 self.bar[i][-1].draw()
                 self.bar[i][-1].get_tk_widget().grid(row=0, column=0, sticky=tk.W + tk.E)
+                self.charts[i].append(BarChart(self.ax[i][-1], self.bar[i][-1]))
                 # creating click event over the figures
                 self.f[i][-1].canvas.mpl_connect('button_press_event', lambda e, a=i, b=j: self.on_press(e, a,
                                                                                                          b))
@@ -3,11 +3,18 @@ import os
 import tkinter as tk
 from tkinter import ttk
 from tkinter import filedialog
-import cv2
 import numpy as np
+import datastring
+from background_task import EVENT_PROGRESS
+from calibration_session import read_object_points
+from detection_cache import cache_of, caches_for
+from detection_tools import DetectionSettings, compare_backends, default_workers, detect_features_parallel
 
 logging.basicConfig(level=logging.ERROR)
 
+# event of the detection of one image (index of the file, DetectionResult)
+EVENT_RESULT = 'result'
+
 class Mixin:
     def load_3D_points(self):
         '''
@@ -16,13 +23,12 @@ class Mixin:
         self.load_files[0] = tk.filedialog.askopenfilenames(parent=self.popup,
                                                             filetypes=[('Text files', '*.txt')])  # , multiple = False)
         if len(self.load_files[0]) == 0:
-            self.object_pattern = None
+            self.session.object_pattern = None
             self.l_load_files[0].config(text='File missing, please add', fg='red')
         else:
-            set_3D_points = np.fromfile(self.load_files[0][0], dtype=np.float32, sep=',')
-            if len(set_3D_points) % 3 != 0:
+            if read_object_points(self.load_files[0][0]) is None:
                 self.l_load_files[0].config(text='No 3D points', fg='red')
-                self.object_pattern = None
+                self.session.object_pattern = None
             else:
                 self.l_load_files[0].config(text=self.load_files[0][0].rsplit('/', 1)[1], fg='black')
                 self.check_errors_and_plot(None)
@@ -40,7 +46,7 @@ class Mixin:
         else:
             list_path = []
             t_options = [' (first camera)', ' (second camera)']
-            while len(list_path) < self.n_cameras:
+            while len(list_path) < self.session.n_cameras:
                 # create dialog for adding folders
                 t_choose = 'Please select a folder for ' + title_dialog + t_options[len(list_path)]
                 path_folder = tk.filedialog.askdirectory(parent=self.master, title=t_choose)
@@ -75,21 +81,66 @@ class Mixin:
             return
         else:
             self.l_load_files[j].config(text=self.load_files[j][0].rsplit('/', 1)[1], fg='black')
-            f = open(self.load_files[j][0], 'r')
-            a = f.read()
-            if j <= 1:
-                self.camera_matrix[j], self.dist_coefs[j] = datastring.string2intrinsic(a)
-            else:
-                self.R_stereo, self.T_stereo = datastring.string2extrinsic(a)
+            self.session.load_parameters(j, self.load_files[j][0])
             # update status check
             self.label_status_l[j + 1][1].config(text=u'\u2714')
             if j == 2:
                 self.label_status_l[3][0].config(text='3. Loading Extrinsics')
-            self.rms = [0, 0, 0]
-            self.reset_error()
             self.updateCameraParametersGUI()
             self.loadBarError([0, 1])
 
+    def clear_detection_cache(self):
+        '''
+        Function to invalidate the detection cache of the directories of the session
+        '''
+        paths = [p for j in range(self.session.n_cameras) for p in self.session.paths[j] if p is not None]
+        for cache in caches_for(paths).values():
+            cache.invalidate()
+
+    def compare_detector_backends(self):
+        '''
+        Function to show the time and accuracy of each chessboard detector for the images of the session
+        The comparison runs in a background task, the report is shown when it finishes
+        '''
+        if 'Chessboard' not in self.pattern_type.get() or '.txt' in self.valid_files:
+            return
+        settings = DetectionSettings(self.pattern_type.get(), self.session.p_height, self.session.p_width,
+                                     self.pyramid_detection.get(), self.detector_backend.get())
+        n_cameras = self.session.n_cameras
+        paths = [[p for p in self.session.paths[j] if p is not None] for j in range(n_cameras)]
+
+        def compare(task):
+            # runs in the thread of the task, the images are read one at a time
+            reports = []
+            for j in range(n_cameras):
+                reports.append(compare_backends(paths[j], settings, progress=lambda c, t, j=j: task.progress(
+                    (j + c) / n_cameras, t), cancel=task.cancel_event))
+                if task.cancelled():
+                    break
+            return reports
+
+        def show_event(name, *args):
+            if name == EVENT_PROGRESS:
+                self.show_progress(*args)
+
+        def finish(task):
+            # the popup closed while the comparison ran is destroyed after the task
+            if self.close_after_task:
+                return
+            self.popup.destroy()
+            if task.error is not None:
+                return
+            text = ['Camera %d\n' % (j + 1) + datastring.backends2string(reports)
+                    for j, reports in enumerate(task.result)]
+            if task.cancelled():
+                text.append('Cancelled, only the images compared before are reported')
+            self.popupreport('Comparison of chessboard detectors', '\n\n'.join(text))
+
+        # the settings popup is replaced by the one of the progress
+        self.popup.destroy()
+        self.popupprogress('Comparison of chessboard detectors')
+        self.run_task(compare, show_event, finish)
+
     def add_file(self, typeof):
         '''
         Function to add files to the session
@@ -101,118 +152,21 @@ class Mixin:
 
         l_msg = self.popupmsg()
 
+        # the imported poses are added after the ones of the session
+        n_before = len(self.session.paths[0])
+
         rejected_images = []
         repeated_images = []
+        calls_before = self.detection_statistics.calls
+        saved_before = self.detection_statistics.saved
 
-        for i in range(len(file_names_2D_points)):
-            file_name_2D_points = file_names_2D_points[i]
-            j = 0
-            if self.m_stereo:
-                # this corresponds to the right camera
-                if i >= len(file_names_2D_points) / 2:
-                    j = 1
-            # checks if images isn't repeated
-            if file_name_2D_points not in self.paths[j]:
-                if '.txt' not in self.valid_files:
-                    # read image file
-                    im = np.float32(cv2.imread(file_name_2D_points, 0))
-                    # original: normalized read image
-                    im = (255.0 * (im - im.min()) / (im.max() - im.min())).astype(np.uint8)
-                    ret = False
-                    features = None
-
-                    # creates copy of im, performance test found in https://stackoverflow.com/questions/48106028/python-copy-an-array-array
-                    im2 = im * 1
-                    for cycle in range(2):
-                        logging.debug('Cycle... %d', cycle + 1)
-                        if cycle == 1:
-                            logging.debug('Inverting image')
-                            im2 = 255 - im2
-                        # find features for chessboard pattern type
-                        if 'Chessboard' in self.pattern_type.get():
-                            ret, features = cv2.findChessboardCorners(im2, (self.p_height, self.p_width))
-                            if ret:
-                                # improve feature detection
-                                criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 130,
-                                            0.25)  ### EPS realistisch einstellen je nach Bildaufloesung (z.B fuer (240x320) 0.1, 0.25)
-                                cv2.cornerSubPix(im2, features, (3, 3), (-1, -1), criteria)
-                                break
-                        # find features for asymmetric grid pattern type
-                        elif 'Asymmetric Grid' in self.pattern_type.get():
-                            features = np.array([], np.float32)
-                            ret, features = cv2.findCirclesGrid(im2, (self.p_height, self.p_width), features,
-                                                                cv2.CALIB_CB_ASYMMETRIC_GRID)
-                            if ret:
-                                break
-                        # find features for asymmetric grid pattern type
-                        elif 'Symmetric Grid' in self.pattern_type.get():
-                            features = np.array([], np.float32)
-                            '''
-                            Since the findCirclesGrid algorithm for symmetric grid usually fails for a wrong height - width configuration,
-                            we invert here those parameters 
-                            '''
-                            for inner_cycle in range(2):
-                                if inner_cycle == 0:
-                                    logging.debug('height - width')
-                                    ret, features = cv2.findCirclesGrid(im2, (self.p_height, self.p_width),
-                                                                        features,
-                                                                        cv2.CALIB_CB_SYMMETRIC_GRID)
-                                    if ret:
-                                        break
-                                else:
-                                    logging.debug('width - height')
-                                    ret, features = cv2.findCirclesGrid(im2, (self.p_width, self.p_height),
-                                                                        features,
-                                                                        cv2.CALIB_CB_SYMMETRIC_GRID)
-
-                                    if ret:
-                                        # trasform the detected features configuration to match the original (height, width)
-                                        features = features.reshape(self.p_height, self.p_width, 1, 2)
-                                        features = np.transpose(features, (1, 0, 2, 3))
-                                        features = features.reshape(self.p_width * self.p_height, 1, 2)
-                                        break
-                            if ret:
-                                break
-
-                    # checks if the detection of features succeed
-                    if ret:
-                        # add file path to path
-                        self.paths[j].append(file_name_2D_points)
-                        # add original of image to img_original
-                        self.img_original[j].append(im)
-                        # add features to detected_features
-                        self.detected_features[j].append(features)
-                    else:
-                        # add image path to rejected_images
-                        rejected_images.append(file_name_2D_points)
-                        # add file path to path
-                        self.paths[j].append(None)
-                        # add original of image to img_original
-                        self.img_original[j].append(None)
-                        # add features to detected_features
-                        self.detected_features[j].append(None)
-
-                else:
-                    a = np.fromfile(file_name_2D_points, dtype=np.float32, sep=',')
-                    a = a.reshape((len(a) / 2, 1, 2))
-                    self.p_height = 1
-                    self.p_width = len(a)
-                    # add file path to path
-                    self.paths[j].append(file_name_2D_points)
-                    # add original of image to img_original
-                    im = np.zeros((self.image_height.get(), self.image_width.get()))
-                    self.img_original[j].append(im)
-                    # add features to detected_features
-                    self.detected_features[j].append(a)
-            else:
-                repeated_images.append(file_name_2D_points)
-
-            c_porcent = (i + 1) / float(len(file_names_2D_points))  # percentage of completion of process
+        def update_message(n_done):
+            c_porcent = n_done / float(len(file_names_2D_points))  # percentage of completion of process
             self.progbar["value"] = c_porcent * 10.0
             self.style_pg.configure('text.Horizontal.TProgressbar',
                                     text='{:g} %'.format(c_porcent * 100.0))  # update label
             # if one or more images failed the importing, show info popup
-            message = 'Imported images: {0} of {1}\n'.format(i + 1 - len(rejected_images) - len(repeated_images),
+            message = 'Imported images: {0} of {1}\n'.format(n_done - len(rejected_images) - len(repeated_images),
                                                              len(file_names_2D_points))
             if rejected_images or repeated_images:
                 # message += 'A total of {0} images could not be loaded\n'.format(len(rejected_images) + len(repeated_images))
@@ -222,24 +176,132 @@ class Mixin:
                     message += 'Rejected: \n {0}\n'.format('\n'.join(rejected_images))
                 if repeated_images:
                     message += 'Repeated: \n {0}'.format('\n'.join(repeated_images))
+            # detector calls saved by the order of strategies learned in the session
+            calls = self.detection_statistics.calls - calls_before
+            message += '\nResident image memory: {0:.1f} MB\n'.format(
+                sum(store.resident_bytes() for store in self.img_original) / (1024.0 * 1024.0))
+            if calls:
+                message += '\nDetector calls: {0} (saved {1})\n'.format(
+                    calls, self.detection_statistics.saved - saved_before)
             l_msg.configure(text=message)
 
-            self.popup.update()
+        for store in self.img_original:
+            store.set_budget(self.image_budget_bytes())
 
-        index_to_delete = [i for i, v in enumerate(self.paths[0]) if v == None]
-        if self.m_stereo:
-            index_to_delete = index_to_delete + [i for i, v in enumerate(self.paths[1]) if v == None]
+        # assign each file to its camera and separate the repeated ones
+        tasks = []
+        new_paths = [set(), set()]
+        for i in range(len(file_names_2D_points)):
+            file_name_2D_points = file_names_2D_points[i]
+            j = 0
+            if self.session.m_stereo:
+                # this corresponds to the right camera
+                if i >= len(file_names_2D_points) / 2:
+                    j = 1
+            # checks if images isn't repeated
+            if file_name_2D_points not in self.session.paths[j] and file_name_2D_points not in new_paths[j]:
+                new_paths[j].add(file_name_2D_points)
+                tasks.append((j, file_name_2D_points))
+            else:
+                repeated_images.append(file_name_2D_points)
+
+        update_message(len(repeated_images))
+        if '.txt' in self.valid_files:
+            for n_task, (j, file_name_2D_points) in enumerate(tasks):
+                # add file path and 2D points to the session
+                self.session.add_points_file(j, file_name_2D_points)
+                # add original of image to img_original
+                im = np.zeros((self.image_height.get(), self.image_width.get()))
+                self.img_original[j].append(im)
+                update_message(len(repeated_images) + n_task + 1)
+                self.popup.update()
+            self.finish_add_file(n_before)
+            return
+
+        # detection of features is fanned out to a pool of processes, results keep the order of tasks
+        try:
+            workers = self.n_workers.get()
+        except (ValueError, tk.TclError):
+            workers = default_workers()
+        use_cache = self.use_detection_cache.get()
+        concurrent = self.concurrent_strategies.get()
+        settings = DetectionSettings(self.pattern_type.get(), self.session.p_height, self.session.p_width,
+                                     self.pyramid_detection.get(), self.detector_backend.get())
+
+        def detect(task):
+            # runs in the thread of the task, the session is only changed by the GUI from the events
+            # features stored on disk for the directories of the files are not detected again
+            caches = {}
+            known_features = {}
+            if use_cache:
+                caches = caches_for([t[1] for t in tasks])
+                for cache in caches.values():
+                    known_features.update(cache.entries)
+            results = detect_features_parallel([t[1] for t in tasks], settings, workers=workers,
+                                               known_features=known_features,
+                                               statistics=self.detection_statistics, concurrent=concurrent)
+            try:
+                for n_task, result in enumerate(results):
+                    if caches:
+                        cache_of(caches, result.path).put(result.key, result.features)
+                    task.post(EVENT_RESULT, n_task, result)
+                    # the images not detected yet are not imported
+                    if task.cancelled():
+                        break
+            finally:
+                results.close()
+                for cache in caches.values():
+                    cache.save()
+
+        def add_result(name, n_task, result):
+            j, file_name_2D_points = tasks[n_task]
+            # checks if the detection of features succeed
+            if result.ok:
+                # add file path and features to the session
+                self.session.add_features(j, file_name_2D_points, result.features)
+                # add original of image to img_original, it can be read again from its path
+                self.img_original[j].append(result.image, file_name_2D_points)
+            else:
+                # add image path to rejected_images
+                rejected_images.append(file_name_2D_points)
+                # add empty file path and features to the session
+                self.session.add_features(j, None, None)
+                # add original of image to img_original
+                self.img_original[j].append(None)
+            update_message(len(repeated_images) + n_task + 1)
+
+        def finish(task):
+            self.bt_msg.config(text='Okay')
+            # poses imported in only one camera are deleted with the rejected ones
+            for j in range(self.session.n_cameras):
+                while len(self.session.paths[j]) < len(self.session.paths[(j + 1) % self.session.n_cameras]):
+                    self.session.add_features(j, None, None)
+                    self.img_original[j].append(None)
+            self.finish_add_file(n_before)
+
+        self.bt_msg.config(text='Cancel')
+        self.run_task(detect, add_result, finish)
+
+    def finish_add_file(self, n_before):
+        '''
+        Function to delete the rejected images and enable the buttons at the end of the importing
+        The poses from n_before are the imported ones
+        '''
+        index_to_delete = [i for i, v in enumerate(self.session.paths[0]) if v == None]
+        if self.session.m_stereo:
+            index_to_delete = index_to_delete + [i for i, v in enumerate(self.session.paths[1]) if v == None]
 
         index_to_delete = sorted(set(index_to_delete), reverse=True)
         # delete rejected images
-        for j in range(self.n_cameras):
+        for j in range(self.session.n_cameras):
             for i in list(index_to_delete):
-                del self.paths[j][i]
+                del self.session.paths[j][i]
                 del self.img_original[j][i]
-                del self.detected_features[j][i]
+                del self.session.detected_features[j][i]
+                del self.session.poses[j][i]
 
         # update total of images
-        self.n_total.set(len(self.paths[0]))
+        self.n_total.set(len(self.session.paths[0]))
         # enable and disable buttons depending of the succeed of the importing process
         if self.n_total.get() > 0:
             self.bot[3].config(state="normal")  # enable zoom in button
@@ -249,4 +311,5 @@ class Mixin:
             self.bot[3].config(state="disable")  # disable zoom in button
             self.bot[4].config(state="disable")  # disable zoom in button
             self.bot[5].config(state="disable")  # disable run calibration button
-    
\ No newline at end of file
+        if self.n_total.get() > n_before:
+            self.update_calibration(range(n_before, self.n_total.get()))
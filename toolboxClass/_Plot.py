@@ -8,11 +8,18 @@ from PIL import Image, ImageTk
 from matplotlib import cm
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
+from heat_map import HeatMapEngine
+from image_tools import draw_mesh, gray_to_rgb
+from zoom_renderer import ImagePyramid
 
 logging.basicConfig(level=logging.ERROR)
 
 DEFAULT_WIDTH = 320
 DEFAULT_HEIGHT = 240
+# maximum number of rendered images of the tabs kept, see rendered_image
+RENDER_CACHE_SIZE = 64
+# maximum number of pyramids of full resolution images kept for the zoom, see image_pyramid
+PYRAMID_CACHE_SIZE = 4
 
 class Mixin:
     def updateSelectionperclick(self, selection, i):
@@ -81,53 +88,108 @@ class Mixin:
     def updatePicture(self, *args):
         '''
         Function to update pictures in panel of tabs
+        Only the visible tab of each camera is drawn, see show_tab
         '''
         selection = self.index.get()
         # checks for a valid selection
         if selection >= 0:
             # update selection in data browser
             self.listbox.activate(selection)
-            images = []
-            for j in range(self.n_cameras):
-                images.append([])
-                images[j].append(Image.fromarray(self.img_original[j][selection]))  # get original of the selected image
-                images[j].append(Image.fromarray(
-                    self.image_features(j, selection)))  # get images with marked features of the selected image
-                images[j].append(Image.fromarray(self.heat_map[j]))  # get heat_map for all the images in camera
-                images[j].append(Image.fromarray(self.project_detected_features(j,
-                                                                                selection)))  # get projection image with intrinsic parameters of the selected image
-                images[j].append(Image.fromarray(self.project_detected_features(j, selection,
-                                                                                forExtrinsics=True)))  # get projection image with the intrinsics of the other camera and extrinsics between the cameras of the selected image
-            # scale image if zoom applies and update panel of tabs
+            # scale view if zoom applies, only the visible part of the images is rendered, see ZoomRenderer
             if self.zoomhandler != 0:
-                width, height = DEFAULT_WIDTH, DEFAULT_HEIGHT
-                new_size = int(self.imscale * width), int(self.imscale * height)
-                for j in range(self.n_cameras):
-                    for i in range(5):
-                        self.list_panel[j][i].scale('all', self.x, self.y, self.scale, self.scale)
-                        self.img[j][i] = ImageTk.PhotoImage(images[j][i].resize(new_size))
-                        self.list_panel[j][i].itemconfig(self.list_image_on_panel[j][i], image=self.img[j][i])
-            # Update panel of tabs
+                self.zoom.zoom_at(self.x, self.y, self.scale)
             else:
                 self.imscale = 1
-                width, height = DEFAULT_WIDTH, DEFAULT_HEIGHT
-                new_size = int(self.imscale * width), int(self.imscale * height)
-                for j in range(self.n_cameras):
-                    for i in range(5):
-                        self.list_panel[j][i].scale('all', 0, 0, 1, 1)
-                        self.list_panel[j][i].coords(self.list_image_on_panel[j][i], 0, 0)
-                        self.img[j][i] = ImageTk.PhotoImage(images[j][i].resize(new_size))
-                        self.list_panel[j][i].itemconfig(self.list_image_on_panel[j][i], image=self.img[j][i])
+                self.zoom.reset()
+            for j in range(self.session.n_cameras):
+                self.show_tab(j)
             self.scale = 1
 
         # for no valid selection, update with empty picture the panel of tabs
         else:
-            for j in range(self.n_cameras):
+            for j in range(self.session.n_cameras):
                 for i in range(5):
                     self.list_panel[j][i].delete("all")
                     self.list_image_on_panel[j][i] = self.list_panel[j][i].create_image(0, 0, anchor=tk.N + tk.W,
                                                                                         image=None)
 
+    def show_tab(self, camera):
+        '''
+        Function to draw the selected image in the visible tab of a camera
+        '''
+        selection = self.index.get()
+        if selection < 0 or camera >= self.session.n_cameras:
+            return
+        i = self.tabControl[camera].index('current')
+        self.img[camera][i], position = self.rendered_image(camera, i, selection)
+        self.list_panel[camera][i].coords(self.list_image_on_panel[camera][i], *position)
+        self.list_panel[camera][i].itemconfig(self.list_image_on_panel[camera][i],
+                                              image=self.img[camera][i] if self.img[camera][i] is not None else '')
+
+    def rendered_image(self, camera, tab, selection):
+        '''
+        Function to get the image of a tab for the selected pose at the current zoom and its position in the panel
+        The images are kept in least recently used order, up to RENDER_CACHE_SIZE
+        '''
+        # the heat map is the same for all the poses, the selected corner is drawn only in the projections
+        pose = None if tab == 2 else self.img_original[camera].key(selection)
+        corner = self.index_corner if tab in (3, 4) else None
+        key = (camera, pose, tab, self.zoom.key(), self.render_version, corner)
+        rendered = self.rendered.get(key)
+        if rendered is not None:
+            self.rendered.move_to_end(key)
+            return rendered
+        if self.zoomhandler == 0:
+            image = Image.fromarray(self.tab_image(camera, tab, selection)).resize((DEFAULT_WIDTH, DEFAULT_HEIGHT))
+            position = (0, 0)
+        else:
+            image, position = self.zoom.render(self.image_pyramid(camera, tab, selection, (pose, corner)))
+            image = None if image is None else Image.fromarray(image)
+        rendered = (None if image is None else ImageTk.PhotoImage(image), position)
+        self.rendered[key] = rendered
+        while len(self.rendered) > RENDER_CACHE_SIZE:
+            self.rendered.popitem(last=False)
+        return rendered
+
+    def image_pyramid(self, camera, tab, selection, pose_key):
+        '''
+        Function to get the pyramid of the full resolution image of a tab, the last used ones are kept up to
+        PYRAMID_CACHE_SIZE
+        '''
+        key = (camera, tab, pose_key, self.render_version)
+        pyramid = self.pyramids.get(key)
+        if pyramid is None:
+            pyramid = ImagePyramid(self.tab_image(camera, tab, selection), (DEFAULT_WIDTH, DEFAULT_HEIGHT))
+            self.pyramids[key] = pyramid
+            while len(self.pyramids) > PYRAMID_CACHE_SIZE:
+                self.pyramids.popitem(last=False)
+        self.pyramids.move_to_end(key)
+        return pyramid
+
+    def tab_image(self, camera, tab, selection):
+        '''
+        Function to draw the image of a tab (original, features, heat map, projection with the intrinsics and
+        projection with the intrinsics of the other camera and the extrinsics) for the selected pose
+        '''
+        if tab == 0:
+            # get original of the selected image, the resident preview is enough without zoom
+            if self.zoomhandler == 0 and self.img_original[camera].preview(selection) is not None:
+                return self.img_original[camera].preview(selection)
+            return self.img_original[camera][selection]
+        elif tab == 1:
+            return self.image_features(camera, selection)
+        elif tab == 2:
+            return self.heat_map[camera]
+        return self.project_detected_features(camera, selection, forExtrinsics=tab == 4)
+
+    def invalidate_rendered(self):
+        '''
+        Function to draw again the images of the tabs after a change of the heat map or the calibration
+        '''
+        self.render_version += 1
+        self.rendered.clear()
+        self.pyramids.clear()
+
     # self.panel1.itemconfig(self.image_on_panel1, image = None)
 
     def image_features(self, camera, index):
@@ -135,16 +197,13 @@ class Mixin:
         Function to create an picture with the original one and its detected features with markers
         '''
         # get the features for the selected image
-        features = self.detected_features[camera][index]
+        features = self.session.detected_features[camera][index]
         # get original of the selected image
         im = self.img_original[camera][index]
         if features.any():
-            im2 = np.uint8(np.zeros(im.shape + (3,)))
-            im2[:, :, 0] = im
-            im2[:, :, 1] = im
-            im2[:, :, 2] = im
+            im2 = gray_to_rgb(im)
             # draw markers over the image representing the features
-            cv2.drawChessboardCorners(im2, (self.p_height, self.p_width), features, True)
+            cv2.drawChessboardCorners(im2, (self.session.p_height, self.session.p_width), features, True)
         else:
             im2 = im
         return im2
@@ -155,80 +214,28 @@ class Mixin:
         '''
         self.zoomhandler = 0
         if self.n_total.get() > 0:
-            for j in range(self.n_cameras):
-                if self.size[j] is None:
-                    self.size[j] = self.img_original[j][0].shape
+            for j in range(self.session.n_cameras):
+                if self.session.size[j] is None:
+                    self.session.size[j] = self.img_original[j].image_shape(0)
                 # recalculate heat_map
                 self.heat_map[j] = self.density_cloud_heat_map(j)
+        self.invalidate_rendered()
         # update data browser
         self.loadImagesBrowser()
         
     def density_cloud_heat_map(self, camera):
         '''
         Function to calculate a density cloud map of all the images using its detected features
+        The map of each camera is kept by a HeatMapEngine, only the poses added or deleted since the last map are
+        added or subtracted
         '''
-        # initialize picture with image size
-        width = self.size[camera][1]
-        height = self.size[camera][0]
-        grid = np.zeros((height, width))
-        # get detected features for the camera
-        list_features = self.detected_features[camera]
-        ## create circle matrix for each pattern ##
-        # calculate number of pixel as the radius of the circle for each feature depending of the width
-        L = int(round(0.006 * width + 8))
-        step = 1.0 / L
-        # initialize grid for the circle matrix
-        grid_circle = np.zeros((L * 2 + 1, L * 2 + 1))
-        # Assign values to the grid from 1.0 to 0.0 as a circle representation, where the center gets 1.0 and the radius gets 0.0
-        for k in range(L):
-            for i in range(L - k, L + k + 1):
-                for j in range(L - k, L + k + 1):
-                    r = ((i - L) ** 2 + (j - L) ** 2) ** 0.5
-                    if r <= k:
-                        grid_circle[i, j] += step
-        # for each point in the list of features overlay the circle matrix, considering the width and height of the image
-        for k in list_features:
-            for c in k:
-                x = int(c[0][1])
-                y = int(c[0][0])
-                x_min = 0
-                x_max = height
-                y_min = 0
-                y_max = width
-                x_min_g = 0
-                x_max_g = L * 2 + 1
-                y_min_g = 0
-                y_max_g = L * 2 + 1
-
-                if x - L < 0:
-                    x_min_g -= x - L
-                else:
-                    x_min += x - L
-                if x + L + 1 > height:
-                    x_max_g = x_max - x_min
-                else:
-                    x_max = x + L + 1
-                if y - L < 0:
-                    y_min_g -= y - L
-                else:
-                    y_min += y - L
-                if y + L + 1 > width:
-                    y_max_g = y_max - y_min
-                else:
-                    y_max = y + L + 1
-
-                # TODO: Show errors
-                grid[x_min:x_max, y_min:y_max] += grid_circle[x_min_g:x_max_g, y_min_g:y_max_g]
-
-        # normalized the picture
-        grid = ((grid - grid.min()) / (grid.max() - grid.min()))
-        '''
-        for k in list_features: 
-            for c in k: 
-                grid[int(c[0][1]),int(c[0][0])]=1.0 
-        '''
+        engine = self.heat_engine[camera]
+        if engine is None or engine.size != tuple(self.session.size[camera][:2]):
+            engine = HeatMapEngine(self.session.size[camera])
+            self.heat_engine[camera] = engine
+        engine.update(self.session.detected_features[camera])
         # create heatmap of the normalized picture. Check: https://stackoverflow.com/questions/10965417/how-to-convert-numpy-array-to-pil-image-applying-matplotlib-colormap
-        im = np.uint8(cm.jet(grid) * 255)
+        im = np.uint8(cm.jet(engine.normalized()) * 255)
         return im
 
     def project_detected_features(self, camera, index, forExtrinsics=False):
@@ -236,47 +243,24 @@ class Mixin:
         Function to get the images comparing the original in green and its projection in red
         The current selected feature index is represented by a circle over the point
         '''
-        # create RGB picture with the image size
-        im3 = np.uint8(np.zeros(self.size[camera] + (3,)))
-        im = self.img_original[camera][index]
-        im3[:, :, 0] = im
-        im3[:, :, 1] = im
-        im3[:, :, 2] = im
+        # create RGB picture from the original
+        im3 = gray_to_rgb(self.img_original[camera][index])
         # check if the projection is from intrinsics or from intrinsics and extrinsics (from the other camera)
         if forExtrinsics:
-            projections = self.projected_stereo
+            projections = self.session.projected_stereo
         else:
-            projections = self.projected
+            projections = self.session.projected
 
-        # plot projection mesh of features using  red lines
-        if projections[camera]:
-            for i in range(self.p_height):
-                for j in range(self.p_width):
-                    a = projections[camera][index][j * self.p_height + i]
-                    if j * self.p_height + i == self.index_corner:
-                        cv2.circle(im3, (a[0][0], a[0][1]), 5, (255, 0, 0))
-                    if i < self.p_height - 1:
-                        b = projections[camera][index][j * self.p_height + i + 1]
-                        cv2.line(im3, (a[0][0], a[0][1]), (b[0][0], b[0][1]), (255, 0, 0))
-                    if j < self.p_width - 1:
-                        c = projections[camera][index][(j + 1) * self.p_height + i]
-                        cv2.line(im3, (a[0][0], a[0][1]), (c[0][0], c[0][1]), (255, 0, 0))
+        # plot projection mesh of features using red lines
+        if projections[camera] and projections[camera][index] is not None:
+            draw_mesh(im3, projections[camera][index], self.session.p_height, self.session.p_width, (255, 0, 0),
+                      self.index_corner)
 
         # plot original mesh of features using green lines
-        for i in range(self.p_height):
-            for j in range(self.p_width):
-                a = self.detected_features[camera][index][j * self.p_height + i]
-                if j * self.p_height + i == self.index_corner:
-                    cv2.circle(im3, (a[0][0], a[0][1]), 5, (0, 255, 0))
-                if i < self.p_height - 1:
-                    b = self.detected_features[camera][index][j * self.p_height + i + 1]
-                    cv2.line(im3, (a[0][0], a[0][1]), (b[0][0], b[0][1]), (0, 255, 0))
-                if j < self.p_width - 1:
-                    c = self.detected_features[camera][index][(j + 1) * self.p_height + i]
-                    cv2.line(im3, (a[0][0], a[0][1]), (c[0][0], c[0][1]), (0, 255, 0))
-
+        draw_mesh(im3, self.session.detected_features[camera][index], self.session.p_height, self.session.p_width,
+                  (0, 255, 0), self.index_corner)
         return im3
-    
+
     def updateBarError(self, k):
         '''
         Function to update the color of the bars in the bar charts
@@ -287,9 +271,13 @@ class Mixin:
             index = self.index.get()
         else:
             index = self.index_corner
-        for j in range(self.n_cameras):
+        if self.fast_charts.get():
+            for j in range(self.session.n_cameras):
+                self.charts[k][j].select(index)
+            return
+        for j in range(self.session.n_cameras):
             # TODO maybe save old index?
-            if self.r_error[j]:
+            if self.session.r_error[j]:
                 for i in range(len(self.dr[k][j])):
                     if i == index:
                         self.dr[k][j][i].set_color('r')
@@ -304,25 +292,40 @@ class Mixin:
         xlabel_names = ['Images', 'Features']
         title_names = ['RMS Reprojection Error', 'Pixel Distance Error']
         factor_width = [10, 7]
+        fast = self.fast_charts.get()
         for k in r_up:
             self.dr[k] = []
-            for j in range(self.n_cameras):
+            for j in range(self.session.n_cameras):
                 self.ax[k][j].clear()
+                self.charts[k][j].reset()
                 data = None
                 m_error = None
                 index = None
                 # getting error data depending of the chart type (RMS reprojection error or pixel distance error)
                 if k == 0:
-                    if self.r_error[j]:
-                        data = self.r_error[j]
+                    if self.session.r_error[j]:
+                        data = self.session.r_error[j]
                         m_error = np.mean(data)
                         index = self.index.get()
                 else:
-                    if self.r_error_p[j]:
-                        data = self.r_error_p[j][self.index.get()].T[0]  # converted to size-1 arrays
+                    if self.session.r_error_p[j]:
+                        data = self.session.r_error_p[j][self.index.get()].T[0]  # converted to size-1 arrays
                         index = self.index_corner
 
-                if data is not None:
+                if data is not None and fast:
+                    # bars as one collection, the selection is drawn by the chart, see BarChart
+                    self.charts[k][j].set_data(data, index)
+                    self.ax[k][j].tick_params(axis='y', labelsize=10)
+                    if k == 0:
+                        self.ax[k][j].axhline(y=m_error, color='k', linestyle='--')
+                        self.ax[k][j].legend(self.ax[k][j].lines[:1],
+                                             ['Mean RMS Reprojection Error is: %.5f' % m_error],
+                                             loc='lower center', prop={'size': 12})
+                    if self.update:
+                        self.ax[k][j].set_title(title_names[k], fontsize=10)
+                    else:
+                        self.ax[k][j].set_title(title_names[k] + ' (Not Updated)', color='r', fontsize=10)
+                elif data is not None:
                     ## defining bars of the chart##
                     ind = np.arange(len(data))
                     # height of bars correspond to the list of data errors
@@ -374,7 +377,12 @@ class Mixin:
         j is camera, i is graphic #TODO: Maybe change logic? (easier to understand...)
         '''
         # checks if a calibration has already succeed
-        if self.camera_matrix[0][0][0] != 0:  # Fx is zero only when reset
+        if self.session.camera_matrix[0][0][0] != 0 and self.fast_charts.get():
+            # the bar under the click is given by its position
+            index = self.charts[i][j].index_at(event)
+            if index is not None:
+                self.updateSelectionperclick(index + 1, i)
+        elif self.session.camera_matrix[0][0][0] != 0:  # Fx is zero only when reset
             b_continue = False
             for rect in self.dr[i][j]:
                 if event.inaxes == rect.axes:
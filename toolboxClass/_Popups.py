@@ -2,8 +2,8 @@ import logging
 import tkinter as tk
 from tkinter import ttk
 from tkinter import filedialog
-import numpy as np
 from misc_tools import validate
+from detection_tools import DEFAULT_BACKEND, DETECTOR_BACKENDS
 from plot_patterns import plot_chessboard, plot_asymmetric_grid, plot_symmetric_grid, plot_custom
 
 logging.basicConfig(level=logging.ERROR)
@@ -26,7 +26,47 @@ class Mixin:
         tk.Label(self.popup, text='Set zero tangent distance').grid(row=3, column=0, sticky=tk.W)
         tk.Checkbutton(self.popup, variable=self.p_zero_tangent_distance).grid(row=3, column=1,
                                                                                sticky=tk.E + tk.W + tk.N)
-        tk.Button(self.popup, text="Exit", command=self.popup.destroy).grid(row=4, column=0, columnspan=2,
+        vcmd_int = (self.popup.register(validate), '%d', '%i', '%P', '%s', '%S', '%v', '%V', '%W', '0123456789')
+        tk.Label(self.popup, text='Workers for feature detection').grid(row=4, column=0, sticky=tk.W)
+        tk.Entry(self.popup, textvariable=self.n_workers, width=5, validate='key', validatecommand=vcmd_int).grid(
+            row=4, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text='Workers for calibration').grid(row=5, column=0, sticky=tk.W)
+        tk.Entry(self.popup, textvariable=self.n_calibration_workers, width=5, validate='key',
+                 validatecommand=vcmd_int).grid(row=5, column=1, sticky=tk.E + tk.W + tk.N)
+        vcmd_float = (self.popup.register(validate), '%d', '%i', '%P', '%s', '%S', '%v', '%V', '%W', '0123456789.e-')
+        tk.Label(self.popup, text='Maximum iterations').grid(row=6, column=0, sticky=tk.W)
+        tk.Entry(self.popup, textvariable=self.calib_max_iter, width=5, validate='key',
+                 validatecommand=vcmd_int).grid(row=6, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text='Epsilon (0: OpenCV default)').grid(row=7, column=0, sticky=tk.W)
+        tk.Entry(self.popup, textvariable=self.calib_eps, width=5, validate='key',
+                 validatecommand=vcmd_float).grid(row=7, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text='Use detection cache').grid(row=8, column=0, sticky=tk.W)
+        tk.Checkbutton(self.popup, variable=self.use_detection_cache).grid(row=8, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text='Concurrent detection strategies').grid(row=9, column=0, sticky=tk.W)
+        tk.Checkbutton(self.popup, variable=self.concurrent_strategies).grid(row=9, column=1,
+                                                                             sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text='Memory for full images (MB)').grid(row=10, column=0, sticky=tk.W)
+        tk.Entry(self.popup, textvariable=self.image_budget, width=5, validate='key',
+                 validatecommand=vcmd_int).grid(row=10, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text='Update calibration after adding or deleting poses').grid(row=11, column=0,
+                                                                                          sticky=tk.W)
+        tk.Checkbutton(self.popup, variable=self.incremental_update).grid(row=11, column=1,
+                                                                          sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text='Refine the parameters in the update').grid(row=12, column=0, sticky=tk.W)
+        tk.Checkbutton(self.popup, variable=self.refine_update).grid(row=12, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text='Fast error charts').grid(row=13, column=0, sticky=tk.W)
+        tk.Checkbutton(self.popup, variable=self.fast_charts, command=lambda: self.loadBarError([0, 1])).grid(
+            row=13, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text='Outlier threshold (x median error)').grid(row=14, column=0, sticky=tk.W)
+        tk.Entry(self.popup, textvariable=self.prune_factor, width=5, validate='key',
+                 validatecommand=vcmd_float).grid(row=14, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Button(self.popup, text="Prune outlier poses", command=self.prune_outliers).grid(
+            row=15, column=0, columnspan=2, sticky=tk.E + tk.W + tk.N)
+        tk.Button(self.popup, text="Clear detection cache", command=self.clear_detection_cache).grid(
+            row=16, column=0, columnspan=2, sticky=tk.E + tk.W + tk.N)
+        tk.Button(self.popup, text="Compare chessboard detectors", command=self.compare_detector_backends).grid(
+            row=17, column=0, columnspan=2, sticky=tk.E + tk.W + tk.N)
+        tk.Button(self.popup, text="Exit", command=self.popup.destroy).grid(row=18, column=0, columnspan=2,
                                                                             sticky=tk.E + tk.W + tk.N)
         self.center()
         
@@ -66,8 +106,8 @@ class Mixin:
             b_continue = True
             # check range of pattern width, update the continue flag and show error if applies
             try:
-                self.p_width = self.pattern_width.get()
-                if self.p_width < 2:
+                self.session.p_width = self.pattern_width.get()
+                if self.session.p_width < 2:
                     self.label_msg[0].configure(text='width parameter muss be greater than one')
                     b_continue = False
                 else:
@@ -77,8 +117,8 @@ class Mixin:
                 b_continue = False
             # check range of pattern height, update the continue flag and show error if applies
             try:
-                self.p_height = self.pattern_height.get()
-                if self.p_height < 2:
+                self.session.p_height = self.pattern_height.get()
+                if self.session.p_height < 2:
                     self.label_msg[1].configure(text='height parameter muss be greater than one')
                     b_continue = False
                 else:
@@ -88,8 +128,8 @@ class Mixin:
                 b_continue = False
             # check range of pattern length and show error if applies
             try:
-                self.f_distance = self.feature_distance.get()
-                if self.f_distance == 0:
+                self.session.f_distance = self.feature_distance.get()
+                if self.session.f_distance == 0:
                     self.label_msg[2].configure(text='length parameter muss be greater than zero')
                 else:
                     self.label_msg[2].configure(text='')
@@ -98,17 +138,17 @@ class Mixin:
 
             if b_continue:
                 if "Chessboard" in self.pattern_type.get():
-                    plot_chessboard(self.c_pattern, self.p_width, self.p_height, self.c_pattern.winfo_width(),
-                                    self.c_pattern.winfo_height())
+                    plot_chessboard(self.c_pattern, self.session.p_width, self.session.p_height,
+                                    self.c_pattern.winfo_width(), self.c_pattern.winfo_height())
                 elif "Asymmetric Grid" in self.pattern_type.get():
-                    plot_asymmetric_grid(self.c_pattern, self.p_width, self.p_height, self.c_pattern.winfo_width(),
-                                         self.c_pattern.winfo_height())
+                    plot_asymmetric_grid(self.c_pattern, self.session.p_width, self.session.p_height,
+                                         self.c_pattern.winfo_width(), self.c_pattern.winfo_height())
                 elif "Symmetric Grid" in self.pattern_type.get():
-                    plot_symmetric_grid(self.c_pattern, self.p_width, self.p_height, self.c_pattern.winfo_width(),
-                                        self.c_pattern.winfo_height())
+                    plot_symmetric_grid(self.c_pattern, self.session.p_width, self.session.p_height,
+                                        self.c_pattern.winfo_width(), self.c_pattern.winfo_height())
 
                 # check if width and height parameters are an odd-even pair and show warnings if applies
-                if (self.p_width + self.p_height) % 2 == 0:
+                if (self.session.p_width + self.session.p_height) % 2 == 0:
                     self.l_error.config(image='::tk::icons::warning',
                                         text='width and height parameters \n should be an odd-even pair', bg='#ffcc0f',
                                         fg='black')
@@ -133,9 +173,7 @@ class Mixin:
 
             # load 3D points to object_pattern
             if self.load_files[0]:
-                set_3D_points = np.fromfile(self.load_files[0][0], dtype=np.float32, sep=',')
-                n_points = len(set_3D_points) / 3
-                self.object_pattern = set_3D_points.reshape((n_points, 1, 3))
+                self.session.load_object_pattern(self.load_files[0][0])
         
     def add_session_popup(self):
         '''
@@ -210,6 +248,12 @@ class Mixin:
         # ---------------------------------                           |
         # | *Text distance*               |                           |
         # -------------------------------------------------------------
+        # | Coarse-to-fine detection      | checkbox                  |
+        # -------------------------------------------------------------
+        # | Chessboard detector                                       |
+        # -------------------------------------------------------------
+        # | Option Menu detector backend                          |*| |
+        # -------------------------------------------------------------
 
         tk.Label(self.m_frm[1], text='Pattern type ').grid(row=0, column=0, sticky=tk.W)
         tk.OptionMenu(self.m_frm[1], self.pattern_type, "Chessboard", "Asymmetric Grid", "Symmetric Grid").grid(
@@ -258,6 +302,12 @@ class Mixin:
         self.label_msg[2] = tk.Label(self.m_frm[1], font='TkDefaultFont 6', fg='red')
         self.label_msg[2].grid(row=10, column=0, sticky=tk.W)
 
+        tk.Label(self.m_frm[1], text='Coarse-to-fine detection ').grid(row=11, column=0, sticky=tk.W)
+        tk.Checkbutton(self.m_frm[1], variable=self.pyramid_detection).grid(row=11, column=1, sticky=tk.W)
+        tk.Label(self.m_frm[1], text='Chessboard detector ').grid(row=12, column=0, sticky=tk.W)
+        tk.OptionMenu(self.m_frm[1], self.detector_backend, *DETECTOR_BACKENDS.keys()).grid(
+            row=13, column=0, columnspan=2, sticky=tk.W + tk.E)
+
         self.c_pattern = tk.Canvas(self.m_frm[1], height=100, width=100, bg='white')
         self.c_pattern.grid(row=0, column=1, rowspan=11)
         tk.Label(self.m_frm[1], width=15).grid(row=1, column=1, sticky=tk.W)
@@ -282,6 +332,8 @@ class Mixin:
 
         # Setting pattern feature variables
         self.mode_stereo.set(False)
+        self.pyramid_detection.set(False)
+        self.detector_backend.set(DEFAULT_BACKEND)
         self.pattern_type.set('Chessboard')
 
         self.center()
@@ -336,6 +388,12 @@ class Mixin:
         self.label_status_l[3][1].config(text='')
         self.label_status_l[4][1].config(text='')
 
+        # reset values status for single-shot
+        for j in range(1, 4):
+            self.label_status_s[j][1].config(text='')
+            self.label_status_s[j][2].config(text='')
+        self.lb_uncertainty.config(text='')
+
         if "Clustering" in self.how_to_calibrate.get():
             # reset progress bar
             self.progbar["value"] = 0
@@ -344,10 +402,17 @@ class Mixin:
             # set GUI for clustering
             self.m_frm[1].grid(row=3, column=0, sticky=tk.N + tk.S)
             self.m_frm[0].grid_forget()
+            self.m_frm[3].grid_forget()
+        elif "Single-shot" in self.how_to_calibrate.get():
+            # set GUI for single-shot
+            self.m_frm[3].grid(row=3, column=0, sticky=tk.N + tk.S)
+            self.m_frm[0].grid_forget()
+            self.m_frm[1].grid_forget()
         elif "Load" in self.how_to_calibrate.get():
             # set GUI for Loading File
             self.m_frm[0].grid(row=2, column=0, sticky=tk.N + tk.S)
             self.m_frm[1].grid_forget()
+            self.m_frm[3].grid_forget()
         
     def popupmsg(self):
         '''
@@ -366,8 +431,10 @@ class Mixin:
         self.progbar.config(maximum=10, mode='determinate')
         self.progbar.grid(row=1, column=0, columnspan=2, sticky=tk.E + tk.W)
 
-        tk.Button(self.popup, text="Okay", command=self.popup.destroy).grid(row=2, column=0, columnspan=2,
-                                                                            sticky=tk.E + tk.W)
+        # Cancel while the images are imported, then Okay
+        self.bt_msg = tk.Button(self.popup, text="Okay", command=self.close_popup)
+        self.bt_msg.grid(row=2, column=0, columnspan=2, sticky=tk.E + tk.W)
+        self.popup.protocol("WM_DELETE_WINDOW", self.close_popup)
         self.center()
         return l_msg
     
@@ -379,8 +446,8 @@ class Mixin:
 
         tk.Label(self.popup, text='How to get camera parameters?').grid(row=0, column=0,
                                                                         sticky=tk.E + tk.W + tk.N)
-        tk.OptionMenu(self.popup, self.how_to_calibrate, "Clustering calculation", "Load from file",
-                      command=self.modify_play_popup).grid(row=1, column=0, sticky=tk.E + tk.W + tk.N)
+        tk.OptionMenu(self.popup, self.how_to_calibrate, "Clustering calculation", "Single-shot calculation",
+                      "Load from file", command=self.modify_play_popup).grid(row=1, column=0, sticky=tk.E + tk.W + tk.N)
 
         vcmd_int = (self.popup.register(validate), '%d', '%i', '%P', '%s', '%S', '%v', '%V', '%W', '0123456789')
 
@@ -411,7 +478,7 @@ class Mixin:
                                                                                                            column=0,
                                                                                                            sticky=tk.E + tk.W + tk.N)
 
-        if self.m_stereo:
+        if self.session.m_stereo:
             tk.Button(self.m_frm[0], text="Intrinsics 2 camera", command=lambda: self.assign_filename(1)).grid(row=3,
                                                                                                                column=0,
                                                                                                                sticky=tk.E + tk.W + tk.N)
@@ -451,7 +518,7 @@ class Mixin:
         self.label_status_l[0][0].config(text='Steps')
         self.label_status_l[0][1].config(text='State')
 
-        if self.n_cameras == 1:
+        if self.session.n_cameras == 1:
             # forget grid for labels of errors for stereo mode
             self.l_load_files[1].grid_forget()
             self.l_load_files[2].grid_forget()
@@ -481,6 +548,12 @@ class Mixin:
         # ------------------------------------
         # |              (c_r)               |
         # ------------------------------------
+        # | [ ] Warm start from all images   |
+        # ------------------------------------
+        # | [ ] Stop when converged  (tol)   |
+        # | Time budget              (s)     |
+        # | [ ] Checkpoint       [ ] Resume  |
+        # ------------------------------------
         # |         >>>>(progbar)>>>>        |
         # ------------------------------------
         # |            (lb_time)             |
@@ -508,17 +581,42 @@ class Mixin:
         self.label_msg[1] = tk.Label(self.m_frm[1], font='TkDefaultFont 6', fg='red')
         self.label_msg[1].grid(row=8, column=0, sticky=tk.W)
 
+        warm_frame = tk.Frame(self.m_frm[1])
+        warm_frame.grid(row=9, column=0, sticky=tk.W + tk.E)
+        tk.Checkbutton(warm_frame, text='Warm start from all images', variable=self.warm_start).grid(
+            row=0, column=0, sticky=tk.W)
+        tk.Checkbutton(warm_frame, text='Compare without warm start', variable=self.compare_warm_start).grid(
+            row=0, column=1, sticky=tk.W)
+
+        # adaptive stop, k is the maximum number of groups
+        vcmd_float = (self.popup.register(validate), '%d', '%i', '%P', '%s', '%S', '%v', '%V', '%W', '0123456789.')
+        adaptive_frame = tk.Frame(self.m_frm[1])
+        adaptive_frame.grid(row=10, column=0, sticky=tk.W + tk.E)
+        tk.Checkbutton(adaptive_frame, text='Stop when converged, tolerance', variable=self.adaptive_stop).grid(
+            row=0, column=0, sticky=tk.W)
+        tk.Entry(adaptive_frame, textvariable=self.adaptive_tolerance, width=6, validate='key',
+                 validatecommand=vcmd_float).grid(row=0, column=1, sticky=tk.W)
+        tk.Label(adaptive_frame, text='Time budget (s, 0: none)').grid(row=1, column=0, sticky=tk.W)
+        tk.Entry(adaptive_frame, textvariable=self.adaptive_budget, width=6, validate='key',
+                 validatecommand=vcmd_float).grid(row=1, column=1, sticky=tk.W)
+        tk.Checkbutton(adaptive_frame, text='Checkpoint', variable=self.save_checkpoint).grid(row=2, column=0,
+                                                                                             sticky=tk.W)
+        tk.Checkbutton(adaptive_frame, text='Resume', variable=self.resume_checkpoint).grid(row=2, column=1,
+                                                                                           sticky=tk.W)
+        tk.Checkbutton(adaptive_frame, text='Keep the groups of the last calibration',
+                       variable=self.keep_groups).grid(row=3, column=0, columnspan=2, sticky=tk.W)
+
         # set initial text progressbar
         self.style_pg.configure('text.Horizontal.TProgressbar', text='0 %')
         self.progbar = ttk.Progressbar(self.m_frm[1], style='text.Horizontal.TProgressbar')
         self.progbar.config(maximum=10, mode='determinate')
-        self.progbar.grid(row=9, column=0, sticky=tk.E + tk.W)
+        self.progbar.grid(row=11, column=0, sticky=tk.E + tk.W)
 
         self.lb_time = tk.Label(self.m_frm[1], font='TkDefaultFont 6')
-        self.lb_time.grid(row=10, column=0, sticky=tk.W + tk.E)
+        self.lb_time.grid(row=12, column=0, sticky=tk.W + tk.E)
 
         aux_frame = tk.Frame(self.m_frm[1])
-        aux_frame.grid(row=11, column=0, sticky=tk.W + tk.E + tk.N + tk.S)
+        aux_frame.grid(row=13, column=0, sticky=tk.W + tk.E + tk.N + tk.S)
 
         ## struct for label_status ##
         # -------------------------------------------------
@@ -534,8 +632,10 @@ class Mixin:
         # -------------------------------------------------
         # | TOTAL                      |       |          |
         # -------------------------------------------------
+        # | Warm start (in 1.)         |       |          |
+        # -------------------------------------------------
         self.label_status = []
-        for j in range(6):
+        for j in range(7):
             self.label_status.append([])
             for i in range(3):
                 l = tk.Label(aux_frame)
@@ -550,17 +650,98 @@ class Mixin:
         self.label_status[3][0].config(text='3. Calculating Projections')
         self.label_status[4][0].config(text='4. Calculating Error')
         self.label_status[5][0].config(text='TOTAL')
+        self.label_status[6][0].config(text='Warm start (in 1.)')
+
+        ## struct popup single-shot calculation (m_frm[3]) ##
+        # -------------------------------------------------
+        # | Steps                      | State | Time (s) |
+        # -------------------------------------------------
+        # | 1. Calibrating all images  |       |          |
+        # -------------------------------------------------
+        # | 2. Calculating Projections |       |          |
+        # -------------------------------------------------
+        # | 3. Calculating Error       |       |          |
+        # -------------------------------------------------
+        # |   (lb_uncertainty) deviations and views       |
+        # -------------------------------------------------
+        self.m_frm.append(tk.Frame(self.popup))
+        self.label_status_s = []
+        for j in range(4):
+            self.label_status_s.append([])
+            for i in range(3):
+                l = tk.Label(self.m_frm[3])
+                l.grid(row=j, column=i, sticky=tk.W)
+                self.label_status_s[j].append(l)
+        self.label_status_s[0][0].config(text='Steps')
+        self.label_status_s[0][1].config(text='State')
+        self.label_status_s[0][2].config(text='Time (s)')
+        self.label_status_s[1][0].config(text='1. Calibrating all images')
+        self.label_status_s[2][0].config(text='2. Calculating Projections')
+        self.label_status_s[3][0].config(text='3. Calculating Error')
+        self.lb_uncertainty = tk.Label(self.m_frm[3], font='TkFixedFont', justify=tk.LEFT)
+        self.lb_uncertainty.grid(row=4, column=0, columnspan=3, sticky=tk.W)
 
         calib_button = tk.Button(self.m_frm[2], text="Calibrate")  # added reference to disable button while play
         calib_button.config(command=lambda: self.play(calib_button))
         calib_button.grid(row=0, column=0, sticky=tk.E + tk.W + tk.N)
-        tk.Button(self.m_frm[2], text="Exit", command=self.popup.destroy).grid(row=0, column=1,
-                                                                               sticky=tk.E + tk.W + tk.N)
+        # stops a running calibration after the current group
+        self.cancel_button = tk.Button(self.m_frm[2], text="Cancel", state="disabled", command=self.cancel_task)
+        self.cancel_button.grid(row=0, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Button(self.m_frm[2], text="Exit", command=self.close_popup).grid(row=0, column=2,
+                                                                             sticky=tk.E + tk.W + tk.N)
+        self.popup.protocol("WM_DELETE_WINDOW", self.close_popup)
 
         self.modify_play_popup()
 
         self.center()
         
+    def popupreport(self, title, text):
+        '''
+        Function to create popup for showing a text report
+        '''
+        self.popup = tk.Toplevel(self.master)
+        self.popup.withdraw()
+
+        self.popup.wm_title(title)
+        tk.Label(self.popup, text=text, font='TkFixedFont', justify=tk.LEFT).grid(row=0, column=0,
+                                                                                 sticky=tk.W + tk.E)
+        tk.Button(self.popup, text="Okay", command=self.popup.destroy).grid(row=1, column=0, sticky=tk.W + tk.E)
+        self.center()
+
+    def popupprogress(self, title):
+        '''
+        Function to create popup for the progress of a background task, the task can be cancelled
+        '''
+        self.popup = tk.Toplevel(self.master)
+        self.popup.withdraw()
+
+        self.popup.wm_title(title)
+        # set initial text progressbar
+        self.style_pg.configure('text.Horizontal.TProgressbar', text='0 %')
+        self.progbar = ttk.Progressbar(self.popup, style='text.Horizontal.TProgressbar')
+        self.progbar.config(maximum=10, mode='determinate')
+        self.progbar.grid(row=0, column=0, sticky=tk.E + tk.W)
+        tk.Button(self.popup, text="Cancel", command=self.cancel_task).grid(row=1, column=0, sticky=tk.W + tk.E)
+        self.popup.protocol("WM_DELETE_WINDOW", self.close_popup)
+        self.center()
+
+    def popupmsg_pruning(self):
+        '''
+        Function to create popup for pruning confirmation in Load mode
+        '''
+        self.popup = tk.Toplevel(self.master)
+        self.popup.withdraw()
+
+        self.popup.wm_title("Prune outlier poses")
+        tk.Label(self.popup, text='\nThe loaded camera parameters will be replaced by the ones refined without the '
+                                  'outliers.\nAre you sure you want to prune the outlier poses?\n').grid(
+            row=0, column=0, columnspan=2, sticky=tk.W + tk.E)
+        tk.Button(self.popup, text="Yes", command=lambda: self.prune_outliers(True)).grid(row=1, column=0,
+                                                                                         sticky=tk.W + tk.E)
+        tk.Button(self.popup, text="Cancel", command=self.popup.destroy).grid(row=1, column=1, sticky=tk.W + tk.E)
+
+        self.center()
+
     def popupmsg_deleting(self):
         '''
         Function to create popup for deleting confirmation
@@ -0,0 +1,97 @@
+import logging
+import math
+
+import cv2
+import numpy as np
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class ImagePyramid():
+    '''
+    Class to keep an image with its downsampled levels, each one half of the previous, down to the first level
+    smaller than twice min_size (width, height)
+    '''
+
+    def __init__(self, image, min_size):
+        self.levels = [np.ascontiguousarray(image)]
+        min_width, min_height = min_size
+        while self.levels[-1].shape[1] >= 2 * min_width and self.levels[-1].shape[0] >= 2 * min_height:
+            self.levels.append(cv2.pyrDown(self.levels[-1]))
+
+    def level_for(self, width, height):
+        '''
+        Function to get the coarsest level with at least the given resolution, the full image if none
+        '''
+        for level in reversed(self.levels):
+            if level.shape[1] >= width and level.shape[0] >= height:
+                return level
+        return self.levels[0]
+
+    def nbytes(self):
+        return sum(level.nbytes for level in self.levels)
+
+
+class ZoomRenderer():
+    '''
+    Class to keep the zoom of the panels (width, height) and to render only their visible part of an image
+    The whole image is shown in the panel at scale 1, its top left corner is at origin in panel coordinates
+    The rendered image never exceeds the size of the panel, at any zoom
+    '''
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.reset()
+
+    def reset(self):
+        self.scale = 1.0
+        self.origin = (0.0, 0.0)
+
+    def zoom_at(self, x, y, factor):
+        '''
+        Function to scale the view by factor around the point (x, y) of the panel, as the scale of a canvas
+        '''
+        ox, oy = self.origin
+        self.origin = (x + (ox - x) * factor, y + (oy - y) * factor)
+        self.scale *= factor
+
+    def key(self):
+        '''
+        Function to get the state of the view, to identify the images rendered with it
+        '''
+        return round(self.scale, 6), round(self.origin[0], 2), round(self.origin[1], 2)
+
+    def viewport(self):
+        '''
+        Function to get the part of the panel covered by the image (x0, y0, x1, y1), None if it isn't visible
+        '''
+        ox, oy = self.origin
+        x0 = max(0, int(math.floor(ox)))
+        y0 = max(0, int(math.floor(oy)))
+        x1 = min(self.width, int(math.ceil(ox + self.scale * self.width)))
+        y1 = min(self.height, int(math.ceil(oy + self.scale * self.height)))
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return x0, y0, x1, y1
+
+    def render(self, pyramid):
+        '''
+        Function to render the visible part of the image of a pyramid
+        Returns the image and the position of its top left corner in the panel, None and (0, 0) if the image
+        isn't visible
+        '''
+        rectangle = self.viewport()
+        if rectangle is None:
+            return None, (0, 0)
+        x0, y0, x1, y1 = rectangle
+        # the coarsest level which isn't upsampled more than the zoom requires
+        level = pyramid.level_for(int(math.ceil(self.scale * self.width)), int(math.ceil(self.scale * self.height)))
+        a = self.scale * self.width / float(level.shape[1])
+        b = self.scale * self.height / float(level.shape[0])
+        ox, oy = self.origin
+        # pixel centers are aligned as in cv2.resize
+        M = np.float32([[a, 0, ox - x0 + 0.5 * (a - 1)], [0, b, oy - y0 + 0.5 * (b - 1)]])
+        image = cv2.warpAffine(level, M, (x1 - x0, y1 - y0), flags=cv2.INTER_LINEAR,
+                               borderMode=cv2.BORDER_REPLICATE)
+        return image, (x0, y0)